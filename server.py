@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import uuid
 
@@ -18,12 +19,12 @@ logger = logging.getLogger(__name__)
 config = {"configurable": {"thread_id": uuid.uuid4()}}
 
 
-def stream_graph_updates(user_input: dict | Command):
-    for event in graph.stream(user_input, config=config):
+async def stream_graph_updates(user_input: dict | Command):
+    async for event in graph.astream(user_input, config=config):
 
         if '__interrupt__' in event:
             a = input('请输入')
-            stream_graph_updates(Command(resume=a))
+            await stream_graph_updates(Command(resume=a))
         else:
             for value in event.values():
                 try:
@@ -41,8 +42,8 @@ while True:
         if user_input.lower() in ["quit", "exit", "q"]:
             print("Goodbye!")
             break
-        stream_graph_updates({"messages": [{"role": "user", "content": user_input}],
-                              "auto_accepted_plan": True, 'enable_background_investigation': True})
+        asyncio.run(stream_graph_updates({"messages": [{"role": "user", "content": user_input}],
+                                          "auto_accepted_plan": True, 'enable_background_investigation': True}))
         break
     except:
         break
@@ -1,3 +1,3 @@
-from .agents import create_agent
+from .agents import create_agent, get_or_create_agent
 
-__all__ = ["create_agent"]
+__all__ = ["create_agent", "get_or_create_agent"]
@@ -1,9 +1,23 @@
+import logging
+from collections import OrderedDict
+
 from langgraph.prebuilt import create_react_agent
+from pydantic import BaseModel
 
 from src.config.agents import AGENT_LLM_MAP
 from src.llms.llm import get_llm_by_type
 from src.prompts.template import apply_prompt_template
 
+logger = logging.getLogger(__name__)
+
+# 已编译代理的缓存上限
+_AGENT_CACHE_SIZE = 32
+# 请求级的工具字段，在调用时通过运行配置注入，不参与指纹计算
+_REQUEST_SCOPED_TOOL_FIELDS = {"resources"}
+_PRIMITIVE_TYPES = (str, int, float, bool, type(None))
+
+_agent_cache: OrderedDict[tuple, object] = OrderedDict()
+
 
 # Create agents using configured LLM types
 def create_agent(agent_name: str, agent_type: str, tools: list, prompt_template: str):
@@ -15,3 +29,50 @@ def create_agent(agent_name: str, agent_type: str, tools: list, prompt_template:
         tools=tools,
         prompt=lambda state: apply_prompt_template(prompt_template, state),
     )
+
+
+def _value_fingerprint(value, depth: int = 0):
+    if isinstance(value, _PRIMITIVE_TYPES):
+        return value
+    if isinstance(value, (list, tuple)) and all(isinstance(item, _PRIMITIVE_TYPES) for item in value):
+        return tuple(value)
+    if isinstance(value, dict) and all(isinstance(item, _PRIMITIVE_TYPES) for item in value.values()):
+        return tuple(sorted(value.items()))
+    if isinstance(value, BaseModel) and depth < 2:
+        return (type(value).__qualname__, _fields_fingerprint(value, depth + 1))
+    # 客户端、密钥等对象不影响工具行为的区分
+    return None
+
+
+def _fields_fingerprint(model: BaseModel, depth: int = 0) -> tuple:
+    return tuple(
+        (name, _value_fingerprint(value, depth))
+        for name, value in sorted(vars(model).items())
+        if name not in _REQUEST_SCOPED_TOOL_FIELDS
+    )
+
+
+def get_tools_fingerprint(tools: list) -> tuple:
+    """工具集指纹：工具类型、名称以及配置参数（不含请求级资源）"""
+    return tuple(
+        (type(tool).__qualname__, tool.name, _fields_fingerprint(tool) if isinstance(tool, BaseModel) else id(tool))
+        for tool in tools
+    )
+
+
+def get_or_create_agent(agent_name: str, agent_type: str, tools: list, prompt_template: str):
+    """从缓存中获取已编译的代理，按代理类型和工具集指纹复用，避免每个步骤重新构建代理图。
+
+    请求级的工具状态（例如 RetrieverTool 的资源）不参与指纹计算，调用代理时通过运行配置注入。
+    """
+    key = (agent_name, agent_type, prompt_template, get_tools_fingerprint(tools))
+    if key in _agent_cache:
+        _agent_cache.move_to_end(key)
+        return _agent_cache[key]
+
+    logger.info(f"编译代理: {agent_name}, 工具: {[tool.name for tool in tools]}")
+    agent = create_agent(agent_name, agent_type, tools, prompt_template)
+    _agent_cache[key] = agent
+    while len(_agent_cache) > _AGENT_CACHE_SIZE:
+        _agent_cache.popitem(last=False)
+    return agent
@@ -14,4 +14,6 @@ AGENT_LLM_MAP: dict[str, LLMType] = {
     "ppt_composer": "basic",
     "prose_writer": "basic",
     "prompt_enhancer": "basic",
+    "step_summarizer": "basic",
+    "report_condenser": "basic",
 }
@@ -21,6 +21,14 @@ class Configuration:
     mcp_settings: dict = None  # MCP settings, including dynamic loaded tools
     report_style: str = ReportStyle.ACADEMIC.value  # Report style
     enable_deep_thinking: bool = False  # Whether to enable deep thinking
+    max_concurrent_steps: int = 3  # Maximum number of plan steps executed in parallel
+    completed_steps_token_budget: int = 4000  # Token budget for completed steps in agent prompts
+    recent_steps_verbatim: int = 2  # Number of most recent completed steps kept verbatim
+    reporter_map_reduce_threshold: int = 24000  # Observation tokens above which the reporter condenses in batches
+    reporter_batch_tokens: int = 6000  # Observation tokens per condensing batch
+    speculative_background_investigation: bool = False  # Run background investigation in parallel with the coordinator
+    enable_plan_prefetch: bool = False  # Prefetch step searches while waiting for plan approval
+    plan_prefetch_token_budget: int = 4000  # Tokens of prefetched results given to each research step
 
     @classmethod
     def from_runnable_config(cls, config: Optional[RunnableConfig] = None):
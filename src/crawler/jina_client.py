@@ -4,6 +4,9 @@ import os
 import requests
 from readabilipy import simple_json_from_html_string
 
+from src.utils.deadline import http_timeout
+from src.utils.resilience import check_response, resilient_call
+
 logger = logging.getLogger(__name__)
 
 
@@ -22,7 +25,9 @@ class JinaClient:
         data = {
             "url": url,
         }
-        response = requests.post("https://r.jina.ai/", headers=headers, json=data)
+        # 上游 5xx / 429 时按依赖的弹性策略重试，熔断后快速失败
+        response = resilient_call("jina", lambda: check_response("jina", requests.post(
+            "https://r.jina.ai/", headers=headers, json=data, timeout=http_timeout(60))))
         return response.text
 
 
@@ -0,0 +1,66 @@
+"""
+每个步骤的代理构建开销基准测试
+
+比较：
+    before: 每个步骤调用 create_agent -> create_react_agent，重新构建代理图、工具 schema 和提示词
+    after:  get_or_create_agent 按代理类型和工具集指纹复用已编译的代理
+
+只测量构建开销，不发起任何 LLM 或搜索请求（模型和搜索工具使用占位的密钥）。
+
+用法：
+    python -m src.demos.agent_pool_benchmark --steps 200
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault("TAVILY_API_KEY", "tvly-benchmark")
+
+from langchain_openai import ChatOpenAI
+
+from src.agents import create_agent, get_or_create_agent
+from src.llms.llm import _llm_cache
+from src.tools.crawl import crawl_tool
+from src.tools.search import LoggedTavilySearch
+
+
+def _researcher_tools():
+    # 与 researcher_node 相同：每个步骤都会新建搜索工具实例
+    return [
+        LoggedTavilySearch(
+            name="web_search",
+            max_results=3,
+            include_raw_content=True,
+            include_images=True,
+            include_image_descriptions=True,
+        ),
+        crawl_tool,
+    ]
+
+
+def _measure(factory, steps: int) -> float:
+    start = time.perf_counter()
+    for _ in range(steps):
+        factory("researcher", "researcher", _researcher_tools(), "researcher")
+    return (time.perf_counter() - start) / steps
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-step ReAct agent setup overhead benchmark")
+    parser.add_argument("--steps", type=int, default=200, help="number of simulated plan steps")
+    args = parser.parse_args()
+
+    # 不依赖 conf.yaml：使用占位的模型实例，构建代理时不会访问网络
+    _llm_cache.setdefault("basic", ChatOpenAI(model="benchmark", api_key="sk-benchmark"))
+
+    tools_only = _measure(lambda *_: None, args.steps)
+    before = _measure(create_agent, args.steps)
+    after = _measure(get_or_create_agent, args.steps)
+    print(f"steps={args.steps}")
+    print(f"tool construction only        {tools_only * 1000:8.3f} ms/step")
+    print(f"before (create_agent)         {before * 1000:8.3f} ms/step")
+    print(f"after  (get_or_create_agent)  {after * 1000:8.3f} ms/step  speedup={before / after:6.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+并发会话基准测试：在线程数受限的单个 worker 中运行真实的研究图
+
+使用 build_graph_with_memory() 编译的图，所有模型替换为本地的 ChatFake（固定的首 token 延迟和生成速度，
+经过与 conf.yaml 相同的模型工厂和调用层）。计划固定为上下文充足，会话经过 协调器 -> 规划器 -> 报告员 三个 LLM 节点
+（仓库中没有研究员和编码员的提示词模板，不执行研究步骤）。
+
+先单独运行一个会话得到单会话耗时，再在不同的线程数下同时运行 N 个会话：节点是异步函数，模型调用只让出事件循环、
+不占用线程池，因此吞吐量不随线程数变化；总耗时超出单会话耗时的部分是图本身在事件循环上的 CPU 开销
+（提示词渲染、状态合并、检查点等）。
+
+用法：
+    python -m src.demos.async_nodes_benchmark --sessions 200 --threads 1 8 --latency 0.5
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import get_args
+
+import src.llms.llm as llm_module
+from src.config.agents import LLMType
+from src.graph.builder import build_graph_with_memory
+
+
+def _install_fake_llms(latency: float, tokens_per_second: float, completion_tokens: int) -> None:
+    """用 ChatFake 替换所有类型的模型，不读取 conf.yaml"""
+    conf = {
+        "provider": "fake",
+        "ttft_seconds": latency,
+        "tokens_per_second": tokens_per_second,
+        "completion_tokens": completion_tokens,
+        "plan_fixture": {
+            "locale": "en-US",
+            "has_enough_context": True,
+            "thought": "The question can be answered from general knowledge.",
+            "title": "Benchmark Plan",
+            "steps": [],
+        },
+    }
+    config_keys = llm_module._get_llm_type_config_keys()
+    for llm_type in get_args(LLMType):
+        llm_module._llm_cache[llm_type] = llm_module._create_llm_use_conf(llm_type, {config_keys[llm_type]: conf})
+
+
+def _session_input(index: int) -> dict:
+    topic = f"What is the market outlook for electric vehicles, question {index}?"
+    return {
+        "messages": [{"role": "user", "content": topic}],
+        "observations": [],
+        "plan_iterations": 0,
+        "current_plan": None,
+        "final_report": "",
+        "auto_accepted_plan": True,
+        "enable_background_investigation": False,
+        "background_investigation_results": None,
+        "partial_result": False,
+        "research_topic": topic,
+    }
+
+
+async def _run_session(graph, index: int) -> None:
+    config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+    state = await graph.ainvoke(_session_input(index), config)
+    assert state.get("final_report"), f"session {index} produced no report"
+
+
+async def _run_sessions(graph, sessions: int, threads: int) -> float:
+    # 限制 worker 的线程数，与服务器部署时的默认线程池一致
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=threads))
+    start = time.perf_counter()
+    await asyncio.gather(*[_run_session(graph, index) for index in range(sessions)])
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent research sessions per worker on the compiled graph")
+    parser.add_argument("--sessions", type=int, default=200, help="concurrent research sessions")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8], help="executor threads of the worker")
+    parser.add_argument("--latency", type=float, default=0.5, help="time to first token of each LLM call (s)")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0,
+                        help="token rate after the first token; 0 emits all tokens at once")
+    parser.add_argument("--completion-tokens", type=int, default=200, help="tokens of each text response")
+    args = parser.parse_args()
+
+    _install_fake_llms(args.latency, args.tokens_per_second, args.completion_tokens)
+    graph = build_graph_with_memory()
+
+    single = asyncio.run(_run_sessions(graph, 1, max(args.threads)))
+    print(f"sessions={args.sessions} llm_latency={args.latency}s single_session={single:.2f}s")
+    for threads in args.threads:
+        elapsed = asyncio.run(_run_sessions(graph, args.sessions, threads))
+        print(f"threads={threads:<4} wall={elapsed:7.2f}s  sessions/s={args.sessions / elapsed:8.2f}  "
+              f"slowdown_vs_single={elapsed / single:6.1f}x")
+
+
+if __name__ == '__main__':
+    main()
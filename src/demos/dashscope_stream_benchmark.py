@@ -0,0 +1,110 @@
+"""
+ChatDashscope 并发异步流式调用基准测试
+
+使用 httpx.MockTransport 模拟 DashScope 兼容接口的 SSE 流（每个分片固定延迟，包含 reasoning_content），
+在线程数受限的单个 worker 中同时运行 N 个流，比较：
+    before: 线程回退，BaseChatModel 默认的 _astream 在线程池中迭代同步的 _stream
+    after:  原生 _astream，使用异步 OpenAI 客户端，只占用事件循环
+
+用法：
+    python -m src.demos.dashscope_stream_benchmark --streams 64 --threads 8 --chunks 20 --latency 0.02
+"""
+import argparse
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import HumanMessage
+
+from src.llms.providers.dashscope import ChatDashscope
+
+
+def _sse_chunks(chunks: int) -> list[bytes]:
+    events = []
+    for index in range(chunks):
+        # 前一半分片是思考内容，后一半是回答内容
+        delta = {"role": "assistant", "content": ""}
+        if index < chunks // 2:
+            delta["reasoning_content"] = f"think{index} "
+        else:
+            delta["content"] = f"token{index} "
+        events.append({
+            "id": "chatcmpl-benchmark",
+            "object": "chat.completion.chunk",
+            "created": 0,
+            "model": "qwen-benchmark",
+            "choices": [{"index": 0, "delta": delta,
+                         "finish_reason": "stop" if index == chunks - 1 else None}],
+        })
+    return [f"data: {json.dumps(event)}\n\n".encode() for event in events] + [b"data: [DONE]\n\n"]
+
+
+def _build_llm(chunks: int, latency: float) -> ChatDashscope:
+    body = _sse_chunks(chunks)
+    headers = {"content-type": "text/event-stream"}
+
+    def sync_stream():
+        for event in body:
+            time.sleep(latency)
+            yield event
+
+    async def async_stream():
+        for event in body:
+            await asyncio.sleep(latency)
+            yield event
+
+    return ChatDashscope(
+        model="qwen-benchmark",
+        api_key="sk-benchmark",
+        base_url="https://dashscope.benchmark/compatible-mode/v1",
+        http_client=httpx.Client(transport=httpx.MockTransport(
+            lambda request: httpx.Response(200, headers=headers, content=sync_stream()))),
+        http_async_client=httpx.AsyncClient(transport=httpx.MockTransport(
+            lambda request: httpx.Response(200, headers=headers, content=async_stream()))),
+    )
+
+
+async def _consume(stream) -> int:
+    reasoning_chunks = 0
+    async for chunk in stream:
+        if chunk.message.additional_kwargs.get("reasoning_content"):
+            reasoning_chunks += 1
+    return reasoning_chunks
+
+
+async def _run_streams(llm: ChatDashscope, streams: int, threads: int, threaded: bool) -> tuple[float, int]:
+    # 限制 worker 的线程数，与服务器部署时的默认线程池一致
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=threads))
+    messages = [HumanMessage(content="benchmark")]
+    start = time.perf_counter()
+    if threaded:
+        results = await asyncio.gather(*[_consume(BaseChatModel._astream(llm, messages)) for _ in range(streams)])
+    else:
+        results = await asyncio.gather(*[_consume(llm._astream(messages)) for _ in range(streams)])
+    return time.perf_counter() - start, sum(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ChatDashscope native async streaming vs threaded fallback")
+    parser.add_argument("--streams", type=int, default=64, help="concurrent streams")
+    parser.add_argument("--threads", type=int, default=8, help="executor threads of the worker")
+    parser.add_argument("--chunks", type=int, default=20, help="chunks per stream")
+    parser.add_argument("--latency", type=float, default=0.02, help="simulated delay per chunk (s)")
+    args = parser.parse_args()
+
+    llm = _build_llm(args.chunks, args.latency)
+    ideal = args.chunks * args.latency
+    print(f"streams={args.streams} threads={args.threads} chunks={args.chunks} "
+          f"chunk_latency={args.latency}s ideal_stream={ideal:.2f}s")
+    for label, threaded in (("before (threaded)", True), ("after (native async)", False)):
+        elapsed, reasoning_chunks = asyncio.run(_run_streams(llm, args.streams, args.threads, threaded))
+        print(f"{label:<22} wall={elapsed:7.2f}s  streams/s={args.streams / elapsed:8.2f}  "
+              f"chunks/s={args.streams * args.chunks / elapsed:9.1f}  reasoning_chunks={reasoning_chunks}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+检查 LLM 响应缓存的异步调用不在事件循环线程中读写 SQLite
+
+异步的 ainvoke / astream（未命中后写入、再次调用命中）期间记录缓存读写所在的线程，
+任何一次在事件循环线程中执行都会阻塞并行的研究步骤。
+
+用法：
+    python -m src.demos.llm_cache_async_check
+"""
+import asyncio
+import os
+import tempfile
+import threading
+
+os.environ["ENABLE_LLM_CACHE"] = "true"
+os.environ.setdefault("LLM_CACHE_PATH", os.path.join(tempfile.mkdtemp(), "llm_cache.db"))
+
+from langchain_core.messages import HumanMessage  # noqa: E402
+
+from src.cache.sqlite_store import SQLiteTTLStore  # noqa: E402
+from src.llms.llm import create_layered_llm_class  # noqa: E402
+from src.llms.providers.fake import ChatFake  # noqa: E402
+from src.llms.response_cache import ResponseCacheMixin, get_llm_response_cache  # noqa: E402
+
+
+def _record_threads(cache: SQLiteTTLStore, calls: list[tuple[str, int]]) -> None:
+    for name in ("get", "set"):
+        method = getattr(cache, name)
+
+        def _wrapped(*args, _name=name, _method=method, **kwargs):
+            calls.append((_name, threading.get_ident()))
+            return _method(*args, **kwargs)
+
+        setattr(cache, name, _wrapped)
+
+
+async def _run(llm) -> int:
+    loop_thread = threading.get_ident()
+    for prompt in ("invoke", "stream"):
+        messages = [HumanMessage(content=f"llm cache async check: {prompt}")]
+        for _ in range(2):
+            if prompt == "invoke":
+                await llm.ainvoke(messages)
+            else:
+                [chunk async for chunk in llm.astream(messages)]
+    return loop_thread
+
+
+def main():
+    calls: list[tuple[str, int]] = []
+    _record_threads(get_llm_response_cache(), calls)
+    llm = create_layered_llm_class(ChatFake, "basic", [ResponseCacheMixin])(
+        ttft_seconds=0, tokens_per_second=0, completion_tokens=5)
+
+    loop_thread = asyncio.run(_run(llm))
+    assert {name for name, _ in calls} == {"get", "set"}, calls
+    on_loop = [name for name, thread in calls if thread == loop_thread]
+    assert not on_loop, f"缓存读写在事件循环线程中执行: {on_loop}"
+    print(f"OK: {len(calls)} 次缓存读写均不在事件循环线程中, 命中统计 {get_llm_response_cache().stats()}")
+
+
+if __name__ == "__main__":
+    main()
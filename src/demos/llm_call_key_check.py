@@ -0,0 +1,55 @@
+"""
+检查 LLM 调用键（响应缓存和合并调用共用）是否稳定
+
+- 两次渲染相同的提示词（add_messages 分配的消息 ID 不同）得到相同的键；
+- 历史消息中模型回复的 ID、response_metadata、usage_metadata 不影响键；
+- 消息内容或绑定的工具不同时键不同。
+
+提示词中的 CURRENT_TIME 按 PROMPT_TIME_GRANULARITY_SECONDS（默认 60 秒）取整，跨过粒度边界的两次请求不会命中缓存，
+本检查固定使用 3600 秒。
+
+用法：
+    python -m src.demos.llm_call_key_check
+"""
+import os
+
+os.environ.setdefault("PROMPT_TIME_GRANULARITY_SECONDS", "3600")
+
+from langchain_core.messages import AIMessage, HumanMessage, convert_to_messages  # noqa: E402
+from langgraph.graph.message import add_messages  # noqa: E402
+
+from src.llms.call_key import make_llm_call_key  # noqa: E402
+from src.llms.providers.fake import ChatFake  # noqa: E402
+from src.prompts.template import apply_prompt_template  # noqa: E402
+
+
+def _render(question: str, reply_id: str, request_id: str, total_tokens: int) -> list:
+    history = add_messages([], [
+        HumanMessage(content=question),
+        AIMessage(content="需要进一步研究", id=reply_id, response_metadata={"id": request_id},
+                  usage_metadata={"input_tokens": total_tokens, "output_tokens": 0, "total_tokens": total_tokens}),
+        HumanMessage(content="请继续"),
+    ])
+    state = {"messages": history, "locale": "zh-CN"}
+    return convert_to_messages(apply_prompt_template("coordinator", state))
+
+
+def main():
+    llm = ChatFake()
+    question = "分析 2025 年全球新能源汽车市场的竞争格局"
+    first = _render(question, "run-1", "req-1", 10)
+    second = _render(question, "run-2", "req-2", 20)
+    assert [message.id for message in first] != [message.id for message in second]
+
+    key = make_llm_call_key(llm, "generate", first, None, {})
+    assert key == make_llm_call_key(llm, "generate", second, None, {}), "相同的提示词得到了不同的键"
+
+    other = _render("分析 2025 年全球储能市场的竞争格局", "run-1", "req-1", 10)
+    assert key != make_llm_call_key(llm, "generate", other, None, {}), "不同的提示词得到了相同的键"
+    assert key != make_llm_call_key(llm, "stream", first, None, {})
+    assert key != make_llm_call_key(llm, "generate", first, None, {"tools": [{"name": "web_search"}]})
+    print(f"OK: {key}")
+
+
+if __name__ == "__main__":
+    main()
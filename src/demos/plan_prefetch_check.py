@@ -0,0 +1,68 @@
+"""
+检查计划审批期间预取的搜索结果被交给执行对应步骤的研究员
+
+审批前以各研究步骤为查询启动预取（human_feedback_node 在中断前的调用），审批后执行步骤，
+检查研究员收到的步骤输入中包含本步骤的预取结果，且不依赖研究员发出与步骤标题完全相同的查询。
+网络搜索由本地的计数工具代替，不发起网络请求。
+
+用法：
+    python -m src.demos.plan_prefetch_check
+"""
+import asyncio
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+from langchain_core.tools import tool
+
+import src.graph.nodes as nodes
+from src.config.configuration import Configuration
+from src.prompts.planner_model import Plan, Step, StepType
+
+searched_queries: list[str] = []
+
+
+@tool
+async def web_search(query: str) -> list[dict]:
+    """Search the web."""
+    searched_queries.append(query)
+    await asyncio.sleep(0.05)
+    return [{"url": f"https://example.com/{len(searched_queries)}", "content": f"PREFETCHED RESULT FOR {query}"}]
+
+
+def _plan() -> Plan:
+    return Plan(locale="en-US", has_enough_context=False, thought="", title="EV market research", steps=[
+        Step(need_search=True, title=f"EV market aspect {index}", description=f"Collect data on aspect {index}.",
+             step_type=StepType.RESEARCH)
+        for index in range(3)
+    ] + [Step(need_search=False, title="Compare the aspects", description="Analyse.", step_type=StepType.PROCESSING)])
+
+
+async def main():
+    nodes.get_web_search_tool = lambda max_search_results: web_search
+    plan = _plan()
+    config = {"configurable": {"thread_id": "plan-prefetch-check", "enable_plan_prefetch": True}}
+    state = {"current_plan": plan, "locale": "en-US", "resources": []}
+
+    # 审批前启动预取：只预取需要搜索的研究步骤
+    nodes._start_plan_prefetch(plan, state, config, Configuration.from_runnable_config(config))
+    inputs: list[str] = []
+
+    async def researcher(agent_input: dict) -> dict:
+        inputs.append("\n".join(message.content for message in agent_input["messages"]))
+        return {"messages": [AIMessage(content="step done")]}
+
+    # 审批后依次执行研究步骤，研究员本身不调用搜索工具
+    for index, step in enumerate(plan.steps[:3]):
+        await nodes._execute_agent_step({**state, "current_step_index": index}, config,
+                                        RunnableLambda(researcher), "researcher")
+
+    assert sorted(searched_queries) == [step.title for step in plan.steps[:3]], searched_queries
+    for step, step_input in zip(plan.steps, inputs):
+        assert f"PREFETCHED RESULT FOR {step.title}" in step_input, f"步骤 '{step.title}' 没有收到预取结果"
+        others = [other.title for other in plan.steps[:3] if other is not step]
+        assert not any(f"PREFETCHED RESULT FOR {title}\"" in step_input for title in others)
+    print(f"OK: {len(inputs)} 个研究步骤使用了预取结果，共 {len(searched_queries)} 次搜索")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
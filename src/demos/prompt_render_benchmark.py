@@ -0,0 +1,124 @@
+"""
+每轮代理调用的提示词渲染开销基准测试
+
+比较：
+    before: 每轮查找模板，用 dataclasses.asdict 转换整个 Configuration，并把整个图状态（全部消息、观察结果）展开到渲染上下文
+    after:  apply_prompt_template 使用启动时预编译的模板，只传入模板声明的变量，变量不变时复用已渲染的系统提示
+
+模拟 ReAct 代理的多轮调用：每轮状态中增加一条工具消息和一条观察结果，模板变量保持不变。
+
+系统提示中的 CURRENT_TIME 按 PROMPT_TIME_GRANULARITY_SECONDS 取整，时间跨过粒度边界时需要重新渲染。
+--seconds-per-turn 模拟每轮之间经过的时间（不实际等待），用于评估粒度设置对复用率的影响，
+例如默认 60 秒的粒度下每轮间隔 5 秒时大约每 12 轮重新渲染一次。
+前缀缓存布局（ENABLE_PROMPT_PREFIX_CACHE=true）的系统提示不包含时间，不受粒度影响。
+
+用法：
+    python -m src.demos.prompt_render_benchmark --turns 200 --template reporter
+    PROMPT_TIME_GRANULARITY_SECONDS=1 python -m src.demos.prompt_render_benchmark --seconds-per-turn 5
+"""
+import argparse
+import dataclasses
+import time
+from datetime import datetime, timedelta
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+import src.prompts.template as template_module
+from src.config.configuration import Configuration
+from src.prompts.template import (
+    apply_prompt_template,
+    env,
+    get_current_time,
+    get_prompt_render_stats,
+    get_time_granularity,
+    is_prefix_cache_layout,
+)
+
+
+class _SimulatedClock(datetime):
+    """get_current_time 使用的时钟，按轮次推进模拟的时间"""
+
+    offset_seconds = 0.0
+
+    @classmethod
+    def now(cls, tz=None):
+        return datetime.now(tz) + timedelta(seconds=cls.offset_seconds)
+
+
+def _legacy_apply_prompt_template(prompt_name: str, state: dict, configurable: Configuration = None) -> list:
+    """优化前的实现"""
+    state_vars = {
+        "CURRENT_TIME": get_current_time(),
+        **state,
+    }
+    if configurable:
+        state_vars.update(dataclasses.asdict(configurable))
+    template = env.get_template(f"{prompt_name}.md")
+    system_prompt = template.render(**state_vars)
+    return [{"role": "system", "content": system_prompt}] + state["messages"]
+
+
+def _build_states(turns: int) -> list[dict]:
+    messages = [HumanMessage(content="分析 2025 年全球新能源汽车市场的竞争格局")]
+    observations = []
+    states = []
+    for turn in range(turns):
+        messages = messages + [
+            AIMessage(content="", tool_calls=[{"name": "web_search", "args": {"query": f"query {turn}"}, "id": f"call_{turn}"}]),
+            ToolMessage(content=f"search result {turn} " * 200, tool_call_id=f"call_{turn}"),
+        ]
+        observations = observations + [f"observation {turn} " * 100]
+        states.append({
+            "messages": messages,
+            "observations": observations,
+            "locale": "zh-CN",
+            "research_topic": "新能源汽车市场",
+            "remaining_steps": 25 - turn % 25,
+        })
+    return states
+
+
+def _measure(apply, template: str, states: list[dict], configurable: Configuration,
+             seconds_per_turn: float = 0.0) -> float:
+    template_module.datetime = _SimulatedClock
+    try:
+        start = time.perf_counter()
+        for turn, state in enumerate(states):
+            _SimulatedClock.offset_seconds = turn * seconds_per_turn
+            apply(template, state, configurable)
+        return (time.perf_counter() - start) / len(states)
+    finally:
+        template_module.datetime = datetime
+        _SimulatedClock.offset_seconds = 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-turn prompt render cost benchmark")
+    parser.add_argument("--turns", type=int, default=200, help="number of simulated agent turns")
+    parser.add_argument("--template", default="reporter", help="prompt template to render")
+    parser.add_argument("--seconds-per-turn", type=float, default=0.0,
+                        help="simulated time between turns, to see the effect of PROMPT_TIME_GRANULARITY_SECONDS")
+    args = parser.parse_args()
+
+    states = _build_states(args.turns)
+    configurable = Configuration(mcp_settings={"servers": {f"server{i}": {"transport": "stdio"} for i in range(10)}})
+
+    # 两种实现渲染出相同的系统提示（前缀缓存布局下时间移到运行时上下文消息中）
+    assert is_prefix_cache_layout() or (
+        _legacy_apply_prompt_template(args.template, states[0], configurable)[0]
+        == apply_prompt_template(args.template, states[0], configurable)[0]
+    )
+
+    before = _measure(_legacy_apply_prompt_template, args.template, states, configurable, args.seconds_per_turn)
+    render_stats = get_prompt_render_stats()
+    after = _measure(apply_prompt_template, args.template, states, configurable, args.seconds_per_turn)
+    hits = get_prompt_render_stats()["hits"] - render_stats["hits"]
+    print(f"template={args.template} turns={args.turns} seconds_per_turn={args.seconds_per_turn} "
+          f"time_granularity={get_time_granularity()}s prefix_cache_layout={is_prefix_cache_layout()}")
+    print(f"before (asdict + full state)   {before * 1000:8.3f} ms/turn")
+    print(f"after  (declared vars, cached) {after * 1000:8.3f} ms/turn  speedup={before / after:6.1f}x  "
+          f"reused={hits}/{len(states)}")
+
+
+if __name__ == '__main__':
+    main()
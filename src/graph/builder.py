@@ -1,40 +1,78 @@
 import logging
 
-from langgraph.checkpoint.memory import MemorySaver
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, START, END
+from langgraph.types import Send
 
+from src.config.configuration import Configuration
+from src.graph.checkpoint import build_checkpointer
 from src.graph.nodes import coordinator_node, planner_node, human_feedback_node, research_team_node, \
     background_investigation_node, researcher_node, coder_node, reporter_node
 from src.graph.types import State
-from src.prompts.planner_model import StepType
+from src.prompts.planner_model import Plan, StepType
 
 logger = logging.getLogger(__name__)
 
 
-def continue_to_running_research_team(state: State):
-    """继续运行研究团队节点"""
+# 步骤类型 -> 执行节点
+_STEP_TYPE_NODES = {
+    StepType.RESEARCH: "researcher",
+    StepType.PROCESSING: "coder",
+}
+
+
+def _get_runnable_steps(current_plan: Plan, max_concurrent_steps: int) -> list[int]:
+    """获取当前可以并行执行的步骤索引
+
+    研究步骤之间相互独立，可以并行执行；处理步骤依赖之前所有步骤的结果，只能单独执行。
+    """
+    runnable_steps = []
+    for index, step in enumerate(current_plan.steps):
+        if step.execution_res:
+            continue
+        if step.step_type == StepType.PROCESSING:
+            # 处理步骤需要等待之前的步骤全部完成
+            if not runnable_steps:
+                runnable_steps.append(index)
+            break
+        runnable_steps.append(index)
+        if len(runnable_steps) >= max_concurrent_steps:
+            break
+    return runnable_steps
+
+
+def continue_to_running_research_team(state: State, config: RunnableConfig):
+    """继续运行研究团队节点：将当前可以执行的步骤并行分发给研究员和编码员"""
     current_plan = state.get('current_plan', '')
+    if state.get("partial_result"):
+        # 请求截止时间已到，使用已有的观察生成报告
+        logger.info("研究团队 请求截止时间已到，移交给报告员。")
+        return "reporter"
     if not current_plan or not current_plan.steps:
         logger.info("当前计划为空，需要移交给规划者。")
         return "planner"
     if all(step.execution_res for step in current_plan.steps):
         # 所有步骤都已执行，移交给规划者
         return "planner"
-    incomplete_step = None  # 未完成step
-    for step in current_plan.steps:
-        if not step.execution_res:
-            incomplete_step = step
-            break
 
-    if not incomplete_step:
+    configurable = Configuration.from_runnable_config(config)
+    max_concurrent_steps = max(1, int(configurable.max_concurrent_steps))
+    runnable_steps = [
+        index for index in _get_runnable_steps(current_plan, max_concurrent_steps)
+        if current_plan.steps[index].step_type in _STEP_TYPE_NODES
+    ]
+    if not runnable_steps:
         return "planner"
-    # 研究步骤，移交给研究团队
-    if incomplete_step.step_type == StepType.RESEARCH:
-        return "research_team"
-    # 编码步骤，移交给编码团队
-    if incomplete_step.step_type == StepType.PROCESSING:
-        return "coder"
-    return "planner"
+
+    logger.info(f"研究团队 并行执行步骤: {runnable_steps}")
+    # 研究步骤移交给研究员，编码步骤移交给编码员
+    return [
+        Send(
+            _STEP_TYPE_NODES[current_plan.steps[index].step_type],
+            {**state, "current_step_index": index},
+        )
+        for index in runnable_steps
+    ]
 
 
 def _build_base_graph():
@@ -53,14 +91,15 @@ def _build_base_graph():
     builder.add_conditional_edges(
         "research_team",
         continue_to_running_research_team,
-        ["planner", "researcher", "coder"],
+        ["planner", "researcher", "coder", "reporter"],
     )
     builder.add_edge("reporter", END)
     return builder
 
 
 def build_graph_with_memory():
-    memory = MemorySaver()
+    # 检查点保存器由配置选择：内存或本地 SQLite
+    memory = build_checkpointer()
     builder = _build_base_graph()
 
     return builder.compile(checkpointer=memory)
@@ -1,2 +1,38 @@
+import logging
+
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import MemorySaver
+
+from src.config.configuration import get_bool_env, get_str_env, get_int_env
+from src.graph.sqlite_saver import SQLiteCheckpointSaver
+
+logger = logging.getLogger(__name__)
+
+
 def chat_stream_message(thread_id: str, message: str, finish_reason: str):
     pass
+
+
+def build_checkpointer() -> BaseCheckpointSaver:
+    """根据环境变量配置创建检查点保存器
+
+    LANGGRAPH_CHECKPOINT_SAVER=true 且 LANGGRAPH_CHECKPOINT_DB_URL 为 sqlite:///<path> 时使用 SQLite 持久化，
+    否则使用内存保存器。
+    """
+    db_url = get_str_env("LANGGRAPH_CHECKPOINT_DB_URL", "")
+    if not get_bool_env("LANGGRAPH_CHECKPOINT_SAVER", False) or not db_url:
+        return MemorySaver()
+
+    if db_url.startswith("sqlite:///"):
+        db_path = db_url[len("sqlite:///"):]
+        logger.info(f"使用 SQLite 检查点保存器: {db_path}")
+        flush_interval_ms = get_int_env("LANGGRAPH_CHECKPOINT_FLUSH_INTERVAL_MS", 1000)
+        return SQLiteCheckpointSaver(
+            db_path,
+            cache_size=get_int_env("LANGGRAPH_CHECKPOINT_CACHE_SIZE", 128),
+            batch_size=get_int_env("LANGGRAPH_CHECKPOINT_BATCH_SIZE", 64),
+            flush_interval=flush_interval_ms / 1000,
+        )
+
+    logger.warning(f"不支持的检查点数据库: {db_url}，使用内存保存器。")
+    return MemorySaver()
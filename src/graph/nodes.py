@@ -1,27 +1,51 @@
+import asyncio
+import hashlib
 import json
 import logging
 import os
-from typing import Annotated, Literal
+import time
+import uuid
+from typing import Annotated, Literal, Optional
 
 from langchain_core.messages import HumanMessage, AIMessage
 from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import tool
+from langgraph.config import get_stream_writer
 from langgraph.types import Command, interrupt
+from pydantic import ValidationError
 
-from src.agents import create_agent
+from src.agents import get_or_create_agent
 from src.config.agents import AGENT_LLM_MAP
-from src.config.configuration import Configuration
+from src.config.configuration import Configuration, _TRUTHY
 from src.config.tools import SELECTED_SEARCH_ENGINE, SearchEngine
 
+from src.graph.report_condenser import condense_observations
+from src.graph.research_cache import (
+    get_cached_research,
+    make_research_cache_key,
+    set_cached_research,
+    stream_cached_report,
+)
+from src.graph.step_context import build_completed_steps_info, get_steps_to_summarize, summarize_findings
 from src.graph.types import State
 from src.llms.llm import get_llm_by_type
-from src.prompts.planner_model import Plan, StepType
+from src.prompts.planner_model import Plan, Step, StepType
 from src.prompts.template import apply_prompt_template
 from src.tools.crawl import crawl_tool
+from src.tools.prefetch import (
+    aget_step_prefetch,
+    drop_prefetch,
+    format_prefetched_results,
+    get_thread_id,
+    start_plan_prefetch,
+)
 from src.tools.python_repl import python_repl_tool
 from src.tools.retriever import get_retriever_tool
 from src.tools.search import LoggedTavilySearch, get_web_search_tool
-from src.utils.json_utils import repair_json_output
+from src.utils.deadline import DeadlineExceeded, is_expired, run_with_deadline
+from src.utils.json_utils import IncrementalJsonArrayParser, parse_json_output
+from src.utils.resilience import CircuitOpenError
+from src.utils.token_utils import count_tokens
 
 logger = logging.getLogger(__name__)
 
@@ -36,43 +60,86 @@ def handoff_to_planner(
     return
 
 
-def research_team_node(state: State):
+async def research_team_node(state: State, config: RunnableConfig):
     """研究团队节点：执行计划的专业智能体集合：。
         研究员：使用网络搜索引擎、爬虫甚至 MCP 服务等工具进行网络搜索和信息收集。
         编码员：使用 Python REPL 工具处理代码分析、执行和技术任务。 每个智能体都可以访问针对其角色优化的特定工具，并在 LangGraph 框架内运行
+
+    并行执行的步骤结果先写入 step_results，由本节点汇总到计划步骤的 execution_res 和 observations 中。
+    已完成步骤超出上下文预算时，在这里一次性压缩较早的发现，供后续步骤复用。
     """
     logger.info("研究团队正在协同处理任务。")
-    pass
+    step_results = state.get("step_results") or {}
+    current_plan = state.get("current_plan")
+    expired = is_expired(config)
+    if expired:
+        logger.warning("研究团队 请求截止时间已到，使用已有的观察生成报告.")
+    if not step_results or not isinstance(current_plan, Plan):
+        return {"partial_result": True} if expired else None
+
+    current_plan = current_plan.model_copy(deep=True)
+    observations = list(state.get("observations", []))
+    for index in sorted(step_results):
+        current_plan.steps[index].execution_res = step_results[index]
+        observations.append(step_results[index])
+    logger.info(f"研究团队 汇总步骤结果: {sorted(step_results)}")
+
+    update = {
+        "current_plan": current_plan,
+        "observations": observations,
+        # 清空已汇总的步骤结果
+        "step_results": None,
+    }
+    if expired:
+        update["partial_result"] = True
+        return update
+
+    if not all(step.execution_res for step in current_plan.steps):
+        configurable = Configuration.from_runnable_config(config)
+        step_summaries = state.get("step_summaries") or {}
+        steps_to_summarize = get_steps_to_summarize(
+            [step for step in current_plan.steps if step.execution_res],
+            step_summaries,
+            int(configurable.completed_steps_token_budget),
+            int(configurable.recent_steps_verbatim),
+        )
+        if steps_to_summarize:
+            logger.info(f"研究团队 压缩较早步骤的发现: {[step.title for step in steps_to_summarize]}")
+            new_summaries = await summarize_findings(steps_to_summarize, state.get("locale", "en-US"))
+            update["step_summaries"] = {**step_summaries, **new_summaries}
+
+    return update
 
 
 async def _execute_agent_step(
-        state: State, agent, agent_name: str
+        state: State, config: RunnableConfig, agent, agent_name: str
 ) -> Command[Literal["research_team"]]:
     current_plan = state.get('current_plan')
     plan_title = current_plan.title
-    observations = state.get("observations", [])
-
-    current_step = None
-    completed_steps = []
-    for step in current_plan.steps:
-        if not step.execution_res:
-            current_step = step
-            break
-        else:
-            completed_steps.append(step)
 
-    if not current_step:
+    # 并行分发时由 research_team 指定步骤索引，否则执行第一个未完成的步骤
+    step_index = state.get("current_step_index")
+    if step_index is None:
+        step_index = next(
+            (index for index, step in enumerate(current_plan.steps) if not step.execution_res), None
+        )
+    if step_index is None:
         return Command(goto='research_team')
 
-    completed_steps_info = ""
-    if completed_steps:
-        completed_steps_info = "# Completed Research Steps\n\n"
-        for i, step in enumerate(completed_steps):
-            completed_steps_info += f"## Completed Step {i + 1}: {step.title}\n\n"
-            completed_steps_info += f"<finding>\n{step.execution_res}\n</finding>\n\n"
+    current_step = current_plan.steps[step_index]
+    completed_steps = [step for step in current_plan.steps if step.execution_res]
+
+    # 在 token 预算内构建已完成步骤的上下文，较早的发现使用缓存的摘要
+    configurable = Configuration.from_runnable_config(config)
+    completed_steps_info = build_completed_steps_info(
+        completed_steps,
+        state.get("step_summaries") or {},
+        int(configurable.completed_steps_token_budget),
+        int(configurable.recent_steps_verbatim),
+    )
 
     agent_input = {
-        'message': [
+        'messages': [
             HumanMessage(
                 content=f"# Research Topic\n\n{plan_title}\n\n{completed_steps_info}# Current Step\n\n## Title\n\n{current_step.title}\n\n## Description\n\n{current_step.description}\n\n## Locale\n\n{state.get('locale', 'en-US')}"
             )
@@ -92,6 +159,19 @@ async def _execute_agent_step(
                             + "您必须使用**local_search_tool**从资源文件中检索信息。",
                 )
             )
+        # 计划审批期间以该步骤为查询预取的搜索和检索结果，直接交给执行该步骤的研究员
+        try:
+            prefetched = await run_with_deadline(aget_step_prefetch(get_thread_id(config), current_step.title), config)
+        except DeadlineExceeded:
+            prefetched = []
+        if prefetched:
+            agent_input["messages"].append(
+                HumanMessage(
+                    content="# Prefetched Search Results\n\n"
+                            + "以下结果在计划审批期间针对当前步骤预先检索，请优先使用，只对缺失的信息再次搜索。\n\n"
+                            + format_prefetched_results(prefetched, int(configurable.plan_prefetch_token_budget)),
+                )
+            )
     # 递归限制
     default_recursion_limit = 25
     try:
@@ -115,13 +195,22 @@ async def _execute_agent_step(
         recursion_limit = default_recursion_limit
 
     logger.info(f"Agent input: {agent_input}")
-    result = await agent.ainvoke(
-        input=agent_input, config={"recursion_limit": recursion_limit}
-    )
+    # 请求级资源通过运行配置注入到复用的代理工具中
+    try:
+        result = await run_with_deadline(agent.ainvoke(
+            input=agent_input,
+            config={
+                "recursion_limit": recursion_limit,
+                "configurable": {**config.get("configurable", {}), "resources": state.get("resources", [])},
+            },
+        ), config)
+    except DeadlineExceeded:
+        # 取消未完成的代理调用（包括其中的工具调用），由 research_team 跳转到报告节点
+        logger.warning(f"Step '{current_step.title}' cancelled: request deadline exceeded")
+        return Command(goto="research_team")
     response_content = result["messages"][-1].content
     logger.debug(f"{agent_name.capitalize()} full response: {response_content}")
 
-    current_step.execution_res = response_content
     logger.info(f"Step '{current_step.title}' execution completed by {agent_name}")
 
     return Command(
@@ -132,8 +221,8 @@ async def _execute_agent_step(
                     name=agent_name,
                 )
             ],
-            # 观察结果
-            "observations": observations + [response_content],
+            # 步骤结果，由 research_team 节点汇总到计划和观察中
+            "step_results": {step_index: response_content},
         },
         goto="research_team",
     )
@@ -163,8 +252,9 @@ async def _setup_and_execute_agent_step(state: State, config: RunnableConfig, ag
         # TODO
         pass
 
-    agent = create_agent(agent_type, agent_type, default_tools, agent_type)
-    return await _execute_agent_step(state, agent, agent_type)
+    # 复用按工具集指纹缓存的已编译代理
+    agent = get_or_create_agent(agent_type, agent_type, default_tools, agent_type)
+    return await _execute_agent_step(state, config, agent, agent_type)
 
 
 async def researcher_node(state: State, config: RunnableConfig):
@@ -200,7 +290,7 @@ async def coder_node(
     )
 
 
-def reporter_node(state: State, config: RunnableConfig):
+async def reporter_node(state: State, config: RunnableConfig):
     """
     报告员：研究输出的最终阶段处理器
         汇总研究团队的发现
@@ -209,12 +299,28 @@ def reporter_node(state: State, config: RunnableConfig):
     """
     logger.info("报告节点 开始.")
     configurable = Configuration.from_runnable_config(config)
+    # 研究阶段已结束，释放预取结果
+    drop_prefetch(get_thread_id(config))
     current_plan = state.get('current_plan', '')
 
+    if state.get("research_cache_hit"):
+        # 命中研究结果缓存：直接流式推送缓存的报告
+        logger.info("报告节点 命中研究结果缓存，推送缓存的报告.")
+        final_report = state.get("final_report", "")
+        stream_cached_report(get_stream_writer(), final_report, f"cached-report-{uuid.uuid4()}")
+        return {"final_report": final_report}
+
+    if isinstance(current_plan, Plan):
+        task_title, task_description = current_plan.title, current_plan.thought
+    else:
+        # 截止时间到达或计划解析失败时可能还没有结构化的计划
+        task_title, task_description = state.get("research_topic", ""), ""
+    partial_result = state.get("partial_result", False)
+
     _input = {
         'messages': [
             HumanMessage(
-                f"# Research Requirements\n\n## Task\n\n{current_plan.title}\n\n## Description\n\n{current_plan.thought}")
+                f"# Research Requirements\n\n## Task\n\n{task_title}\n\n## Description\n\n{task_description}")
         ],
         "locale": state.get("locale", "en-US"),
     }
@@ -243,47 +349,135 @@ def reporter_node(state: State, config: RunnableConfig):
         content="IMPORTANT: Structure your report according to the format in the prompt. Remember to include:\n\n1. Key Points - A bulleted list of the most important findings\n2. Overview - A brief introduction to the topic\n3. Detailed Analysis - Organized into logical sections\n4. Survey Note (optional) - For more comprehensive reports\n5. Key Citations - List all references at the end\n\nFor citations, DO NOT include inline citations in the text. Instead, place all citations in the 'Key Citations' section at the end using the format: `- [Source Title](URL)`. Include an empty line between each citation for better readability.\n\nPRIORITIZE USING MARKDOWN TABLES for data presentation and comparison. Use tables whenever presenting comparative data, statistics, features, or options. Structure tables with clear headers and aligned columns. Example table format:\n\n| Feature | Description | Pros | Cons |\n|---------|-------------|------|------|\n| Feature 1 | Description 1 | Pros 1 | Cons 1 |\n| Feature 2 | Description 2 | Pros 2 | Cons 2 |",
         name="system"
     ))
-    for observation in observations:
-        invoke_messages.append(
-            HumanMessage(
-                content=f"Below are some observations for the research task:\n\n{observation}",
-                name="observation",
-            )
+    if partial_result:
+        invoke_messages.append(HumanMessage(
+            content="IMPORTANT: The research was stopped early because the request deadline was reached. Write the report from the observations available and state clearly that it is based on partial findings.",
+            name="system"
+        ))
+    observation_tokens = sum(count_tokens(observation) for observation in observations)
+    if observation_tokens > int(configurable.reporter_map_reduce_threshold):
+        # 观察过多时先分批并发压缩为笔记，再基于笔记撰写报告
+        logger.info(f"报告节点 观察共 {observation_tokens} tokens，启用 map-reduce 报告模式")
+        notes = await condense_observations(
+            observations,
+            task_title,
+            state.get("locale", "en-US"),
+            int(configurable.reporter_batch_tokens),
         )
+        for note in notes:
+            invoke_messages.append(
+                HumanMessage(
+                    content=f"Below are condensed research notes with citations for the research task:\n\n{note}",
+                    name="observation",
+                )
+            )
+    else:
+        for observation in observations:
+            invoke_messages.append(
+                HumanMessage(
+                    content=f"Below are some observations for the research task:\n\n{observation}",
+                    name="observation",
+                )
+            )
 
     logger.debug(f"Current invoke messages: {invoke_messages}")
-    response = get_llm_by_type(AGENT_LLM_MAP["reporter"]).invoke(invoke_messages)
-    response_content = response.content
+    # 流式生成报告，token 通过图的 messages 流模式实时推送给客户端
+    start_time = time.perf_counter()
+    response_content = ""
+    async for chunk in get_llm_by_type(AGENT_LLM_MAP["reporter"]).astream(invoke_messages):
+        if not response_content and chunk.content:
+            logger.info(f"报告节点 首个 token 耗时: {time.perf_counter() - start_time:.2f}s")
+        response_content += chunk.content
+    logger.info(f"报告节点 生成报告耗时: {time.perf_counter() - start_time:.2f}s")
     logger.info(f"reporter response: {response_content}")
 
+    if partial_result:
+        return {"final_report": response_content, "partial_result": True}
+
+    if isinstance(current_plan, Plan):
+        # SQLite 读写不在事件循环中执行
+        await asyncio.to_thread(
+            set_cached_research,
+            make_research_cache_key(
+                state.get("research_topic", ""),
+                state.get("locale", "en-US"),
+                configurable.report_style,
+                configurable.max_step_num,
+            ),
+            current_plan.model_dump(),
+            observations,
+            response_content,
+        )
+
     return {"final_report": response_content}
 
 
-def human_feedback_node(state: State, config: RunnableConfig):
+def needs_plan_approval(state: State) -> bool:
+    """未开启自动接受计划时，计划需要用户在 human_feedback 中审批"""
+    return not state.get("auto_accepted_plan", False)
+
+
+def _load_plan(current_plan: Plan | str) -> Plan:
+    """规划器直接保存 Plan 对象；旧检查点中的计划是 JSON 文本"""
+    if isinstance(current_plan, Plan):
+        return current_plan
+    return Plan.model_validate(parse_json_output(current_plan))
+
+
+def _start_plan_prefetch(plan: Plan, state: State, config: RunnableConfig, configurable: Configuration):
+    """以待审批计划中研究步骤的标题为查询，后台执行网络搜索和 RAG 检索，结果在执行该步骤时交给研究员"""
+    step_queries = {step.title: step.title for step in plan.steps
+                    if step.step_type == StepType.RESEARCH and step.need_search}
+    if not step_queries:
+        return
+    tools = [get_web_search_tool(configurable.max_search_results)]
+    retriever_tool = get_retriever_tool(state.get("resources", []))
+    if retriever_tool:
+        tools.append(retriever_tool)
+    plan_key = hashlib.sha1("\n".join([plan.title, *step_queries]).encode("utf-8")).hexdigest()
+    start_plan_prefetch(get_thread_id(config), plan_key, step_queries, tools,
+                        {"configurable": {"resources": state.get("resources", [])}})
+
+
+async def human_feedback_node(state: State, config: RunnableConfig):
     # -> Command[Literal["planner", "research_team", "reporter", "__end__"]]
     """
     人类反馈节点：用于接收用户反馈并更新状态"""
     logger.info("人类反馈节点 开始.")
     current_plan = state.get('current_plan', '')
-    auto_accepted_plan = state.get("auto_accepted_plan", False)
-    if auto_accepted_plan:
+    if needs_plan_approval(state):
+        configurable = Configuration.from_runnable_config(config)
+        if _as_bool(configurable.enable_plan_prefetch) and not state.get("research_cache_hit"):
+            # 等待用户审批期间预取计划步骤的搜索结果
+            try:
+                _start_plan_prefetch(_load_plan(current_plan), state, config, configurable)
+            except (json.JSONDecodeError, ValidationError) as e:
+                logger.warning(f"人类反馈节点 无法解析待审批计划，跳过预取: {e}")
         feedback = interrupt("请审阅该计划。")
         logger.info(f"人类反馈节点 收到反馈: {feedback}")
         if feedback and str(feedback).upper().startswith("[EDIT_PLAN]"):
             # 如果反馈未被接受，并编辑了计划，则返回计划节点。
-            return Command(update={"messages": [HumanMessage(content=feedback, name="feedback")]}, goto="planner")
+            drop_prefetch(get_thread_id(config))
+            update = {"messages": [HumanMessage(content=feedback, name="feedback")]}
+            if state.get("research_cache_hit"):
+                # 编辑缓存的计划后重新研究，不再使用缓存的观察和报告
+                update.update({"research_cache_hit": False, "observations": [], "final_report": ""})
+            return Command(update=update, goto="planner")
         elif feedback and str(feedback).upper().startswith("[ACCEPTED]"):
             logger.info("人类反馈节点 计划已被接受.")
         else:
             raise TypeError(f"人类反馈节点 未知反馈类型: {feedback}")
 
+    if state.get("research_cache_hit"):
+        # 缓存的计划已被接受，直接推送缓存的报告
+        return Command(goto="reporter")
+
     # 计划的迭代次数
     plan_iterations = state.get('plan_iterations', 0)
     goto = "research_team"
     try:
-        current_plan = repair_json_output(current_plan)
         plan_iterations += 1
-        new_plan = json.loads(current_plan)
+        new_plan = _load_plan(current_plan)
     except Exception as e:
         logger.error(f"人类反馈节点 未知反馈类型: {e}")
         if plan_iterations > 1:
@@ -293,12 +487,45 @@ def human_feedback_node(state: State, config: RunnableConfig):
             # 计划的迭代次数未超过1次，返回结束节点
             return Command(goto="__end__")
 
-    return Command(update={"current_plan": Plan.model_validate(new_plan),
+    return Command(update={"current_plan": new_plan,
                            "plan_iterations": plan_iterations,
-                           "locale": new_plan["locale"], }, goto=goto)
+                           "locale": new_plan.locale, }, goto=goto)
 
 
-def planner_node(state: State, config: RunnableConfig):
+def _emit_plan_step(writer, index: int, step: dict, plan_iterations: int) -> None:
+    """计划步骤一旦完整就推送给客户端，不必等待整个计划生成完毕"""
+    try:
+        Step.model_validate(step)
+    except ValidationError as e:
+        logger.debug(f"规划器 步骤 {index} 不完整，跳过推送: {e}")
+        return
+    writer({"event": "plan_step", "index": index, "step": step, "plan_iterations": plan_iterations})
+
+
+async def _generate_plan(llm, messages, configurable: Configuration, plan_iterations: int = 0
+                         ) -> tuple[Optional[Plan], str]:
+    """生成计划，返回 (结构化输出的计划, 模型输出文本)；流式输出时计划为 None，由调用方解析文本"""
+    writer = get_stream_writer()
+    if AGENT_LLM_MAP["planner"] == "basic" and not configurable.enable_deep_thinking:
+        # 非深度思考：结构化输出直接得到 Plan 对象
+        plan = await llm.ainvoke(messages)
+        for index, step in enumerate(plan.steps):
+            _emit_plan_step(writer, index, step.model_dump(exclude_none=True), plan_iterations)
+        return plan, plan.model_dump_json(indent=4, exclude_none=True)
+
+    # 深度思考：边生成边解析，每个步骤完整后立即推送
+    full_response = ""
+    parser = IncrementalJsonArrayParser("steps")
+    step_count = 0
+    async for chunk in llm.astream(messages):
+        full_response += chunk.content
+        for step in parser.feed(chunk.content):
+            _emit_plan_step(writer, step_count, step, plan_iterations)
+            step_count += 1
+    return None, full_response
+
+
+async def planner_node(state: State, config: RunnableConfig):
     # -> Command[Literal["human_feedback", "reporter"]]:
     """规划器：负责任务分解和规划的战略组件
     分析研究目标并创建结构化执行计划
@@ -338,31 +565,27 @@ def planner_node(state: State, config: RunnableConfig):
         logger.info("规划器 达到最大迭代次数-> reporter.")
         return Command(goto='reporter')
 
-    full_response = ""
-    if AGENT_LLM_MAP["planner"] == "basic" and not configurable.enable_deep_thinking:
-        # 非深度思考
-        response = llm.invoke(messages)
-        full_response = response.model_dump_json(indent=4, exclude_none=True)
-    else:
-        # 深度思考
-        response = llm.stream(messages)
-        for chunk in response:
-            full_response += chunk.content
+    try:
+        new_plan, full_response = await run_with_deadline(
+            _generate_plan(llm, messages, configurable, plan_iterations), config)
+    except DeadlineExceeded:
+        logger.warning("规划器 请求截止时间已到, 跳转: reporter")
+        return Command(update={"partial_result": True}, goto="reporter")
     logger.info(f"规划器 响应: {full_response}")
 
-    try:
-        # 解析规划器响应
-        curr_plan = json.loads(repair_json_output(full_response))
-    except json.JSONDecodeError as e:
-        if plan_iterations > 0:
-            logger.warning(f"规划器 解析响应失败 结束, 跳转: reporter: {e}")
-            return Command(goto="reporter")
-        else:
-            logger.warning(f"规划器 解析响应失败 结束, 跳转: __end__: {e}")
-            return Command(goto="__end__")
+    if new_plan is None:
+        try:
+            # 解析规划器响应：严格解析失败时才修复
+            new_plan = Plan.model_validate(parse_json_output(full_response))
+        except (json.JSONDecodeError, ValidationError) as e:
+            if plan_iterations > 0:
+                logger.warning(f"规划器 解析响应失败 结束, 跳转: reporter: {e}")
+                return Command(goto="reporter")
+            else:
+                logger.warning(f"规划器 解析响应失败 结束, 跳转: __end__: {e}")
+                return Command(goto="__end__")
     # 检查规划器响应是否包含足够的上下文
-    if isinstance(curr_plan, dict) and curr_plan.get("has_enough_context"):
-        new_plan = Plan.model_validate(curr_plan)
+    if new_plan.has_enough_context:
         logger.info(f"规划器 响应包含足够的上下文 结束. 跳转: reporter")
         return Command(
             update={
@@ -374,49 +597,84 @@ def planner_node(state: State, config: RunnableConfig):
     logger.info(f"协调器 结束. 跳转: human_feedback")
     return Command(update={
         "messages": [AIMessage(content=full_response, name="planner")],
-        "current_plan": full_response,
+        "current_plan": new_plan,
     }, goto="human_feedback")
 
 
-def background_investigation_node(state: State, config: RunnableConfig):
-    """背景调查节点：负责在研究开始前进行背景调查，收集相关信息和背景知识。"""
-    logger.info("背景调查节点 开始.")
-    configurable = Configuration.from_runnable_config(config)
-    query = state.get("research_topic")  # 什么是langchain
+def _as_bool(value) -> bool:
+    """配置开关的值（环境变量覆盖时为字符串）"""
+    if isinstance(value, str):
+        return value.strip().lower() in _TRUTHY
+    return bool(value)
+
+
+def is_speculative_investigation(configurable: Configuration) -> bool:
+    """是否开启投机背景调查"""
+    return _as_bool(configurable.speculative_background_investigation)
+
+
+async def _search_background(query: str, configurable: Configuration) -> str:
+    """执行背景调查搜索，返回给规划器使用的背景调查结果"""
     background_investigation_results = None
     # 背景调查
     if SELECTED_SEARCH_ENGINE == SearchEngine.TAVILY.value:
-        searched_content = LoggedTavilySearch(
+        searched_content = await LoggedTavilySearch(
             max_results=configurable.max_search_results,
             topic="general",
             include_answer=True,
             include_raw_content=True,
             include_images=True,
             include_image_descriptions=True,
-        ).invoke(query)
+        ).ainvoke(query)
         logger.info(f"背景调查节点 搜索结果: {json.dumps(searched_content, ensure_ascii=False)}")
         if isinstance(searched_content, list):
             background_investigation_results = [
                 f"## {item.get('title', '')}\n\n{item.get('content', '')}" for item in searched_content
             ]
-            return {
-                'background_investigation_results': '\n\n'.join(background_investigation_results)
-            }
+            return '\n\n'.join(background_investigation_results)
         else:
             logger.error(f"背景调查节点 搜索失败: {searched_content}")
     else:
-        background_investigation_results = get_web_search_tool(
+        background_investigation_results = await get_web_search_tool(
             configurable.max_search_results
-        ).invoke(query)
+        ).ainvoke(query)
+    return json.dumps(background_investigation_results, ensure_ascii=False)
+
+
+async def background_investigation_node(state: State, config: RunnableConfig):
+    """背景调查节点：负责在研究开始前进行背景调查，收集相关信息和背景知识。"""
+    logger.info("背景调查节点 开始.")
+    configurable = Configuration.from_runnable_config(config)
+    query = state.get("research_topic")  # 什么是langchain
+    try:
+        background_investigation_results = await run_with_deadline(_search_background(query, configurable), config)
+    except DeadlineExceeded:
+        logger.warning("背景调查节点 请求截止时间已到，跳过背景调查.")
+        return {}
+    except CircuitOpenError as e:
+        # 搜索服务熔断时与投机模式一致：没有背景调查结果，规划器照常规划
+        logger.warning(f"背景调查节点 搜索服务不可用，跳过背景调查: {e}")
+        return {}
     return {
-        'background_investigation_results': json.dumps(
-            background_investigation_results, ensure_ascii=False
-        )
+        'background_investigation_results': background_investigation_results
     }
 
 
-def coordinator_node(state: State, config: RunnableConfig) -> Command[
-    Literal["planner", 'background_investigator', "__end__"]]:
+async def _speculative_search(query: str, configurable: Configuration, config: RunnableConfig) -> Optional[str]:
+    """投机背景调查：与协调器的模型调用并行执行，失败时返回 None"""
+    logger.info("投机背景调查 开始.")
+    try:
+        results = await run_with_deadline(_search_background(query, configurable), config)
+    except Exception as e:
+        # 投机执行失败不影响协调器，规划器在没有背景调查结果时照常规划
+        logger.error(f"投机背景调查 搜索失败: {e}")
+        return None
+    logger.info("投机背景调查 结束.")
+    return results
+
+
+async def coordinator_node(state: State, config: RunnableConfig) -> Command[
+    Literal["planner", 'background_investigator', "human_feedback", "reporter", "__end__"]]:
     """
     协调器：管理工作流生命周期的入口点
     1、根据用户输入启动研究过程
@@ -428,7 +686,17 @@ def coordinator_node(state: State, config: RunnableConfig) -> Command[
     configurable = Configuration.from_runnable_config(config)
     messages = apply_prompt_template("coordinator", state)
 
-    response = get_llm_by_type(AGENT_LLM_MAP["coordinator"]).bind_tools([handoff_to_planner]).invoke(messages)
+    # 投机模式下背景调查与协调器的模型调用同时开始；协调器结束对话时取消，结果不写入状态
+    speculative_task = None
+    if state.get("enable_background_investigation", False) and is_speculative_investigation(configurable):
+        speculative_task = asyncio.ensure_future(_speculative_search(state.get("research_topic"), configurable, config))
+    try:
+        response = await get_llm_by_type(AGENT_LLM_MAP["coordinator"]).bind_tools(
+            [handoff_to_planner]).ainvoke(messages)
+    except BaseException:
+        if speculative_task is not None:
+            speculative_task.cancel()
+        raise
     logger.info(f"协调器 响应: {response}")
 
     goto = "__end__"
@@ -437,8 +705,8 @@ def coordinator_node(state: State, config: RunnableConfig) -> Command[
     if len(response.tool_calls) > 0:
         # 存在工具的调用
         goto = "planner"
-        if state.get("enable_background_investigation", False):
-            # 背景调查
+        if state.get("enable_background_investigation", False) and not is_speculative_investigation(configurable):
+            # 背景调查（投机模式下背景调查已与协调器并行执行）
             goto = "background_investigator"
         try:
             for tool_call in response.tool_calls:
@@ -457,10 +725,38 @@ def coordinator_node(state: State, config: RunnableConfig) -> Command[
     messages = state.get("messages", [])
     if response.content:
         messages.append(HumanMessage(content=response.content, name="coordinator"))
-    logger.info(f"协调器 结束. 跳转: {goto}")
-    return Command(update={
+    update = {
         "messages": messages,
         "locale": locale,
         "research_topic": research_topic,
+        "research_cache_hit": False,
         # "resources": configurable.resources,
-    }, goto=goto)
+    }
+
+    if goto != "__end__":
+        # 相同的研究问题直接使用缓存的计划、观察和报告
+        cached_research = await asyncio.to_thread(get_cached_research, make_research_cache_key(
+            research_topic, locale, configurable.report_style, configurable.max_step_num
+        ))
+        if cached_research:
+            logger.info(f"协调器 命中研究结果缓存: {research_topic}")
+            # 缓存的计划同样需要用户审批（未开启自动接受时）
+            goto = "human_feedback" if needs_plan_approval(state) else "reporter"
+            update.update({
+                "current_plan": Plan.model_validate(cached_research["plan"]),
+                "observations": cached_research["observations"],
+                "final_report": cached_research["final_report"],
+                "research_cache_hit": True,
+            })
+
+    if speculative_task is not None:
+        if goto == "planner":
+            background_investigation_results = await speculative_task
+            if background_investigation_results is not None:
+                update["background_investigation_results"] = background_investigation_results
+        else:
+            logger.info("协调器 不需要规划，取消投机背景调查.")
+            speculative_task.cancel()
+
+    logger.info(f"协调器 结束. 跳转: {goto}")
+    return Command(update=update, goto=goto)
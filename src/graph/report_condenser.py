@@ -0,0 +1,64 @@
+import asyncio
+import logging
+
+from langchain_core.messages import HumanMessage
+from langgraph.constants import TAG_NOSTREAM
+
+from src.config.agents import AGENT_LLM_MAP
+from src.llms.llm import get_llm_by_type
+from src.prompts.template import apply_prompt_template
+from src.utils.token_utils import count_tokens, truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+
+def batch_observations(observations: list[str], batch_tokens: int) -> list[list[str]]:
+    """按 token 数把观察分批，单个超出批次大小的观察会被截断后单独成批"""
+    batches: list[list[str]] = []
+    current_batch: list[str] = []
+    current_tokens = 0
+    for observation in observations:
+        tokens = count_tokens(observation)
+        if tokens > batch_tokens:
+            observation = truncate_to_tokens(observation, batch_tokens)
+            tokens = batch_tokens
+        if current_batch and current_tokens + tokens > batch_tokens:
+            batches.append(current_batch)
+            current_batch, current_tokens = [], 0
+        current_batch.append(observation)
+        current_tokens += tokens
+    if current_batch:
+        batches.append(current_batch)
+    return batches
+
+
+async def condense_observations(
+        observations: list[str], research_topic: str, locale: str, batch_tokens: int
+) -> list[str]:
+    """map 阶段：并发地把每批观察压缩为带引用的结构化笔记"""
+    batches = batch_observations(observations, batch_tokens)
+    logger.info(f"报告节点 map-reduce: {len(observations)} 条观察分为 {len(batches)} 批")
+    # 笔记只是中间结果，不推送给客户端
+    llm = get_llm_by_type(AGENT_LLM_MAP["report_condenser"]).with_config(tags=[TAG_NOSTREAM])
+
+    async def _condense(batch: list[str]) -> str:
+        observations_text = "\n\n---\n\n".join(batch)
+        messages = apply_prompt_template("report_condenser", {
+            "messages": [HumanMessage(
+                content=f"# Research Topic\n\n{research_topic}\n\n# Observations\n\n{observations_text}"
+            )],
+            "locale": locale,
+        })
+        response = await llm.ainvoke(messages)
+        return response.content
+
+    results = await asyncio.gather(*[_condense(batch) for batch in batches], return_exceptions=True)
+    notes = []
+    for batch, result in zip(batches, results):
+        if isinstance(result, Exception):
+            # 压缩失败时退回使用原始观察，保证报告不丢信息
+            logger.warning(f"报告节点 压缩观察失败，使用原始观察: {result}")
+            notes.extend(batch)
+            continue
+        notes.append(result)
+    return notes
@@ -0,0 +1,68 @@
+import hashlib
+import json
+import logging
+import re
+from typing import Any, Optional
+
+from src.cache.sqlite_store import SQLiteTTLStore
+from src.config.configuration import get_bool_env, get_int_env, get_str_env
+from src.config.tools import SELECTED_SEARCH_ENGINE
+
+logger = logging.getLogger(__name__)
+
+_research_cache: Optional[SQLiteTTLStore] = None
+
+
+def get_research_cache() -> Optional[SQLiteTTLStore]:
+    """获取研究结果缓存，未通过 ENABLE_RESEARCH_CACHE 开启时返回 None"""
+    global _research_cache
+    if not get_bool_env("ENABLE_RESEARCH_CACHE", False):
+        return None
+    if _research_cache is None:
+        _research_cache = SQLiteTTLStore(
+            get_str_env("RESEARCH_CACHE_PATH", "data/research_cache.db"),
+            ttl=get_int_env("RESEARCH_CACHE_TTL_SECONDS", 6 * 3600),
+            max_entries=get_int_env("RESEARCH_CACHE_MAX_ENTRIES", 1000),
+            max_bytes=get_int_env("RESEARCH_CACHE_MAX_MB", 256) * 1024 * 1024,
+        )
+    return _research_cache
+
+
+def normalize_topic(topic: str) -> str:
+    """规范化研究主题：忽略大小写、多余空白和结尾标点"""
+    topic = re.sub(r"\s+", " ", topic or "").strip().lower()
+    return topic.rstrip("?？!！.。")
+
+
+def make_research_cache_key(topic: str, locale: str, report_style: str, max_step_num: int) -> str:
+    key = {
+        "topic": normalize_topic(topic),
+        "locale": locale,
+        "report_style": report_style,
+        "max_step_num": int(max_step_num),
+        "search_engine": SELECTED_SEARCH_ENGINE,
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def get_cached_research(key: str) -> Optional[dict[str, Any]]:
+    """返回缓存的 计划、观察和最终报告"""
+    cache = get_research_cache()
+    if cache is None:
+        return None
+    return cache.get(key)
+
+
+def set_cached_research(key: str, plan: dict, observations: list[str], final_report: str) -> None:
+    cache = get_research_cache()
+    if cache is None or not final_report:
+        return
+    cache.set(key, {"plan": plan, "observations": observations, "final_report": final_report})
+    logger.info(f"研究结果已缓存: {key}")
+
+
+def stream_cached_report(writer, report: str, message_id: str, chunk_size: int = 200) -> None:
+    """通过 custom 流模式把缓存的报告分块推送给客户端"""
+    for start in range(0, len(report), chunk_size):
+        writer({"event": "report_chunk", "id": message_id, "content": report[start:start + chunk_size]})
+    writer({"event": "report_chunk", "id": message_id, "content": "", "finish_reason": "stop"})
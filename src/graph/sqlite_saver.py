@@ -0,0 +1,408 @@
+import asyncio
+import atexit
+import logging
+import os
+import random
+import sqlite3
+import threading
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Iterator, Sequence
+from typing import Any
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB,
+    metadata_type TEXT,
+    metadata BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+"""
+
+
+class SQLiteCheckpointSaver(BaseCheckpointSaver[str]):
+    """将检查点持久化到本地 SQLite 文件的检查点保存器。
+
+    - 内存中只保留最近活跃的 `cache_size` 个线程（命名空间）的最新检查点（LRU），其余检查点只存在于磁盘上，
+      因此大量等待 human_feedback 中断的计划不会让进程内存持续增长。
+    - 写入先进入缓冲区，累计 `batch_size` 条或超过 `flush_interval` 秒后在一个事务中批量写入 SQLite。
+      进程异常退出时最多丢失最近 `flush_interval` 秒内的写入。
+    """
+
+    def __init__(
+            self,
+            db_path: str,
+            *,
+            cache_size: int = 128,
+            batch_size: int = 64,
+            flush_interval: float = 1.0,
+            serde=None,
+    ) -> None:
+        super().__init__(serde=serde)
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.db_path = db_path
+        self.cache_size = cache_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+        # (thread_id, checkpoint_ns) -> 最新检查点及其 pending writes（已序列化）
+        self._hot: OrderedDict[tuple[str, str], dict[str, Any]] = OrderedDict()
+        # 待写入的检查点和 writes，键与表的主键一致
+        self._pending_checkpoints: dict[tuple, tuple] = {}
+        self._pending_writes: dict[tuple, tuple] = {}
+        self._flush_timer: threading.Timer | None = None
+
+        atexit.register(self.flush)
+
+    # ---------------------------------------------------------------- 写入
+    def put(
+            self,
+            config: RunnableConfig,
+            checkpoint: Checkpoint,
+            metadata: CheckpointMetadata,
+            new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = checkpoint["id"]
+        parent_checkpoint_id = config["configurable"].get("checkpoint_id")
+        typed_checkpoint = self.serde.dumps_typed(checkpoint)
+        typed_metadata = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+
+        with self._lock:
+            self._pending_checkpoints[(thread_id, checkpoint_ns, checkpoint_id)] = (
+                parent_checkpoint_id, *typed_checkpoint, *typed_metadata
+            )
+            hot = self._hot.get((thread_id, checkpoint_ns))
+            if hot is None or hot["checkpoint_id"] <= checkpoint_id:
+                self._set_hot(thread_id, checkpoint_ns, {
+                    "checkpoint_id": checkpoint_id,
+                    "parent_checkpoint_id": parent_checkpoint_id,
+                    "checkpoint": typed_checkpoint,
+                    "metadata": typed_metadata,
+                    "writes": {},
+                })
+            self._schedule_flush()
+
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint_id,
+            }
+        }
+
+    def put_writes(
+            self,
+            config: RunnableConfig,
+            writes: Sequence[tuple[str, Any]],
+            task_id: str,
+            task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+
+        with self._lock:
+            hot = self._hot.get((thread_id, checkpoint_ns))
+            if hot is not None and hot["checkpoint_id"] != checkpoint_id:
+                hot = None
+            for idx, (channel, value) in enumerate(writes):
+                write_idx = WRITES_IDX_MAP.get(channel, idx)
+                key = (thread_id, checkpoint_ns, checkpoint_id, task_id, write_idx)
+                # 普通写入只保留第一次，特殊写入（错误、中断等）覆盖
+                if write_idx >= 0 and (key in self._pending_writes or (
+                        hot is not None and (task_id, write_idx) in hot["writes"])):
+                    continue
+                row = (channel, *self.serde.dumps_typed(value), task_path)
+                self._pending_writes[key] = row
+                if hot is not None:
+                    hot["writes"][(task_id, write_idx)] = row
+            self._schedule_flush()
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self.flush()
+            for key in [key for key in self._hot if key[0] == thread_id]:
+                del self._hot[key]
+            self._conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+            self._conn.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+            self._conn.commit()
+
+    def flush(self) -> None:
+        """将缓冲区中的检查点和 writes 在一个事务中写入 SQLite"""
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if not self._pending_checkpoints and not self._pending_writes:
+                return
+            checkpoint_rows = [key + row for key, row in self._pending_checkpoints.items()]
+            write_rows = [key + row for key, row in self._pending_writes.items()]
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, "
+                    "parent_checkpoint_id, type, checkpoint, metadata_type, metadata) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    checkpoint_rows,
+                )
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO writes (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, "
+                    "channel, type, value, task_path) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [row for row in write_rows if row[4] >= 0],
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO writes (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, "
+                    "channel, type, value, task_path) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [row for row in write_rows if row[4] < 0],
+                )
+            logger.debug(f"检查点批量写入: {len(checkpoint_rows)} checkpoints, {len(write_rows)} writes")
+            self._pending_checkpoints.clear()
+            self._pending_writes.clear()
+
+    def _schedule_flush(self) -> None:
+        if len(self._pending_checkpoints) + len(self._pending_writes) >= self.batch_size:
+            self.flush()
+        elif self._flush_timer is None:
+            # 缓冲区有数据时启动定时器，保证空闲时也能在 flush_interval 内落盘
+            self._flush_timer = threading.Timer(self.flush_interval, self.flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def _set_hot(self, thread_id: str, checkpoint_ns: str, entry: dict[str, Any]) -> None:
+        key = (thread_id, checkpoint_ns)
+        self._hot[key] = entry
+        self._hot.move_to_end(key)
+        while len(self._hot) > self.cache_size:
+            self._hot.popitem(last=False)
+
+    # ---------------------------------------------------------------- 读取
+    def get_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+
+        with self._lock:
+            hot = self._hot.get((thread_id, checkpoint_ns))
+            if hot is not None and (not checkpoint_id or hot["checkpoint_id"] == checkpoint_id):
+                self._hot.move_to_end((thread_id, checkpoint_ns))
+                return self._make_tuple(
+                    thread_id, checkpoint_ns, hot["checkpoint_id"], hot["parent_checkpoint_id"],
+                    hot["checkpoint"], hot["metadata"],
+                    [(task_id, *row) for (task_id, _), row in hot["writes"].items()],
+                )
+
+            self.flush()
+            if checkpoint_id:
+                row = self._conn.execute(
+                    "SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata "
+                    "FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    "SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata "
+                    "FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            if row is None:
+                return None
+
+            writes = self._load_writes(thread_id, checkpoint_ns, row[0])
+            if not checkpoint_id:
+                # 重新加载的线程放回热缓存，例如中断后恢复的计划
+                self._set_hot(thread_id, checkpoint_ns, {
+                    "checkpoint_id": row[0],
+                    "parent_checkpoint_id": row[1],
+                    "checkpoint": (row[2], row[3]),
+                    "metadata": (row[4], row[5]),
+                    "writes": {(task_id, idx): (channel, type_, value, task_path)
+                               for task_id, idx, channel, type_, value, task_path in writes},
+                })
+            return self._make_tuple(
+                thread_id, checkpoint_ns, row[0], row[1], (row[2], row[3]), (row[4], row[5]),
+                [(task_id, channel, type_, value, task_path)
+                 for task_id, _, channel, type_, value, task_path in writes],
+            )
+
+    def _load_writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> list[tuple]:
+        return self._conn.execute(
+            "SELECT task_id, idx, channel, type, value, task_path FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+
+    def _make_tuple(
+            self,
+            thread_id: str,
+            checkpoint_ns: str,
+            checkpoint_id: str,
+            parent_checkpoint_id: str | None,
+            typed_checkpoint: tuple[str, bytes],
+            typed_metadata: tuple[str, bytes],
+            writes: list[tuple],
+    ) -> CheckpointTuple:
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint=self.serde.loads_typed(typed_checkpoint),
+            metadata=self.serde.loads_typed(typed_metadata),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_checkpoint_id,
+                    }
+                }
+                if parent_checkpoint_id
+                else None
+            ),
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((type_, value)))
+                for task_id, channel, type_, value, _ in writes
+            ],
+        )
+
+    def list(
+            self,
+            config: RunnableConfig | None,
+            *,
+            filter: dict[str, Any] | None = None,
+            before: RunnableConfig | None = None,
+            limit: int | None = None,
+    ) -> Iterator[CheckpointTuple]:
+        query = ("SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, "
+                 "metadata_type, metadata FROM checkpoints")
+        conditions, params = [], []
+        if config:
+            conditions.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                conditions.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                conditions.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_checkpoint_id := get_checkpoint_id(before)):
+            conditions.append("checkpoint_id < ?")
+            params.append(before_checkpoint_id)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY checkpoint_id DESC"
+
+        with self._lock:
+            self.flush()
+            rows = self._conn.execute(query, params).fetchall()
+
+        for thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, *typed in rows:
+            metadata = self.serde.loads_typed((typed[2], typed[3]))
+            if filter and not all(metadata.get(key) == value for key, value in filter.items()):
+                continue
+            if limit is not None:
+                if limit <= 0:
+                    break
+                limit -= 1
+            with self._lock:
+                writes = self._load_writes(thread_id, checkpoint_ns, checkpoint_id)
+            yield self._make_tuple(
+                thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id,
+                (typed[0], typed[1]), (typed[2], typed[3]),
+                [(task_id, channel, type_, value, task_path)
+                 for task_id, _, channel, type_, value, task_path in writes],
+            )
+
+    # ---------------------------------------------------------------- 异步接口
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+            self,
+            config: RunnableConfig | None,
+            *,
+            filter: dict[str, Any] | None = None,
+            before: RunnableConfig | None = None,
+            limit: int | None = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+            self,
+            config: RunnableConfig,
+            checkpoint: Checkpoint,
+            metadata: CheckpointMetadata,
+            new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        # put 可能触发批量写入事务并与定时刷新线程竞争锁，不能在事件循环中执行
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+            self,
+            config: RunnableConfig,
+            writes: Sequence[tuple[str, Any]],
+            task_id: str,
+            task_path: str = "",
+    ) -> None:
+        return await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        return await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def get_next_version(self, current: str | None, channel: None) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        next_v = current_v + 1
+        next_h = random.random()
+        return f"{next_v:032}.{next_h:016}"
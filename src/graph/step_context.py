@@ -0,0 +1,109 @@
+import asyncio
+import hashlib
+import logging
+
+from langchain_core.messages import HumanMessage
+from langgraph.constants import TAG_NOSTREAM
+
+from src.config.agents import AGENT_LLM_MAP
+from src.llms.llm import get_llm_by_type
+from src.prompts.planner_model import Step
+from src.prompts.template import apply_prompt_template
+from src.utils.token_utils import count_tokens, truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+# 剩余预算低于该值时不再追加截断的发现
+_MIN_FINDING_TOKENS = 64
+
+
+def finding_key(finding: str) -> str:
+    """发现内容的摘要缓存键"""
+    return hashlib.sha1(finding.encode("utf-8")).hexdigest()
+
+
+def get_steps_to_summarize(
+        completed_steps: list[Step], step_summaries: dict[str, str], token_budget: int, recent_steps: int
+) -> list[Step]:
+    """获取需要压缩的较早步骤：超出预算时，最近 recent_steps 个之前且尚未压缩过的步骤"""
+    total_tokens = sum(count_tokens(step.execution_res) for step in completed_steps)
+    if total_tokens <= token_budget:
+        return []
+    older_steps = completed_steps[:max(len(completed_steps) - recent_steps, 0)]
+    return [step for step in older_steps if finding_key(step.execution_res) not in step_summaries]
+
+
+async def summarize_findings(steps: list[Step], locale: str) -> dict[str, str]:
+    """并发压缩步骤发现，返回 发现键 -> 摘要"""
+    # 摘要只是中间结果，不推送给客户端
+    llm = get_llm_by_type(AGENT_LLM_MAP["step_summarizer"]).with_config(tags=[TAG_NOSTREAM])
+
+    async def _summarize(step: Step) -> tuple[str, str]:
+        messages = apply_prompt_template("step_summarizer", {
+            "messages": [HumanMessage(content=f"## {step.title}\n\n{step.execution_res}")],
+            "locale": locale,
+        })
+        response = await llm.ainvoke(messages)
+        return finding_key(step.execution_res), response.content
+
+    results = await asyncio.gather(*[_summarize(step) for step in steps], return_exceptions=True)
+    summaries = {}
+    for step, result in zip(steps, results):
+        if isinstance(result, Exception):
+            logger.warning(f"压缩步骤 '{step.title}' 的发现失败: {result}")
+            continue
+        summaries[result[0]] = result[1]
+    return summaries
+
+
+def build_completed_steps_info(
+        completed_steps: list[Step], step_summaries: dict[str, str], token_budget: int, recent_steps: int
+) -> str:
+    """在 token 预算内构建已完成步骤的上下文
+
+    最近 recent_steps 个步骤保留原文，较早的步骤使用缓存的摘要（优先放入），
+    其余内容从最新的步骤向前填充，放不下时截断，剩余预算不足时省略该步骤。
+    """
+    if not completed_steps:
+        return ""
+
+    remaining = token_budget
+    sections: list[str | None] = [None] * len(completed_steps)
+    candidates = []
+    for position, step in enumerate(completed_steps):
+        is_recent = position >= len(completed_steps) - recent_steps
+        summary = step_summaries.get(finding_key(step.execution_res))
+        use_summary = not is_recent and bool(summary)
+        candidates.append((position, use_summary, summary))
+    # 较早步骤的摘要体积小，优先放入；其余步骤从最新到最早填充剩余预算
+    candidates.sort(key=lambda item: (not item[1], -item[0]))
+
+    for position, use_summary, summary in candidates:
+        step = completed_steps[position]
+        if use_summary:
+            tag, content = "summary", summary
+        else:
+            tag, content = "finding", step.execution_res
+
+        tokens = count_tokens(content)
+        if tokens > remaining and tag == "finding" and summary:
+            tag, content = "summary", summary
+            tokens = count_tokens(content)
+        if tokens > remaining:
+            if remaining < _MIN_FINDING_TOKENS:
+                continue
+            content = truncate_to_tokens(content, remaining)
+            tokens = count_tokens(content)
+        remaining -= tokens
+        sections[position] = f"<{tag}>\n{content}\n</{tag}>"
+
+    omitted = sum(1 for section in sections if section is None)
+    if omitted:
+        logger.info(f"已完成步骤上下文超出预算 {token_budget} tokens，省略 {omitted} 个步骤")
+
+    completed_steps_info = "# Completed Research Steps\n\n"
+    for i, (step, section) in enumerate(zip(completed_steps, sections)):
+        if section is None:
+            continue
+        completed_steps_info += f"## Completed Step {i + 1}: {step.title}\n\n{section}\n\n"
+    return completed_steps_info
@@ -1,9 +1,18 @@
+from typing import Annotated
+
 from langgraph.graph import MessagesState
 
 from src.prompts.planner_model import Plan
 from src.rag.retriever import Resource
 
 
+def merge_step_results(left: dict[int, str] | None, right: dict[int, str] | None) -> dict[int, str]:
+    """合并并行执行的步骤结果，写入 None 表示清空（研究团队汇总后重置）"""
+    if right is None:
+        return {}
+    return {**(left or {}), **right}
+
+
 class State(MessagesState):
     locale: str = "en-US"
     research_topic: str = ""
@@ -15,6 +24,12 @@ class State(MessagesState):
     auto_accepted_plan: bool = False
     enable_background_investigation: bool = True
     background_investigation_results: str = None
+    # 并行步骤的执行结果：步骤索引 -> 执行结果，由 research_team 节点汇总到计划和观察中
+    step_results: Annotated[dict[int, str], merge_step_results] = {}
+    # 已完成步骤发现的摘要缓存：发现内容哈希 -> 摘要，同一线程内每个发现只压缩一次
+    step_summaries: dict[str, str] = {}
+    research_cache_hit: bool = False  # 是否命中研究结果缓存
+    partial_result: bool = False  # 请求截止时间已到，报告只基于部分观察
 
 # def create_person(name: str, age: Optional[int] = 0) -> Person:
 #     return Person(name=name, age=age)
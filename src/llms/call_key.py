@@ -0,0 +1,46 @@
+import hashlib
+import json
+from typing import Any, List, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from pydantic import BaseModel
+
+
+def serialize_call_value(value: Any) -> Any:
+    """调用参数（绑定的工具、结构化输出 schema、工具配置等）转换为可稳定序列化的形式"""
+    if isinstance(value, dict):
+        return {str(k): serialize_call_value(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [serialize_call_value(v) for v in value]
+    if isinstance(value, type) and hasattr(value, "model_json_schema"):
+        return value.model_json_schema()
+    if isinstance(value, BaseModel):
+        return serialize_call_value(value.model_dump())
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    # 客户端、密钥等对象的 repr 可能包含内存地址，只保留类型以得到稳定的键
+    return type(value).__qualname__
+
+
+# add_messages 为每条消息分配随机 ID，模型回复还带有请求 ID、耗时和用量，这些字段不影响模型输出
+_VOLATILE_MESSAGE_FIELDS = {"id", "response_metadata", "usage_metadata"}
+
+
+def _message_key(message: BaseMessage) -> dict[str, Any]:
+    return serialize_call_value(message.model_dump(exclude=_VOLATILE_MESSAGE_FIELDS))
+
+
+def make_llm_call_key(llm: BaseChatModel, mode: str, messages: List[BaseMessage], stop: Optional[List[str]],
+                      kwargs: dict) -> str:
+    """模型调用的键：端点、模型参数、渲染后的消息、停止词和调用参数（绑定的工具、结构化输出 schema）"""
+    key = {
+        "mode": mode,
+        "llm_type": llm._llm_type,
+        "endpoint": getattr(llm, "openai_api_base", None),
+        "params": serialize_call_value(llm._identifying_params),
+        "messages": [_message_key(message) for message in messages],
+        "stop": stop,
+        "kwargs": serialize_call_value({k: v for k, v in kwargs.items() if k != "run_manager"}),
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")).hexdigest()
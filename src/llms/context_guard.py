@@ -0,0 +1,253 @@
+import json
+import logging
+import threading
+from functools import lru_cache
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Union
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+
+from src.utils.token_utils import count_tokens, truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+# 模型类型 -> 上下文窗口保护，由 conf.yaml 中各模型的 context_window 配置创建
+_context_guards: Dict[str, "ContextWindowGuard"] = {}
+
+# 每条消息的角色、分隔符等格式开销
+_MESSAGE_OVERHEAD_TOKENS = 4
+
+# tokenizer 为 estimate 时不加载本地分词器，直接按字符估算
+_ESTIMATE_TOKENIZER = "estimate"
+
+
+@lru_cache(maxsize=None)
+def get_token_counter(tokenizer: str) -> Callable[[str], int]:
+    """本地分词器的 token 计数函数：tiktoken 编码名（如 cl100k_base）或模型名
+
+    tiktoken 未安装或编码文件无法加载（例如离线环境）时退回 count_tokens 估算。
+    """
+    if tokenizer == _ESTIMATE_TOKENIZER:
+        return count_tokens
+    try:
+        import tiktoken
+
+        if tokenizer in tiktoken.list_encoding_names():
+            encoding = tiktoken.get_encoding(tokenizer)
+        else:
+            try:
+                encoding = tiktoken.encoding_for_model(tokenizer)
+            except KeyError:
+                # tiktoken 不认识的模型（如豆包、通义千问）按 cl100k_base 计数
+                encoding = tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"无法加载分词器 {tokenizer}，改用字符估算: {e}")
+        return count_tokens
+    return lambda text: len(encoding.encode(text, disallowed_special=())) if text else 0
+
+
+def _message_text(message: BaseMessage) -> str:
+    content = message.content
+    return content if isinstance(content, str) else json.dumps(content, ensure_ascii=False)
+
+
+def _is_tool_call_message(message: BaseMessage) -> bool:
+    return isinstance(message, AIMessage) and bool(message.tool_calls)
+
+
+class ContextWindowGuard:
+    """调用模型前检查提示词的 token 数，超出上下文窗口时按角色裁剪
+
+    裁剪顺序：
+    1. 系统提示、当前轮次的用户消息和最后一条消息不会被丢弃；
+    2. 从最早的工具输出开始，将其截断到 tool_output_min_tokens；
+    3. 仍然超出时从最早的轮次开始丢弃消息（工具调用和对应的工具输出一起丢弃）。
+    """
+
+    def __init__(self, name: str, max_tokens: int, reserve_completion_tokens: int = 4000,
+                 tool_output_min_tokens: int = 500, tokenizer: str = "cl100k_base"):
+        self.name = name
+        self.max_tokens = max_tokens
+        self.reserve_completion_tokens = reserve_completion_tokens
+        self.tool_output_min_tokens = tool_output_min_tokens
+        self.tokenizer = tokenizer
+        self.count = get_token_counter(tokenizer)
+        self._lock = threading.Lock()
+
+        self.calls = 0
+        self.trimmed_calls = 0
+        self.over_budget_calls = 0
+        self.tool_outputs_shrunk = 0
+        self.messages_dropped = 0
+        self.tokens_removed = 0
+        self.max_prompt_tokens = 0
+
+    def count_message(self, message: BaseMessage) -> int:
+        tokens = _MESSAGE_OVERHEAD_TOKENS + self.count(_message_text(message))
+        if _is_tool_call_message(message):
+            tokens += sum(self.count(call["name"] + json.dumps(call["args"], ensure_ascii=False))
+                          for call in message.tool_calls)
+        return tokens
+
+    def budget(self, kwargs: dict, default_completion_tokens: Optional[int] = None) -> int:
+        """提示词可用的 token 数：上下文窗口减去为输出保留的 token 和工具定义"""
+        completion_tokens = kwargs.get("max_tokens") or kwargs.get("max_completion_tokens") \
+            or default_completion_tokens or self.reserve_completion_tokens
+        tools_tokens = self.count(json.dumps(kwargs["tools"], ensure_ascii=False)) if kwargs.get("tools") else 0
+        return self.max_tokens - int(completion_tokens) - tools_tokens
+
+    @staticmethod
+    def _pinned_indexes(messages: List[BaseMessage]) -> set[int]:
+        """系统提示、最后一条消息，以及开启当前轮次的用户消息（其后紧跟模型回复的最后一条用户消息）"""
+        pinned = {index for index, message in enumerate(messages) if isinstance(message, SystemMessage)}
+        pinned.add(len(messages) - 1)
+        turn_start = None
+        for index, message in enumerate(messages):
+            if isinstance(message, HumanMessage) and index + 1 < len(messages) \
+                    and isinstance(messages[index + 1], AIMessage):
+                turn_start = index
+        if turn_start is None:
+            turn_start = next((index for index, message in enumerate(messages) if isinstance(message, HumanMessage)),
+                              None)
+        if turn_start is not None:
+            pinned.add(turn_start)
+        return pinned
+
+    @staticmethod
+    def _units(messages: List[BaseMessage]) -> List[List[int]]:
+        """按丢弃单位分组：带工具调用的模型消息和其后的工具输出为一组，其余消息各自一组"""
+        units: List[List[int]] = []
+        for index, message in enumerate(messages):
+            if isinstance(message, ToolMessage) and units and _is_tool_call_message(messages[units[-1][0]]):
+                units[-1].append(index)
+            else:
+                units.append([index])
+        return units
+
+    def trim(self, messages: List[BaseMessage], kwargs: dict,
+             default_completion_tokens: Optional[int] = None) -> List[BaseMessage]:
+        budget = self.budget(kwargs, default_completion_tokens)
+        counts = [self.count_message(message) for message in messages]
+        total = sum(counts)
+        with self._lock:
+            self.calls += 1
+            self.max_prompt_tokens = max(self.max_prompt_tokens, total)
+        if total <= budget:
+            return messages
+
+        original_total = total
+        messages = list(messages)
+        pinned = self._pinned_indexes(messages)
+        shrunk = 0
+
+        # 1. 从最早的工具输出开始截断（包括最后一条工具输出，它通常是刚返回的大段搜索或爬取结果）
+        for index, message in enumerate(messages):
+            if total <= budget:
+                break
+            if not isinstance(message, ToolMessage):
+                continue
+            text = _message_text(message)
+            if self.count(text) <= self.tool_output_min_tokens:
+                continue
+            content = truncate_to_tokens(text, self.tool_output_min_tokens,
+                                         suffix="\n...(truncated to fit the context window)")
+            messages[index] = message.model_copy(update={"content": content})
+            new_count = self.count_message(messages[index])
+            total -= counts[index] - new_count
+            counts[index] = new_count
+            shrunk += 1
+
+        # 2. 从最早的轮次开始丢弃
+        dropped: set[int] = set()
+        for unit in self._units(messages):
+            if total <= budget:
+                break
+            if any(index in pinned for index in unit):
+                continue
+            dropped.update(unit)
+            total -= sum(counts[index] for index in unit)
+        if dropped:
+            messages = [message for index, message in enumerate(messages) if index not in dropped]
+
+        over_budget = total > budget
+        with self._lock:
+            self.trimmed_calls += 1
+            self.tool_outputs_shrunk += shrunk
+            self.messages_dropped += len(dropped)
+            self.tokens_removed += original_total - total
+            self.over_budget_calls += int(over_budget)
+        logger.info(f"LLM {self.name} 提示词 {original_total} tokens 超出预算 {budget}: "
+                    f"截断工具输出 {shrunk} 条，丢弃消息 {len(dropped)} 条，剩余 {total} tokens")
+        if over_budget:
+            logger.warning(f"LLM {self.name} 裁剪后提示词仍超出预算 {budget} tokens（{total} tokens）")
+        return messages
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "max_tokens": self.max_tokens,
+            "tokenizer": self.tokenizer,
+            "calls": self.calls,
+            "trimmed_calls": self.trimmed_calls,
+            "over_budget_calls": self.over_budget_calls,
+            "tool_outputs_shrunk": self.tool_outputs_shrunk,
+            "messages_dropped": self.messages_dropped,
+            "tokens_removed": self.tokens_removed,
+            "max_prompt_tokens": self.max_prompt_tokens,
+        }
+
+
+def configure_context_guard(llm_type: str, context_window_conf: Optional[Union[int, dict]],
+                            model: Optional[str] = None) -> Optional[ContextWindowGuard]:
+    """根据模型配置中的 context_window 创建上下文窗口保护，未配置时返回 None"""
+    if isinstance(context_window_conf, int):
+        context_window_conf = {"max_tokens": context_window_conf}
+    context_window_conf = context_window_conf or {}
+    max_tokens = context_window_conf.get("max_tokens")
+    if not max_tokens:
+        _context_guards.pop(llm_type, None)
+        return None
+    guard = ContextWindowGuard(
+        llm_type,
+        max_tokens=int(max_tokens),
+        reserve_completion_tokens=int(context_window_conf.get("reserve_completion_tokens", 4000)),
+        tool_output_min_tokens=int(context_window_conf.get("tool_output_min_tokens", 500)),
+        tokenizer=context_window_conf.get("tokenizer") or model or "cl100k_base",
+    )
+    _context_guards[llm_type] = guard
+    logger.info(f"LLM {llm_type} 上下文窗口: {guard.max_tokens} tokens, 分词器 {guard.tokenizer}")
+    return guard
+
+
+def get_context_guard_stats() -> dict[str, dict[str, Any]]:
+    return {llm_type: guard.stats() for llm_type, guard in _context_guards.items()}
+
+
+class ContextGuardMixin:
+    """A mixin class that trims prompts to the context window of its model type before calling the model."""
+
+    def _guard_messages(self, messages: List[BaseMessage], kwargs: dict) -> List[BaseMessage]:
+        guard = _context_guards.get(getattr(self, "llm_layer_key", None))
+        if guard is None:
+            return messages
+        return guard.trim(messages, kwargs, default_completion_tokens=getattr(self, "max_tokens", None))
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None,
+                  **kwargs: Any) -> ChatResult:
+        messages = self._guard_messages(messages, kwargs)
+        return super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None,
+                         **kwargs: Any) -> ChatResult:
+        messages = self._guard_messages(messages, kwargs)
+        return await super()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None,
+                **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        messages = self._guard_messages(messages, kwargs)
+        yield from super()._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None,
+                       **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        messages = self._guard_messages(messages, kwargs)
+        async for chunk in super()._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+            yield chunk
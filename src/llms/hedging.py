@@ -0,0 +1,264 @@
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+
+logger = logging.getLogger(__name__)
+
+# 模型类型 -> 对冲策略，由 conf.yaml 中各模型的 hedge 配置创建
+_hedge_policies: Dict[str, "HedgePolicy"] = {}
+
+
+class LatencyTracker:
+    """滚动窗口内的延迟统计"""
+
+    def __init__(self, window: int = 100):
+        self._samples: deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        samples = sorted(self._samples)
+        index = min(len(samples) - 1, max(0, math.ceil(percentile / 100 * len(samples)) - 1))
+        return samples[index]
+
+    def stats(self) -> dict[str, Any]:
+        stats: dict[str, Any] = {"samples": len(self._samples)}
+        for percentile in (50, 95, 99):
+            value = self.percentile(percentile)
+            stats[f"p{percentile}"] = round(value, 3) if value is not None else None
+        return stats
+
+
+class HedgePolicy:
+    """对冲请求策略：主模型在最近延迟的指定分位数内没有产生首个 token 时，向备用模型发送相同的请求
+
+    调用方式（generate / stream）分别统计主模型和备用模型的延迟（流式调用为首个 token 的延迟）。
+    """
+
+    def __init__(self, name: str, secondary: BaseChatModel, percentile: float = 95, min_delay: float = 1.0,
+                 initial_delay: float = 10.0, min_samples: int = 20, window: int = 100):
+        self.name = name
+        self.secondary = secondary
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.initial_delay = initial_delay
+        self.min_samples = min_samples
+        self.latency = {
+            (model, mode): LatencyTracker(window)
+            for model in ("primary", "secondary")
+            for mode in ("generate", "stream")
+        }
+        self.calls = 0
+        self.hedged = 0
+        self.secondary_wins = 0
+
+    def delay(self, mode: str) -> float:
+        """发出对冲请求前等待主模型的时间"""
+        tracker = self.latency[("primary", mode)]
+        if len(tracker) < self.min_samples:
+            return self.initial_delay
+        return max(self.min_delay, tracker.percentile(self.percentile))
+
+    def record(self, model: str, mode: str, seconds: float) -> None:
+        self.latency[(model, mode)].record(seconds)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "secondary_wins": self.secondary_wins,
+            "latency": {f"{model}_{mode}": tracker.stats() for (model, mode), tracker in self.latency.items()},
+        }
+
+
+def configure_hedging(llm_type: str, secondary: Optional[BaseChatModel], hedge_conf: Optional[dict]) -> Optional[HedgePolicy]:
+    if secondary is None or not hedge_conf:
+        _hedge_policies.pop(llm_type, None)
+        return None
+    policy = HedgePolicy(
+        llm_type,
+        secondary,
+        percentile=float(hedge_conf.get("percentile", 95)),
+        min_delay=float(hedge_conf.get("min_delay", 1.0)),
+        initial_delay=float(hedge_conf.get("initial_delay", 10.0)),
+        min_samples=int(hedge_conf.get("min_samples", 20)),
+        window=int(hedge_conf.get("window", 100)),
+    )
+    _hedge_policies[llm_type] = policy
+    logger.info(f"LLM {llm_type} 启用对冲请求: p{policy.percentile}, 备用模型 {type(secondary).__name__}")
+    return policy
+
+
+def get_hedging_stats() -> dict[str, dict[str, Any]]:
+    return {llm_type: policy.stats() for llm_type, policy in _hedge_policies.items()}
+
+
+class _TokenlessRunManager:
+    """转发除 on_llm_new_token 以外的回调：对冲的两个请求同时进行，token 只由胜出者的分片上报"""
+
+    def __init__(self, run_manager):
+        self._run_manager = run_manager
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._run_manager, name)
+
+    async def on_llm_new_token(self, *args: Any, **kwargs: Any) -> None:
+        return None
+
+
+def _without_tokens(run_manager):
+    return _TokenlessRunManager(run_manager) if run_manager is not None else None
+
+
+def _record_race(policy: HedgePolicy, mode: str, tasks: dict[str, asyncio.Future], winner: str, start: float,
+                 hedged_at: Optional[float]) -> None:
+    """记录对冲竞速的延迟
+
+    落败的主模型被取消时已经等待的时间是其延迟的下界，同样计入样本；只记录胜出者时慢请求的样本总被丢弃，
+    分位数会持续偏低，对冲越来越早。失败的主模型不计入。
+    """
+    now = time.monotonic()
+    policy.record(winner, mode, now - (hedged_at if winner == "secondary" else start))
+    if winner == "secondary":
+        policy.secondary_wins += 1
+        primary = tasks["primary"]
+        failed = primary.done() and not primary.cancelled() and primary.exception() is not None
+        if not failed:
+            policy.record("primary", mode, now - start)
+
+
+async def _race(tasks: dict[str, asyncio.Future]) -> tuple[str, Any]:
+    """返回最先成功完成的任务，并取消其余任务；全部失败时抛出主模型的异常"""
+    pending = set(tasks.values())
+    errors: dict[str, BaseException] = {}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for name, task in tasks.items():
+                if task not in done:
+                    continue
+                if task.exception() is None:
+                    return name, task.result()
+                errors[name] = task.exception()
+        raise errors.get("primary") or next(iter(errors.values()))
+    finally:
+        for task in tasks.values():
+            if not task.done():
+                task.cancel()
+
+
+async def _first_chunk(stream: AsyncIterator[ChatGenerationChunk]) -> Optional[ChatGenerationChunk]:
+    try:
+        return await stream.__anext__()
+    except StopAsyncIteration:
+        return None
+
+
+async def _close_stream(stream: AsyncIterator[ChatGenerationChunk]) -> None:
+    try:
+        await stream.aclose()
+    except Exception as e:
+        logger.debug(f"关闭被取消的对冲流失败: {e}")
+
+
+class HedgingMixin:
+    """A mixin class that hedges slow async chat model calls with a duplicate request to a secondary model.
+
+    The first successful response wins and the other request is cancelled. Sync calls are not hedged.
+    """
+
+    def _get_hedge_policy(self) -> Optional[HedgePolicy]:
+        return _hedge_policies.get(getattr(self, "llm_layer_key", None))
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None,
+                         **kwargs: Any) -> ChatResult:
+        policy = self._get_hedge_policy()
+        if policy is None:
+            return await super()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+        policy.calls += 1
+        start = time.monotonic()
+        hedged_at = None
+        tasks = {"primary": asyncio.ensure_future(
+            super()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs))}
+        try:
+            done, _ = await asyncio.wait(tasks.values(), timeout=policy.delay("generate"))
+            # 主模型未及时响应或已经失败（例如熔断）时改用备用模型
+            if not done or tasks["primary"].exception() is not None:
+                policy.hedged += 1
+                logger.info(f"LLM {policy.name} 主模型超过 {policy.delay('generate'):.2f}s 未响应或失败，发送对冲请求")
+                hedged_at = time.monotonic()
+                tasks["secondary"] = asyncio.ensure_future(policy.secondary._agenerate(
+                    messages, stop=stop, run_manager=_without_tokens(run_manager), **kwargs))
+            winner, result = await _race(tasks)
+        finally:
+            for task in tasks.values():
+                if not task.done():
+                    task.cancel()
+
+        _record_race(policy, "generate", tasks, winner, start, hedged_at)
+        return result
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None,
+                       **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        policy = self._get_hedge_policy()
+        if policy is None:
+            async for chunk in super()._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                yield chunk
+            return
+
+        policy.calls += 1
+        start = time.monotonic()
+        hedged_at = None
+        # 两个流都不直接上报 token，只有胜出的流的分片会转发给回调
+        streams = {"primary": super()._astream(messages, stop=stop, run_manager=_without_tokens(run_manager),
+                                               **kwargs)}
+        tasks = {"primary": asyncio.ensure_future(_first_chunk(streams["primary"]))}
+        try:
+            done, _ = await asyncio.wait(tasks.values(), timeout=policy.delay("stream"))
+            if not done or tasks["primary"].exception() is not None:
+                policy.hedged += 1
+                logger.info(f"LLM {policy.name} 主模型超过 {policy.delay('stream'):.2f}s 没有首个 token 或失败，发送对冲请求")
+                hedged_at = time.monotonic()
+                streams["secondary"] = policy.secondary._astream(
+                    messages, stop=stop, run_manager=_without_tokens(run_manager), **kwargs)
+                tasks["secondary"] = asyncio.ensure_future(_first_chunk(streams["secondary"]))
+            winner, first_chunk = await _race(tasks)
+        except BaseException:
+            for stream in streams.values():
+                await _close_stream(stream)
+            raise
+        for name, stream in streams.items():
+            if name != winner:
+                await _close_stream(stream)
+
+        _record_race(policy, "stream", tasks, winner, start, hedged_at)
+        if first_chunk is None:
+            return
+
+        stream = streams[winner]
+        try:
+            chunk = first_chunk
+            while True:
+                if run_manager:
+                    await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+                try:
+                    chunk = await stream.__anext__()
+                except StopAsyncIteration:
+                    break
+        finally:
+            await _close_stream(stream)
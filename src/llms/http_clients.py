@@ -0,0 +1,82 @@
+import importlib.util
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# (base_url, verify_ssl) -> (同步客户端, 异步客户端)，进程内所有指向同一端点的模型共享连接池
+_http_clients: Dict[Tuple[str, bool], Tuple[httpx.Client, httpx.AsyncClient]] = {}
+_lock = threading.Lock()
+
+_DEFAULT_HTTP_CLIENT_CONF: Dict[str, Any] = {
+    "max_connections": 100,
+    "max_keepalive_connections": 20,
+    "keepalive_expiry": 30.0,
+    "connect_timeout": 10.0,
+    "read_timeout": 120.0,
+    "write_timeout": 30.0,
+    "pool_timeout": 10.0,
+    "http2": True,
+}
+
+
+def _http2_available(requested: bool) -> bool:
+    """HTTP/2 依赖 httpx[http2] 中的 h2，环境中缺少 h2 时回退到 HTTP/1.1 keep-alive"""
+    if not requested:
+        return False
+    if importlib.util.find_spec("h2") is None:
+        logger.warning("h2 is not installed, shared LLM HTTP clients use HTTP/1.1")
+        return False
+    return True
+
+
+def get_http_timeout(http_conf: Optional[Dict[str, Any]] = None) -> httpx.Timeout:
+    conf = {**_DEFAULT_HTTP_CLIENT_CONF, **(http_conf or {})}
+    return httpx.Timeout(
+        connect=float(conf["connect_timeout"]),
+        read=float(conf["read_timeout"]),
+        write=float(conf["write_timeout"]),
+        pool=float(conf["pool_timeout"]),
+    )
+
+
+def get_http_clients(
+        base_url: Optional[str],
+        verify_ssl: bool = True,
+        http_conf: Optional[Dict[str, Any]] = None,
+) -> Tuple[httpx.Client, httpx.AsyncClient]:
+    """获取指向 base_url 的共享 HTTP 客户端，连接池参数来自 conf.yaml 的 HTTP_CLIENT 配置
+
+    同一端点只创建一次，后续调用（包括不同模型类型）复用相同的客户端。
+    """
+    key = ((base_url or "default").rstrip("/"), bool(verify_ssl))
+    with _lock:
+        if key in _http_clients:
+            return _http_clients[key]
+
+        conf = {**_DEFAULT_HTTP_CLIENT_CONF, **(http_conf or {})}
+        limits = httpx.Limits(
+            max_connections=int(conf["max_connections"]),
+            max_keepalive_connections=int(conf["max_keepalive_connections"]),
+            keepalive_expiry=float(conf["keepalive_expiry"]),
+        )
+        timeout = get_http_timeout(conf)
+        http2 = _http2_available(bool(conf["http2"]))
+        client_kwargs = {"limits": limits, "timeout": timeout, "verify": bool(verify_ssl), "http2": http2}
+        clients = (httpx.Client(**client_kwargs), httpx.AsyncClient(**client_kwargs))
+        _http_clients[key] = clients
+        logger.info(f"Created shared HTTP clients for {key[0]} (http2={http2}, limits={limits})")
+        return clients
+
+
+async def aclose_http_clients() -> None:
+    """关闭所有共享的 HTTP 客户端（服务关闭时调用）"""
+    with _lock:
+        clients = list(_http_clients.values())
+        _http_clients.clear()
+    for client, async_client in clients:
+        client.close()
+        await async_client.aclose()
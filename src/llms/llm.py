@@ -1,15 +1,26 @@
 import os
 from pathlib import Path
-from typing import Dict, Any
+from typing import Any, ClassVar, Dict, Type, TypeVar
 
-import httpx
 from langchain_core.language_models import BaseChatModel
 from langchain_deepseek import ChatDeepSeek
 from langchain_openai import AzureChatOpenAI, ChatOpenAI
 
 from src.config.agents import LLMType
 from src.config.loader import load_yaml_config
+from src.llms.context_guard import ContextGuardMixin, configure_context_guard
+from src.llms.hedging import HedgingMixin, configure_hedging
+from src.llms.http_clients import get_http_clients, get_http_timeout
 from src.llms.providers.dashscope import ChatDashscope
+from src.llms.providers.fake import ChatFake
+from src.llms.rate_limit import RateLimitMixin, configure_rate_limiter
+from src.llms.resilience import ResilienceMixin, get_llm_dependency
+from src.llms.response_cache import ResponseCacheMixin, is_llm_cache_enabled
+from src.llms.single_flight import SingleFlightMixin, is_llm_single_flight_enabled
+from src.llms.usage import register_model_pricing
+from src.utils.resilience import is_resilience_enabled
+
+T = TypeVar("T")
 
 _llm_cache: dict[LLMType, BaseChatModel] = {}
 
@@ -85,29 +96,162 @@ def _create_llm_use_conf(llm_type: LLMType, conf: Dict[str, Any]) -> BaseChatMod
     if "max_retries" not in merged_conf:
         merged_conf["max_retries"] = 3
 
+    # 主模型首个 token 过慢时向备用模型发送对冲请求（conf.yaml 中模型配置的 hedge）
+    hedge_conf = merged_conf.pop("hedge", None)
+    secondary = None
+    if hedge_conf:
+        secondary_conf = _get_hedge_secondary_conf(llm_type, merged_conf, hedge_conf, conf)
+        secondary = _build_llm(f"{llm_type}_hedge", llm_type, secondary_conf, conf, primary=False)
+    hedge_policy = configure_hedging(llm_type, secondary, hedge_conf)
+
+    return _build_llm(llm_type, llm_type, merged_conf, conf, hedged=hedge_policy is not None)
+
+
+def _get_hedge_secondary_conf(llm_type: LLMType, merged_conf: Dict[str, Any], hedge_conf: Dict[str, Any],
+                              conf: Dict[str, Any]) -> Dict[str, Any]:
+    """备用模型的配置：secondary 为配置键（例如 REASONING_MODEL）时使用该模型的配置，为字典时覆盖主模型的配置"""
+    secondary = hedge_conf.get("secondary")
+    if isinstance(secondary, str):
+        secondary_conf = conf.get(secondary)
+        if not isinstance(secondary_conf, dict):
+            raise ValueError(f"Invalid hedge secondary for {llm_type}: {secondary}")
+        secondary_conf = dict(secondary_conf)
+    elif isinstance(secondary, dict):
+        secondary_conf = {**merged_conf, **secondary}
+    else:
+        raise ValueError(f"Invalid hedge secondary for {llm_type}: {secondary}")
+    # 备用模型不再对冲；未单独配置限流时不限流
+    secondary_conf.pop("hedge", None)
+    if isinstance(secondary, dict) and "rate_limit" not in secondary:
+        secondary_conf.pop("rate_limit", None)
+    secondary_conf.setdefault("max_retries", merged_conf.get("max_retries", 3))
+    return secondary_conf
+
+
+def _build_llm(layer_key: str, llm_type: LLMType, merged_conf: Dict[str, Any], conf: Dict[str, Any],
+               primary: bool = True, hedged: bool = False) -> BaseChatModel:
+    """根据合并后的模型配置创建模型实例，layer_key 用于查找该实例的限流器等调用层状态"""
+    merged_conf = dict(merged_conf)
+
+    # 调用前按上下文窗口裁剪提示词（conf.yaml 中模型配置的 context_window）
+    context_guard = configure_context_guard(layer_key, merged_conf.pop("context_window", None),
+                                            merged_conf.get("model"))
+
+    # 开启 ENABLE_RESILIENCE 时由熔断和重试预算层负责重试，SDK 不再自行重试
+    resilient = is_resilience_enabled()
+    if resilient:
+        get_llm_dependency(layer_key, max_retries=int(merged_conf.get("max_retries", 3)))
+        merged_conf["max_retries"] = 0
+
+    # 按 RPM/TPM 限流（conf.yaml 中模型配置的 rate_limit）；SDK 内部的重试不经过令牌桶，
+    # 未开启弹性层时由限流层负责重试，每次重试重新排队
+    rate_limiter = configure_rate_limiter(layer_key, merged_conf.pop("rate_limit", None),
+                                          max_retries=int(merged_conf.get("max_retries", 3)))
+    if rate_limiter is not None:
+        merged_conf["max_retries"] = 0
+
+    # 模型价格用于估算调用费用
+    register_model_pricing(merged_conf.get("model"), merged_conf.pop("pricing", None))
+
+    if merged_conf.pop("provider", None) == "fake":
+        # 本地脚本化模型，用于离线压测，不发起网络请求
+        merged_conf.pop("verify_ssl", None)
+        llm_class = ChatFake
+    else:
+        llm_class = _prepare_remote_llm_conf(llm_type, merged_conf, conf)
+
+    layers = _get_llm_layers(primary=primary, hedged=hedged, resilient=resilient,
+                             rate_limited=rate_limiter is not None, guarded=context_guard is not None)
+    return create_layered_llm_class(llm_class, layer_key, layers)(**merged_conf)
+
+
+def _prepare_remote_llm_conf(llm_type: LLMType, merged_conf: Dict[str, Any], conf: Dict[str, Any]) -> Type[BaseChatModel]:
+    """补全远程模型的连接配置（SSL、共享连接池、超时），返回模型类"""
+    # 流式调用也返回 token 用量
+    merged_conf.setdefault("stream_usage", True)
+
     # 处理SSL验证设置
     verify_ssl = merged_conf.pop("verify_ssl", True)
+    if isinstance(verify_ssl, str):
+        verify_ssl = verify_ssl.strip().lower() not in ("false", "0", "no", "off")
 
-    # Create custom HTTP client if SSL verification is disabled
-    if not verify_ssl:
-        http_client = httpx.Client(verify=False)
-        http_async_client = httpx.AsyncClient(verify=False)
-        merged_conf["http_client"] = http_client
-        merged_conf["http_async_client"] = http_async_client
-
+    # 指向同一端点的所有模型共享进程级的连接池（keep-alive，可用时启用 HTTP/2）
+    http_conf = conf.get("HTTP_CLIENT", {}) or {}
     if "azure_endpoint" in merged_conf or os.getenv("AZURE_OPENAI_ENDPOINT"):
-        return AzureChatOpenAI(**merged_conf)
+        endpoint = merged_conf.get("azure_endpoint") or os.getenv("AZURE_OPENAI_ENDPOINT")
+    else:
+        endpoint = merged_conf.get("base_url")
+    http_client, http_async_client = get_http_clients(endpoint, verify_ssl, http_conf)
+    merged_conf.setdefault("http_client", http_client)
+    merged_conf.setdefault("http_async_client", http_async_client)
+    # OpenAI SDK 在每个请求上传递超时，未单独配置时使用连接池的超时设置
+    if "timeout" not in merged_conf and "request_timeout" not in merged_conf:
+        merged_conf["timeout"] = get_http_timeout(http_conf)
 
+    if "azure_endpoint" in merged_conf or os.getenv("AZURE_OPENAI_ENDPOINT"):
+        llm_class = AzureChatOpenAI
     # Check if base_url is dashscope endpoint
-    if "base_url" in merged_conf and "dashscope." in merged_conf["base_url"]:
+    elif "base_url" in merged_conf and "dashscope." in merged_conf["base_url"]:
         if llm_type == "reasoning":
             merged_conf["extra_body"] = {"enable_thinking": True}
         else:
             merged_conf["extra_body"] = {"enable_thinking": False}
-        return ChatDashscope(**merged_conf)
-
-    if llm_type == "reasoning":
+        llm_class = ChatDashscope
+    elif llm_type == "reasoning":
         merged_conf["api_base"] = merged_conf.pop("base_url", None)
-        return ChatDeepSeek(**merged_conf)
+        llm_class = ChatDeepSeek
     else:
-        return ChatOpenAI(**merged_conf)
+        llm_class = ChatOpenAI
+    return llm_class
+
+
+def _get_llm_layers(primary: bool = True, hedged: bool = False, resilient: bool = False,
+                    rate_limited: bool = False, guarded: bool = False) -> list[type]:
+    """按配置启用的模型调用层，列表中靠前的层先处理调用
+
+    备用模型（primary=False）只由主模型的对冲层调用，不再经过缓存和合并层。
+    """
+    layers = []
+    if primary and is_llm_cache_enabled():
+        layers.append(ResponseCacheMixin)
+    if primary and is_llm_single_flight_enabled():
+        layers.append(SingleFlightMixin)
+    if guarded:
+        # 裁剪在对冲和限流之前：备用模型收到同样裁剪后的提示词，限流按裁剪后的 token 数计算
+        layers.append(ContextGuardMixin)
+    if hedged:
+        # 对冲放在限流之前：主模型和备用模型的请求分别按各自的配额限流
+        layers.append(HedgingMixin)
+    if resilient:
+        # 熔断和重试在对冲之内：主模型熔断时对冲层立即改用备用模型；每次重试重新排队限流
+        layers.append(ResilienceMixin)
+    if rate_limited:
+        # 限流放在缓存和合并之后：命中缓存或被合并的调用不消耗配额
+        layers.append(RateLimitMixin)
+    return layers
+
+
+def create_layered_llm_class(llm_class: Type[T], llm_type: str, layers: list[type]) -> Type[T]:
+    """
+    Factory function to create a version of a chat model class with the given call layers.
+
+    Args:
+        llm_class: The original chat model class
+        llm_type: The LLM type the class is created for, available to the layers as `llm_layer_key`
+        layers: Mixin classes overriding _generate/_agenerate/_stream/_astream
+
+    Returns:
+        The original class when no layers are enabled, otherwise a subclass of all layers and the class
+    """
+    if not layers:
+        return llm_class
+
+    return type(
+        llm_class.__name__,
+        (*layers, llm_class),
+        {
+            "__module__": llm_class.__module__,
+            "__annotations__": {"llm_layer_key": ClassVar[str]},
+            "llm_layer_key": llm_type,
+        },
+    )
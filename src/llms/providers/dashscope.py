@@ -2,11 +2,11 @@
 # SPDX-License-Identifier: MIT
 
 # Standard library imports
-from typing import Any, Dict, Iterator, List, Mapping, Optional, Type, Union, cast
+from typing import Any, AsyncIterator, Dict, Iterator, List, Mapping, Optional, Type, Union, cast
 
 # Third-party imports
 import openai
-from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
 from langchain_core.messages import (
     AIMessageChunk,
     BaseMessage,
@@ -246,6 +246,9 @@ class ChatDashscope(ChatOpenAI):
             openai.BadRequestError: If the API request is invalid
         """
         kwargs["stream"] = True
+        # Request a final usage chunk, matching ChatOpenAI's stream_usage handling
+        if self._should_stream_usage(kwargs.pop("stream_usage", None), **kwargs):
+            kwargs["stream_options"] = {"include_usage": True}
         payload = self._get_request_payload(messages, stop=stop, **kwargs)
         default_chunk_class: Type[BaseMessageChunk] = AIMessageChunk
         base_generation_info: Dict[str, Any] = {}
@@ -320,3 +323,106 @@ class ChatDashscope(ChatOpenAI):
             except AttributeError:
                 # If get_final_completion method doesn't exist, continue without it
                 pass
+
+    async def _astream(
+            self,
+            messages: List[BaseMessage],
+            stop: Optional[List[str]] = None,
+            run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+            **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        """Create an async streaming generator for chat completions.
+
+        Uses the async OpenAI client and the same delta conversion as `_stream`,
+        so reasoning_content is preserved without running the sync stream in a thread.
+
+        Args:
+            messages: List of messages to send to the model
+            stop: Optional list of stop sequences
+            run_manager: Optional async callback manager for LLM runs
+            **kwargs: Additional keyword arguments for the API call
+
+        Yields:
+            ChatGenerationChunk: Individual chunks from the streaming response
+
+        Raises:
+            openai.BadRequestError: If the API request is invalid
+        """
+        kwargs["stream"] = True
+        # Request a final usage chunk, matching ChatOpenAI's stream_usage handling
+        if self._should_stream_usage(kwargs.pop("stream_usage", None), **kwargs):
+            kwargs["stream_options"] = {"include_usage": True}
+        payload = self._get_request_payload(messages, stop=stop, **kwargs)
+        default_chunk_class: Type[BaseMessageChunk] = AIMessageChunk
+        base_generation_info: Dict[str, Any] = {}
+
+        # Handle response format for beta completions
+        if "response_format" in payload:
+            if self.include_response_headers:
+                warnings.warn(
+                    "Cannot currently include response headers when response_format is "
+                    "specified."
+                )
+            payload.pop("stream")
+            response_stream = self.root_async_client.beta.chat.completions.stream(**payload)
+            context_manager = response_stream
+        else:
+            # Handle regular streaming with optional response headers
+            if self.include_response_headers:
+                raw_response = await self.async_client.with_raw_response.create(**payload)
+                response = raw_response.parse()
+                base_generation_info = {"headers": dict(raw_response.headers)}
+            else:
+                response = await self.async_client.create(**payload)
+            context_manager = response
+
+        try:
+            async with context_manager as response:
+                is_first_chunk = True
+                async for chunk in response:
+                    # Convert chunk to dict if it's a model object
+                    if not isinstance(chunk, dict):
+                        chunk = chunk.model_dump()
+
+                    generation_chunk = _convert_chunk_to_generation_chunk(
+                        chunk,
+                        default_chunk_class,
+                        base_generation_info if is_first_chunk else {},
+                    )
+
+                    if generation_chunk is None:
+                        continue
+
+                    # Update default chunk class for subsequent chunks
+                    default_chunk_class = generation_chunk.message.__class__
+
+                    # Handle log probabilities for callback
+                    logprobs = (generation_chunk.generation_info or {}).get("logprobs")
+                    if run_manager:
+                        await run_manager.on_llm_new_token(
+                            generation_chunk.text,
+                            chunk=generation_chunk,
+                            logprobs=logprobs,
+                        )
+
+                    is_first_chunk = False
+                    yield generation_chunk
+
+        except openai.BadRequestError as e:
+            _handle_openai_bad_request(e)
+
+        # Handle final completion for response_format requests
+        if hasattr(response, "get_final_completion") and "response_format" in payload:
+            try:
+                final_completion = await response.get_final_completion()
+                generation_chunk = self._get_generation_chunk_from_completion(
+                    final_completion
+                )
+                if run_manager:
+                    await run_manager.on_llm_new_token(
+                        generation_chunk.text, chunk=generation_chunk
+                    )
+                yield generation_chunk
+            except AttributeError:
+                # If get_final_completion method doesn't exist, continue without it
+                pass
@@ -0,0 +1,291 @@
+# Standard library imports
+import asyncio
+import hashlib
+import json
+import re
+import time
+import uuid
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional, Sequence, Union
+
+# Third-party imports
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel, LanguageModelInput
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.messages.ai import UsageMetadata
+from langchain_core.messages.tool import tool_call_chunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import Runnable
+from langchain_core.tools import BaseTool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import Field
+
+from src.utils.token_utils import count_tokens
+
+_CJK_PATTERN = re.compile(r"[぀-ヿ㐀-䶿一-鿿가-힯]")
+
+# The planner prompt describes the Plan interface; answering it with plan JSON mirrors the real planner
+_PLAN_PROMPT_MARKER = "has_enough_context"
+
+_DEFAULT_TOOL_CALLS = {
+    "handoff_to_planner": {"research_topic": "{topic}", "locale": "{locale}"},
+}
+
+
+def _message_text(message: BaseMessage) -> str:
+    content = message.content
+    return content if isinstance(content, str) else json.dumps(content, ensure_ascii=False)
+
+
+def _get_topic(messages: List[BaseMessage]) -> str:
+    """The latest user message, used as the research topic of scripted responses."""
+    for message in reversed(messages):
+        if isinstance(message, HumanMessage):
+            return _message_text(message).strip()
+    return ""
+
+
+def _prompt_hash(messages: List[BaseMessage]) -> str:
+    """Same prompt, same hash; seeds the filler text and the message and tool call ids."""
+    return hashlib.sha1("".join(_message_text(message) for message in messages).encode("utf-8")).hexdigest()
+
+
+def _fill(value: Any, variables: Dict[str, str]) -> Any:
+    if isinstance(value, str):
+        for name, replacement in variables.items():
+            value = value.replace("{" + name + "}", replacement)
+        return value
+    if isinstance(value, dict):
+        return {key: _fill(item, variables) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_fill(item, variables) for item in value]
+    return value
+
+
+def _tool_name(tool: Dict[str, Any]) -> str:
+    return tool.get("function", {}).get("name") or tool.get("name", "")
+
+
+class ChatFake(BaseChatModel):
+    """A deterministic local chat model for load and latency testing.
+
+    Responses are scripted from the request instead of generated, and are emitted at a
+    configurable time to first token and token rate, so the whole graph can run offline
+    with realistic latency:
+
+    - a forced tool choice (structured output) is answered with a tool call built from the
+      fixture of that tool, e.g. `Plan`;
+    - bound tools listed in `tool_calls` (by default `handoff_to_planner`) are called once
+      per user turn with the configured arguments;
+    - the planner prompt is answered with the plan fixture as JSON text;
+    - everything else gets `completion_tokens` tokens of filler text.
+
+    String values in fixtures may use the `{topic}` and `{locale}` placeholders.
+    """
+
+    model: str = "fake"
+    ttft_seconds: float = 0.5
+    """Delay before the first token, in seconds."""
+    tokens_per_second: float = 50.0
+    """Token rate after the first token; 0 emits all tokens at once."""
+    completion_tokens: int = 200
+    """Number of filler tokens in text responses."""
+    plan_steps: int = 3
+    """Number of steps in the built-in plan fixture."""
+    plan_fixture: Optional[Union[str, Dict[str, Any]]] = None
+    """Plan returned to the planner, inline or as a path to a JSON file; defaults to a built-in plan."""
+    tool_calls: Dict[str, Dict[str, Any]] = Field(default_factory=lambda: dict(_DEFAULT_TOOL_CALLS))
+    """Arguments of the bound tools the model calls, by tool name."""
+    tool_fixtures: Dict[str, Dict[str, Any]] = Field(default_factory=dict)
+    """Arguments of forced tool calls (structured output schemas), by tool name."""
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "ttft_seconds": self.ttft_seconds,
+            "tokens_per_second": self.tokens_per_second,
+            "completion_tokens": self.completion_tokens,
+        }
+
+    def bind_tools(
+            self,
+            tools: Sequence[Union[Dict[str, Any], type, Callable, BaseTool]],
+            *,
+            tool_choice: Optional[Union[dict, str, bool]] = None,
+            **kwargs: Any,
+    ) -> Runnable[LanguageModelInput, BaseMessage]:
+        """Bind tools in the OpenAI format, so scripted responses can call them by name."""
+        formatted_tools = [convert_to_openai_tool(tool) for tool in tools]
+        if tool_choice is not None:
+            kwargs["tool_choice"] = tool_choice
+        return super().bind(tools=formatted_tools, **kwargs)
+
+    def _get_plan(self, topic: str, locale: str) -> Dict[str, Any]:
+        if isinstance(self.plan_fixture, str):
+            return json.loads(Path(self.plan_fixture).read_text(encoding="utf-8"))
+        if isinstance(self.plan_fixture, dict):
+            return self.plan_fixture
+        return {
+            "locale": locale,
+            "has_enough_context": False,
+            "thought": f"To answer '{topic}', we need to collect background, current data and expert analysis.",
+            "title": f"Research Plan: {topic}",
+            "steps": [
+                {
+                    "need_search": True,
+                    "title": f"Research aspect {index + 1} of {topic}",
+                    "description": f"Collect facts, data and sources on aspect {index + 1} of {topic}.",
+                    "step_type": "research",
+                }
+                for index in range(self.plan_steps)
+            ],
+        }
+
+    def _script(self, messages: List[BaseMessage], **kwargs: Any) -> AIMessage:
+        """Build the scripted response for a request."""
+        topic = _get_topic(messages)
+        locale = "zh-CN" if _CJK_PATTERN.search(topic) else "en-US"
+        variables = {"topic": topic, "locale": locale}
+        tools = kwargs.get("tools") or []
+        tool_names = [_tool_name(tool) for tool in tools]
+
+        # Structured output: the only bound tool is forced
+        tool_choice = kwargs.get("tool_choice")
+        forced_tool = None
+        if isinstance(tool_choice, dict):
+            forced_tool = tool_choice.get("function", {}).get("name")
+        elif tool_choice in ("any", "required", True) and len(tool_names) == 1:
+            forced_tool = tool_names[0]
+        elif isinstance(tool_choice, str) and tool_choice in tool_names:
+            forced_tool = tool_choice
+        if forced_tool:
+            args = self.tool_fixtures.get(forced_tool)
+            if args is None and forced_tool == "Plan":
+                args = self._get_plan(topic, locale)
+            return self._tool_call_message(messages, forced_tool, _fill(args or {}, variables))
+
+        # Scripted tool calls, once per user turn
+        answered = False
+        for message in reversed(messages):
+            if isinstance(message, HumanMessage):
+                break
+            if isinstance(message, ToolMessage):
+                answered = True
+        for name in tool_names:
+            if name in self.tool_calls and not answered:
+                return self._tool_call_message(messages, name, _fill(self.tool_calls[name], variables))
+
+        if any(isinstance(message, SystemMessage) and _PLAN_PROMPT_MARKER in _message_text(message)
+               for message in messages):
+            return AIMessage(content=json.dumps(_fill(self._get_plan(topic, locale), variables), ensure_ascii=False))
+
+        return AIMessage(content=self._filler_text(messages))
+
+    def _filler_text(self, messages: List[BaseMessage]) -> str:
+        seed = _prompt_hash(messages)
+        words = [f"token{seed[index % len(seed)]}" for index in range(self.completion_tokens)]
+        return " ".join(words)
+
+    @staticmethod
+    def _tool_call_message(messages: List[BaseMessage], name: str, args: Dict[str, Any]) -> AIMessage:
+        return AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": f"call_{_prompt_hash(messages)[:24]}"}])
+
+    @staticmethod
+    def _usage(messages: List[BaseMessage], message: AIMessage) -> UsageMetadata:
+        input_tokens = sum(count_tokens(_message_text(item)) for item in messages)
+        output_tokens = count_tokens(_message_text(message)) + sum(
+            count_tokens(json.dumps(call["args"], ensure_ascii=False)) for call in message.tool_calls)
+        return UsageMetadata(input_tokens=input_tokens, output_tokens=output_tokens,
+                             total_tokens=input_tokens + output_tokens)
+
+    def _pieces(self, message: AIMessage) -> List[str]:
+        """Split the scripted text into streamed tokens."""
+        return re.findall(r"\S+\s*|\s+", message.content) if message.content else []
+
+    def _generation_seconds(self, message: AIMessage) -> float:
+        if self.tokens_per_second <= 0:
+            return self.ttft_seconds
+        return self.ttft_seconds + max(len(self._pieces(message)) - 1, 0) / self.tokens_per_second
+
+    def _chunks(self, messages: List[BaseMessage], message: AIMessage) -> Iterator[ChatGenerationChunk]:
+        message_id = f"run-{uuid.UUID(_prompt_hash(messages)[:32])}"
+        usage = self._usage(messages, message)
+        if message.tool_calls:
+            chunks = [AIMessageChunk(content="", id=message_id, tool_call_chunks=[
+                tool_call_chunk(name=call["name"], args=json.dumps(call["args"], ensure_ascii=False),
+                                id=call["id"], index=index)
+                for index, call in enumerate(message.tool_calls)
+            ])]
+        else:
+            chunks = [AIMessageChunk(content=piece, id=message_id) for piece in self._pieces(message)]
+        chunks.append(AIMessageChunk(content="", id=message_id, usage_metadata=usage,
+                                     response_metadata={"finish_reason": "tool_calls" if message.tool_calls else "stop"}))
+        for chunk in chunks:
+            yield ChatGenerationChunk(message=chunk)
+
+    def _result(self, messages: List[BaseMessage], message: AIMessage) -> ChatResult:
+        message.usage_metadata = self._usage(messages, message)
+        message.response_metadata = {"finish_reason": "tool_calls" if message.tool_calls else "stop",
+                                     "model_name": self.model}
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(
+            self,
+            messages: List[BaseMessage],
+            stop: Optional[List[str]] = None,
+            run_manager: Optional[CallbackManagerForLLMRun] = None,
+            **kwargs: Any,
+    ) -> ChatResult:
+        message = self._script(messages, **kwargs)
+        time.sleep(self._generation_seconds(message))
+        return self._result(messages, message)
+
+    async def _agenerate(
+            self,
+            messages: List[BaseMessage],
+            stop: Optional[List[str]] = None,
+            run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+            **kwargs: Any,
+    ) -> ChatResult:
+        message = self._script(messages, **kwargs)
+        await asyncio.sleep(self._generation_seconds(message))
+        return self._result(messages, message)
+
+    def _stream(
+            self,
+            messages: List[BaseMessage],
+            stop: Optional[List[str]] = None,
+            run_manager: Optional[CallbackManagerForLLMRun] = None,
+            **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        message = self._script(messages, **kwargs)
+        interval = 1 / self.tokens_per_second if self.tokens_per_second > 0 else 0
+        time.sleep(self.ttft_seconds)
+        for index, chunk in enumerate(self._chunks(messages, message)):
+            if index and interval and chunk.text:
+                time.sleep(interval)
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    async def _astream(
+            self,
+            messages: List[BaseMessage],
+            stop: Optional[List[str]] = None,
+            run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+            **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        message = self._script(messages, **kwargs)
+        interval = 1 / self.tokens_per_second if self.tokens_per_second > 0 else 0
+        await asyncio.sleep(self.ttft_seconds)
+        for index, chunk in enumerate(self._chunks(messages, message)):
+            if index and interval and chunk.text:
+                await asyncio.sleep(interval)
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
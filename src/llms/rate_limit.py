@@ -0,0 +1,313 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+
+from src.config.configuration import get_int_env
+from src.utils.deadline import remaining_seconds
+from src.utils.resilience import is_retryable_error
+from src.utils.token_utils import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# 模型类型 -> 限流器，由 conf.yaml 中各模型的 rate_limit 配置创建
+_rate_limiters: Dict[str, "TokenBucketRateLimiter"] = {}
+
+# 低于该时长的排队不计为等待
+_MIN_WAIT_SECONDS = 0.01
+
+
+class TokenBucketRateLimiter:
+    """按每分钟请求数（RPM）和 token 数（TPM）限流的令牌桶
+
+    调用方按到达顺序排队等待（不会因为配额不足而失败），调用结束后按实际用量校正 token 桶。
+    失败的调用最多重试 max_retries 次，每次重试重新排队取得配额。
+    """
+
+    def __init__(self, name: str, requests_per_minute: Optional[float] = None,
+                 tokens_per_minute: Optional[float] = None, estimated_completion_tokens: int = 1000,
+                 max_retries: int = 0):
+        self.name = name
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.estimated_completion_tokens = estimated_completion_tokens
+        self.max_retries = max_retries
+        now = time.monotonic()
+        self._request_tokens = float(requests_per_minute or 0)
+        self._token_tokens = float(tokens_per_minute or 0)
+        self._updated_at = now
+        self._state_lock = threading.Lock()
+        # asyncio.Lock 按 FIFO 顺序唤醒等待者；同步调用使用线程锁
+        self._async_lock: Optional[asyncio.Lock] = None
+        self._async_lock_loop = None
+        self._sync_lock = threading.Lock()
+
+        self.queue_depth = 0
+        self.requests = 0
+        self.waited_requests = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.retries = 0
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated_at
+        self._updated_at = now
+        if self.requests_per_minute:
+            self._request_tokens = min(float(self.requests_per_minute),
+                                       self._request_tokens + elapsed * self.requests_per_minute / 60)
+        if self.tokens_per_minute:
+            self._token_tokens = min(float(self.tokens_per_minute),
+                                     self._token_tokens + elapsed * self.tokens_per_minute / 60)
+
+    def _try_acquire(self, tokens: int) -> float:
+        """尝试取得配额，成功返回 0，否则返回需要等待的秒数"""
+        with self._state_lock:
+            self._refill(time.monotonic())
+            wait = 0.0
+            if self.requests_per_minute and self._request_tokens < 1:
+                wait = max(wait, (1 - self._request_tokens) * 60 / self.requests_per_minute)
+            if self.tokens_per_minute:
+                # 单个请求超过整个桶的容量时按桶容量计算，避免永远等待
+                tokens = min(tokens, self.tokens_per_minute)
+                if self._token_tokens < tokens:
+                    wait = max(wait, (tokens - self._token_tokens) * 60 / self.tokens_per_minute)
+            if wait > 0:
+                return wait
+            if self.requests_per_minute:
+                self._request_tokens -= 1
+            if self.tokens_per_minute:
+                self._token_tokens -= tokens
+            return 0.0
+
+    def _record(self, waited: float) -> None:
+        with self._state_lock:
+            self.requests += 1
+            if waited > _MIN_WAIT_SECONDS:
+                self.waited_requests += 1
+                self.total_wait_seconds += waited
+                self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def _get_async_lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._async_lock is None or self._async_lock_loop is not loop:
+            self._async_lock = asyncio.Lock()
+            self._async_lock_loop = loop
+        return self._async_lock
+
+    async def acquire(self, tokens: int) -> None:
+        start = time.monotonic()
+        self.queue_depth += 1
+        try:
+            async with self._get_async_lock():
+                while (wait := self._try_acquire(tokens)) > 0:
+                    await asyncio.sleep(wait)
+        finally:
+            self.queue_depth -= 1
+        waited = time.monotonic() - start
+        if waited > _MIN_WAIT_SECONDS:
+            logger.debug(f"LLM 限流 {self.name} 等待 {waited:.2f}s")
+        self._record(waited)
+
+    def acquire_sync(self, tokens: int) -> None:
+        start = time.monotonic()
+        with self._state_lock:
+            self.queue_depth += 1
+        try:
+            with self._sync_lock:
+                while (wait := self._try_acquire(tokens)) > 0:
+                    time.sleep(wait)
+        finally:
+            with self._state_lock:
+                self.queue_depth -= 1
+        self._record(time.monotonic() - start)
+
+    def reconcile(self, estimated_tokens: int, actual_tokens: Optional[int]) -> None:
+        """按实际 token 用量校正 token 桶：多退少补"""
+        if not self.tokens_per_minute or actual_tokens is None:
+            return
+        with self._state_lock:
+            self._token_tokens = min(float(self.tokens_per_minute),
+                                     self._token_tokens + min(estimated_tokens, self.tokens_per_minute) - actual_tokens)
+
+    def retry_delay(self, error: BaseException, attempt: int) -> Optional[float]:
+        """第 attempt 次失败后可以重试时返回等待时间（带抖动的指数退避），否则返回 None"""
+        if attempt >= self.max_retries or not is_retryable_error(error):
+            return None
+        base_delay = get_int_env("RETRY_BASE_DELAY_MS", 200) / 1000
+        max_delay = get_int_env("RETRY_MAX_DELAY_MS", 5000) / 1000
+        delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+        remaining = remaining_seconds()
+        if remaining is not None and remaining <= delay:
+            return None
+        with self._state_lock:
+            self.retries += 1
+        logger.info(f"LLM {self.name} 调用失败，{delay:.2f}s 后重新排队重试 ({attempt + 1}/{self.max_retries}): {error}")
+        return delay
+
+    def estimate_tokens(self, messages: List[BaseMessage], kwargs: dict) -> int:
+        prompt_tokens = sum(count_tokens(str(message.content)) for message in messages)
+        completion_tokens = kwargs.get("max_tokens") or kwargs.get("max_completion_tokens") \
+            or self.estimated_completion_tokens
+        return prompt_tokens + int(completion_tokens)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "queue_depth": self.queue_depth,
+            "requests": self.requests,
+            "waited_requests": self.waited_requests,
+            "avg_wait_seconds": round(self.total_wait_seconds / self.requests, 3) if self.requests else 0.0,
+            "max_wait_seconds": round(self.max_wait_seconds, 3),
+            "retries": self.retries,
+        }
+
+
+def configure_rate_limiter(llm_type: str, rate_limit_conf: Optional[dict],
+                           max_retries: int = 0) -> Optional[TokenBucketRateLimiter]:
+    """根据模型配置中的 rate_limit 创建限流器，未配置 RPM/TPM 时返回 None
+
+    max_retries 为限流层的重试次数：SDK 内部的重试不经过令牌桶，配置限流时改由限流层重试。
+    """
+    rate_limit_conf = rate_limit_conf or {}
+    requests_per_minute = rate_limit_conf.get("requests_per_minute")
+    tokens_per_minute = rate_limit_conf.get("tokens_per_minute")
+    if not requests_per_minute and not tokens_per_minute:
+        _rate_limiters.pop(llm_type, None)
+        return None
+    limiter = TokenBucketRateLimiter(
+        llm_type,
+        requests_per_minute=float(requests_per_minute) if requests_per_minute else None,
+        tokens_per_minute=float(tokens_per_minute) if tokens_per_minute else None,
+        estimated_completion_tokens=int(rate_limit_conf.get("estimated_completion_tokens", 1000)),
+        max_retries=max_retries,
+    )
+    _rate_limiters[llm_type] = limiter
+    logger.info(f"LLM {llm_type} 限流: RPM={requests_per_minute}, TPM={tokens_per_minute}")
+    return limiter
+
+
+def get_rate_limit_stats() -> dict[str, dict[str, Any]]:
+    return {llm_type: limiter.stats() for llm_type, limiter in _rate_limiters.items()}
+
+
+def _total_tokens(message: BaseMessage) -> Optional[int]:
+    usage = getattr(message, "usage_metadata", None)
+    return usage.get("total_tokens") if usage else None
+
+
+class RateLimitMixin:
+    """A mixin class that queues chat model calls behind the rate limiter of its model type.
+
+    Failed calls are retried here rather than inside the SDK, so every attempt queues for quota again.
+    Streaming calls are retried only until the first chunk arrives.
+    """
+
+    def _get_rate_limiter(self) -> Optional[TokenBucketRateLimiter]:
+        return _rate_limiters.get(getattr(self, "llm_layer_key", None))
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None,
+                  **kwargs: Any) -> ChatResult:
+        limiter = self._get_rate_limiter()
+        if limiter is None:
+            return super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        tokens = limiter.estimate_tokens(messages, kwargs)
+        attempt = 0
+        while True:
+            limiter.acquire_sync(tokens)
+            try:
+                result = super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+                break
+            except Exception as e:
+                delay = limiter.retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                time.sleep(delay)
+        limiter.reconcile(tokens, _total_tokens(result.generations[0].message) if result.generations else None)
+        return result
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None,
+                         **kwargs: Any) -> ChatResult:
+        limiter = self._get_rate_limiter()
+        if limiter is None:
+            return await super()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        tokens = limiter.estimate_tokens(messages, kwargs)
+        attempt = 0
+        while True:
+            await limiter.acquire(tokens)
+            try:
+                result = await super()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+                break
+            except Exception as e:
+                delay = limiter.retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay)
+        limiter.reconcile(tokens, _total_tokens(result.generations[0].message) if result.generations else None)
+        return result
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None,
+                **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        limiter = self._get_rate_limiter()
+        if limiter is None:
+            yield from super()._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+            return
+        tokens = limiter.estimate_tokens(messages, kwargs)
+        attempt = 0
+        while True:
+            limiter.acquire_sync(tokens)
+            stream = super()._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+            try:
+                first_chunk = next(stream, None)
+                break
+            except Exception as e:
+                stream.close()
+                delay = limiter.retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                time.sleep(delay)
+        if first_chunk is None:
+            return
+        actual_tokens = _total_tokens(first_chunk.message)
+        yield first_chunk
+        for chunk in stream:
+            actual_tokens = _total_tokens(chunk.message) or actual_tokens
+            yield chunk
+        limiter.reconcile(tokens, actual_tokens)
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None,
+                       **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        limiter = self._get_rate_limiter()
+        if limiter is None:
+            async for chunk in super()._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                yield chunk
+            return
+        tokens = limiter.estimate_tokens(messages, kwargs)
+        attempt = 0
+        while True:
+            await limiter.acquire(tokens)
+            stream = super()._astream(messages, stop=stop, run_manager=run_manager, **kwargs)
+            try:
+                first_chunk = await stream.__anext__()
+                break
+            except StopAsyncIteration:
+                return
+            except Exception as e:
+                await stream.aclose()
+                delay = limiter.retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay)
+        actual_tokens = _total_tokens(first_chunk.message)
+        yield first_chunk
+        async for chunk in stream:
+            actual_tokens = _total_tokens(chunk.message) or actual_tokens
+            yield chunk
+        limiter.reconcile(tokens, actual_tokens)
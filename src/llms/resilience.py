@@ -0,0 +1,84 @@
+import logging
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+
+from src.utils.resilience import ResiliencePolicy, get_dependency
+
+logger = logging.getLogger(__name__)
+
+
+def get_llm_dependency(llm_layer_key: str, max_retries: Optional[int] = None) -> ResiliencePolicy:
+    """模型的弹性策略，max_retries 对应 conf.yaml 中模型配置的 max_retries"""
+    return get_dependency(f"llm:{llm_layer_key}", max_attempts=max_retries + 1 if max_retries is not None else None)
+
+
+class ResilienceMixin:
+    """A mixin class that runs chat model calls behind the circuit breaker and retry budget of the model.
+
+    Streaming calls are retried only until the first chunk arrives.
+    """
+
+    def _get_llm_dependency(self) -> ResiliencePolicy:
+        return get_llm_dependency(getattr(self, "llm_layer_key", None))
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None,
+                  **kwargs: Any) -> ChatResult:
+        return self._get_llm_dependency().call(lambda: super(ResilienceMixin, self)._generate(
+            messages, stop=stop, run_manager=run_manager, **kwargs))
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None,
+                         **kwargs: Any) -> ChatResult:
+        return await self._get_llm_dependency().acall(lambda: super(ResilienceMixin, self)._agenerate(
+            messages, stop=stop, run_manager=run_manager, **kwargs))
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None,
+                **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        policy = self._get_llm_dependency()
+
+        def _open():
+            stream = super(ResilienceMixin, self)._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+            try:
+                return stream, next(stream)
+            except StopIteration:
+                return stream, None
+            except BaseException:
+                stream.close()
+                raise
+
+        stream, first_chunk = policy.call(_open)
+        if first_chunk is None:
+            return
+        yield first_chunk
+        try:
+            yield from stream
+        except Exception as e:
+            policy.record(e)
+            raise
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None,
+                       **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        policy = self._get_llm_dependency()
+
+        async def _open():
+            stream = super(ResilienceMixin, self)._astream(messages, stop=stop, run_manager=run_manager, **kwargs)
+            try:
+                return stream, await stream.__anext__()
+            except StopAsyncIteration:
+                return stream, None
+            except BaseException:
+                await stream.aclose()
+                raise
+
+        stream, first_chunk = await policy.acall(_open)
+        if first_chunk is None:
+            return
+        yield first_chunk
+        try:
+            async for chunk in stream:
+                yield chunk
+        except Exception as e:
+            # 已经输出的分片无法撤回，流中途失败只计入熔断，不重试
+            policy.record(e)
+            raise
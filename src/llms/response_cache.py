@@ -0,0 +1,187 @@
+import asyncio
+import logging
+import warnings
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core._api import LangChainBetaWarning
+from langchain_core.load import dumps, loads
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from src.cache.sqlite_store import SQLiteTTLStore
+from src.config.configuration import get_bool_env, get_int_env, get_str_env
+from src.llms.call_key import make_llm_call_key, serialize_call_value
+from src.llms.usage import mark_reused
+
+logger = logging.getLogger(__name__)
+
+_response_cache: Optional[SQLiteTTLStore] = None
+
+
+def is_llm_cache_enabled() -> bool:
+    return get_bool_env("ENABLE_LLM_CACHE", False)
+
+
+def get_llm_response_cache() -> Optional[SQLiteTTLStore]:
+    """获取 LLM 响应缓存，未通过 ENABLE_LLM_CACHE 开启时返回 None"""
+    global _response_cache
+    if not is_llm_cache_enabled():
+        return None
+    if _response_cache is None:
+        _response_cache = SQLiteTTLStore(
+            get_str_env("LLM_CACHE_PATH", "data/llm_cache.db"),
+            ttl=get_int_env("LLM_CACHE_TTL_SECONDS", 24 * 3600),
+            max_entries=get_int_env("LLM_CACHE_MAX_ENTRIES", 10000),
+            max_bytes=get_int_env("LLM_CACHE_MAX_MB", 512) * 1024 * 1024,
+        )
+    return _response_cache
+
+
+def get_llm_cache_stats() -> dict[str, int]:
+    cache = get_llm_response_cache()
+    return cache.stats() if cache is not None else {}
+
+
+def _load_message(data: str) -> BaseMessage:
+    """反序列化缓存的消息，清除原消息 ID 以便每次调用分配新的运行 ID"""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", LangChainBetaWarning)
+        message = loads(data)
+    message.id = None
+    return message
+
+
+def _dump_generations(generations: list[ChatGeneration]) -> Optional[list[dict]]:
+    """序列化生成结果，含有无法还原的内容（例如解析后的 pydantic 对象）时返回 None"""
+    try:
+        items = [
+            {"message": dumps(generation.message), "generation_info": serialize_call_value(generation.generation_info)}
+            for generation in generations
+        ]
+        for item in items:
+            _load_message(item["message"])
+    except Exception as e:
+        logger.debug(f"LLM 响应无法序列化，跳过缓存: {e}")
+        return None
+    return items
+
+
+class ResponseCacheMixin:
+    """A mixin class that serves chat model calls from the local LLM response cache.
+
+    The key covers the model parameters, rendered messages, stop words and call kwargs
+    (bound tools, tool choice, structured-output schema). Streaming calls replay cached chunks.
+    """
+
+    @staticmethod
+    def _load_result(cached: dict) -> Optional[ChatResult]:
+        try:
+            return ChatResult(generations=[
+                ChatGeneration(message=mark_reused(_load_message(item["message"]), "llm_cache"),
+                               generation_info=item["generation_info"])
+                for item in cached["generations"]
+            ], llm_output=cached.get("llm_output"))
+        except Exception as e:
+            logger.warning(f"LLM 响应缓存条目无法解析，忽略: {e}")
+            return None
+
+    @staticmethod
+    def _store_result(cache: SQLiteTTLStore, key: str, result: ChatResult) -> None:
+        generations = _dump_generations(result.generations)
+        if generations is not None:
+            cache.set(key, {"generations": generations, "llm_output": serialize_call_value(result.llm_output)})
+
+    @staticmethod
+    def _load_chunks(cached: dict) -> Optional[list[ChatGenerationChunk]]:
+        try:
+            chunks = [
+                ChatGenerationChunk(message=_load_message(item["message"]), generation_info=item["generation_info"])
+                for item in cached["chunks"]
+            ]
+        except Exception as e:
+            logger.warning(f"LLM 响应缓存条目无法解析，忽略: {e}")
+            return None
+        # 合并分片时保留标记，只需标记第一个分片
+        if chunks:
+            mark_reused(chunks[0].message, "llm_cache")
+        return chunks
+
+    @staticmethod
+    def _store_chunks(cache: SQLiteTTLStore, key: str, chunks: list[ChatGenerationChunk]) -> None:
+        generations = _dump_generations(chunks)
+        if generations is not None:
+            cache.set(key, {"chunks": generations})
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None,
+                  **kwargs: Any) -> ChatResult:
+        cache = get_llm_response_cache()
+        if cache is None:
+            return super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        key = make_llm_call_key(self, "generate", messages, stop, kwargs)
+        cached = cache.get(key)
+        if cached is not None and (result := self._load_result(cached)) is not None:
+            logger.debug(f"LLM 响应缓存命中: {key}")
+            return result
+        result = super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        self._store_result(cache, key, result)
+        return result
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None,
+                         **kwargs: Any) -> ChatResult:
+        cache = get_llm_response_cache()
+        if cache is None:
+            return await super()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        key = make_llm_call_key(self, "generate", messages, stop, kwargs)
+        # SQLite 读写不阻塞事件循环
+        cached = await asyncio.to_thread(cache.get, key)
+        if cached is not None and (result := self._load_result(cached)) is not None:
+            logger.debug(f"LLM 响应缓存命中: {key}")
+            return result
+        result = await super()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        await asyncio.to_thread(self._store_result, cache, key, result)
+        return result
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None,
+                **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        cache = get_llm_response_cache()
+        if cache is None:
+            yield from super()._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+            return
+        key = make_llm_call_key(self, "stream", messages, stop, kwargs)
+        cached = cache.get(key)
+        if cached is not None and (chunks := self._load_chunks(cached)) is not None:
+            logger.debug(f"LLM 流式响应缓存命中: {key}")
+            for chunk in chunks:
+                if run_manager:
+                    run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+            return
+        chunks = []
+        for chunk in super()._stream(messages, stop=stop, run_manager=run_manager, **kwargs):
+            chunks.append(chunk)
+            yield chunk
+        # 只有完整消费的流才写入缓存
+        self._store_chunks(cache, key, chunks)
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None,
+                       **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        cache = get_llm_response_cache()
+        if cache is None:
+            async for chunk in super()._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                yield chunk
+            return
+        key = make_llm_call_key(self, "stream", messages, stop, kwargs)
+        cached = await asyncio.to_thread(cache.get, key)
+        if cached is not None and (chunks := self._load_chunks(cached)) is not None:
+            logger.debug(f"LLM 流式响应缓存命中: {key}")
+            for chunk in chunks:
+                if run_manager:
+                    await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+            return
+        chunks = []
+        async for chunk in super()._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+            chunks.append(chunk)
+            yield chunk
+        # 只有完整消费的流才写入缓存
+        await asyncio.to_thread(self._store_chunks, cache, key, chunks)
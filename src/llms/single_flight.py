@@ -0,0 +1,93 @@
+import logging
+from typing import Any, AsyncIterator, List, Optional
+
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from src.config.configuration import get_bool_env
+from src.llms.call_key import make_llm_call_key
+from src.llms.usage import mark_reused
+from src.utils.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+llm_single_flight = SingleFlight("llm")
+
+
+def is_llm_single_flight_enabled() -> bool:
+    return get_bool_env("ENABLE_SINGLE_FLIGHT", False)
+
+
+def _copy_message(message: BaseMessage, coalesced: bool) -> BaseMessage:
+    message = message.model_copy(deep=True)
+    return mark_reused(message, "single_flight") if coalesced else message
+
+
+def _copy_result(result: ChatResult, coalesced: bool) -> ChatResult:
+    """每个等待者得到独立的结果副本，避免共享的消息对象被回调修改；合并到其他调用方的结果标记为复用"""
+    return ChatResult(
+        generations=[
+            ChatGeneration(message=_copy_message(generation.message, coalesced),
+                           generation_info=generation.generation_info)
+            for generation in result.generations
+        ],
+        llm_output=result.llm_output,
+    )
+
+
+def _copy_chunk(chunk: ChatGenerationChunk, coalesced: bool) -> ChatGenerationChunk:
+    return ChatGenerationChunk(message=_copy_message(chunk.message, coalesced), generation_info=chunk.generation_info)
+
+
+class SingleFlightMixin:
+    """A mixin class that coalesces identical in-flight chat model calls into one upstream request.
+
+    The shared upstream call runs without a run manager; every caller reports the tokens it receives
+    to its own callbacks. Results handed to callers other than the one that made the upstream call are
+    marked as reused so their tokens are not counted twice. Sync streaming is not coalesced.
+    """
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None,
+                  **kwargs: Any) -> ChatResult:
+        key = make_llm_call_key(self, "generate", messages, stop, kwargs)
+        leader = False
+
+        def _call():
+            nonlocal leader
+            leader = True
+            return super(SingleFlightMixin, self)._generate(messages, stop=stop, **kwargs)
+
+        result = llm_single_flight.do_sync(key, _call)
+        return _copy_result(result, coalesced=not leader)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None,
+                         **kwargs: Any) -> ChatResult:
+        key = make_llm_call_key(self, "generate", messages, stop, kwargs)
+        leader = False
+
+        def _call():
+            nonlocal leader
+            leader = True
+            return super(SingleFlightMixin, self)._agenerate(messages, stop=stop, **kwargs)
+
+        result = await llm_single_flight.do(key, _call)
+        return _copy_result(result, coalesced=not leader)
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None,
+                       **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        key = make_llm_call_key(self, "stream", messages, stop, kwargs)
+        leader = False
+
+        def _open():
+            nonlocal leader
+            leader = True
+            return super(SingleFlightMixin, self)._astream(messages, stop=stop, **kwargs)
+
+        first = True
+        async for chunk in llm_single_flight.stream(key, _open):
+            # 合并分片时保留标记，只需标记第一个分片
+            chunk = _copy_chunk(chunk, coalesced=first and not leader)
+            first = False
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
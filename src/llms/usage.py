@@ -0,0 +1,244 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import LLMResult
+
+logger = logging.getLogger(__name__)
+
+# 最多保留用量统计的会话数，超出时丢弃最早的会话
+_MAX_USAGE_THREADS = 1000
+
+# 模型名称 -> 每百万 token 的价格，由 conf.yaml 中各模型的 pricing 配置注册
+_model_pricing: dict[str, dict[str, float]] = {}
+
+_lock = threading.Lock()
+
+# 复用的响应（命中响应缓存、合并到其他调用方的请求）在 response_metadata 中标记来源，不计入 token 用量和费用
+REUSED_RESPONSE_KEY = "reused_response"
+
+
+def mark_reused(message: BaseMessage, source: str) -> BaseMessage:
+    """标记消息来自复用的响应，source 为 llm_cache 或 single_flight"""
+    message.response_metadata = {**message.response_metadata, REUSED_RESPONSE_KEY: source}
+    return message
+
+
+def register_model_pricing(model_name: Optional[str], pricing: Optional[dict]) -> None:
+    """注册模型价格（prompt / completion，每百万 token），用于估算调用费用"""
+    if not model_name or not pricing:
+        return
+    _model_pricing[model_name] = {
+        "prompt": float(pricing.get("prompt", 0)),
+        "completion": float(pricing.get("completion", 0)),
+    }
+
+
+class UsageStats:
+    """一组 LLM 调用的累计用量"""
+
+    def __init__(self):
+        self.calls = 0
+        self.reused_calls = 0
+        self.errors = 0
+        self.prompt_tokens = 0
+        self.cached_prompt_tokens = 0
+        self.completion_tokens = 0
+        self.reasoning_tokens = 0
+        self.total_tokens = 0
+        self.wall_seconds = 0.0
+        self.cost = 0.0
+
+    def add(self, usage: dict[str, int], seconds: float, cost: float, error: bool = False,
+            reused: bool = False) -> None:
+        self.wall_seconds += seconds
+        if reused:
+            # 复用的响应没有发起上游请求，只计调用次数和耗时
+            self.reused_calls += 1
+            return
+        self.calls += 1
+        self.errors += int(error)
+        self.prompt_tokens += usage.get("prompt_tokens", 0)
+        self.cached_prompt_tokens += usage.get("cached_prompt_tokens", 0)
+        self.completion_tokens += usage.get("completion_tokens", 0)
+        self.reasoning_tokens += usage.get("reasoning_tokens", 0)
+        self.total_tokens += usage.get("total_tokens", 0)
+        self.cost += cost
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "reused_calls": self.reused_calls,
+            "errors": self.errors,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_prompt_tokens": self.cached_prompt_tokens,
+            # 提供方前缀缓存命中的 prompt token 比例
+            "cached_prompt_ratio": round(self.cached_prompt_tokens / self.prompt_tokens, 4) if self.prompt_tokens else 0.0,
+            "completion_tokens": self.completion_tokens,
+            "reasoning_tokens": self.reasoning_tokens,
+            "total_tokens": self.total_tokens,
+            "wall_seconds": round(self.wall_seconds, 3),
+            "cost": round(self.cost, 6),
+        }
+
+
+class UsageReport:
+    """按智能体、图节点和模型分组的用量"""
+
+    def __init__(self):
+        self.total = UsageStats()
+        self.by_agent: dict[str, UsageStats] = {}
+        self.by_node: dict[str, UsageStats] = {}
+        self.by_model: dict[str, UsageStats] = {}
+
+    def add(self, agent: str, node: str, model: str, usage: dict[str, int], seconds: float, cost: float,
+            error: bool = False, reused: bool = False) -> None:
+        self.total.add(usage, seconds, cost, error, reused)
+        for groups, key in ((self.by_agent, agent), (self.by_node, node), (self.by_model, model)):
+            groups.setdefault(key, UsageStats()).add(usage, seconds, cost, error, reused)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "total": self.total.to_dict(),
+            "by_agent": {key: stats.to_dict() for key, stats in self.by_agent.items()},
+            "by_node": {key: stats.to_dict() for key, stats in self.by_node.items()},
+            "by_model": {key: stats.to_dict() for key, stats in self.by_model.items()},
+        }
+
+
+_thread_usage: "OrderedDict[str, UsageReport]" = OrderedDict()
+# 进程启动以来所有会话的用量
+_process_usage = UsageReport()
+
+
+def _get_thread_report(thread_id: str) -> UsageReport:
+    report = _thread_usage.get(thread_id)
+    if report is None:
+        report = _thread_usage[thread_id] = UsageReport()
+        while len(_thread_usage) > _MAX_USAGE_THREADS:
+            _thread_usage.popitem(last=False)
+    else:
+        _thread_usage.move_to_end(thread_id)
+    return report
+
+
+def get_thread_usage(thread_id: str) -> Optional[dict[str, Any]]:
+    """会话内所有请求的累计用量，未记录时返回 None"""
+    with _lock:
+        report = _thread_usage.get(thread_id)
+        return report.to_dict() if report is not None else None
+
+
+def get_usage_totals() -> dict[str, Any]:
+    """进程启动以来的累计用量，包括各模型的前缀缓存命中比例"""
+    with _lock:
+        return _process_usage.to_dict()
+
+
+def _get_agent_name(metadata: dict) -> str:
+    """子图的命名空间形如 "researcher:<task_id>|agent:<task_id>"，取最外层节点名作为智能体名称"""
+    namespace = metadata.get("langgraph_checkpoint_ns") or ""
+    if namespace:
+        return namespace.split("|")[0].split(":")[0]
+    return metadata.get("langgraph_node") or "unknown"
+
+
+def _response_messages(response: LLMResult) -> list[BaseMessage]:
+    return [generation.message for generations in response.generations for generation in generations
+            if isinstance(getattr(generation, "message", None), BaseMessage)]
+
+
+def _is_reused(response: LLMResult) -> bool:
+    return any(message.response_metadata.get(REUSED_RESPONSE_KEY) for message in _response_messages(response))
+
+
+def _response_model(response: LLMResult) -> Optional[str]:
+    """实际响应的模型名称，对冲请求由备用模型胜出时与调用的模型不同"""
+    for message in _response_messages(response):
+        model = message.response_metadata.get("model_name")
+        if model:
+            return model
+    return None
+
+
+def _extract_usage(response: LLMResult) -> dict[str, int]:
+    for generations in response.generations:
+        for generation in generations:
+            usage_metadata = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage_metadata:
+                return {
+                    "prompt_tokens": usage_metadata.get("input_tokens", 0),
+                    "cached_prompt_tokens": (usage_metadata.get("input_token_details") or {}).get("cache_read", 0),
+                    "completion_tokens": usage_metadata.get("output_tokens", 0),
+                    "reasoning_tokens": (usage_metadata.get("output_token_details") or {}).get("reasoning", 0),
+                    "total_tokens": usage_metadata.get("total_tokens", 0),
+                }
+    # 部分模型只在 llm_output 中返回用量
+    token_usage = (response.llm_output or {}).get("token_usage") or {}
+    return {
+        "prompt_tokens": token_usage.get("prompt_tokens", 0),
+        "cached_prompt_tokens": (token_usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0),
+        "completion_tokens": token_usage.get("completion_tokens", 0),
+        "reasoning_tokens": (token_usage.get("completion_tokens_details") or {}).get("reasoning_tokens", 0),
+        "total_tokens": token_usage.get("total_tokens", 0),
+    }
+
+
+def _estimate_cost(model: str, usage: dict[str, int]) -> float:
+    pricing = _model_pricing.get(model)
+    if not pricing:
+        return 0.0
+    return (usage.get("prompt_tokens", 0) * pricing["prompt"]
+            + usage.get("completion_tokens", 0) * pricing["completion"]) / 1_000_000
+
+
+class UsageCallbackHandler(BaseCallbackHandler):
+    """记录一次请求中所有 LLM 调用的 token 用量、调用次数和耗时
+
+    用量同时累计到请求自身和所属会话，会话用量可以通过 get_thread_usage 查询。
+    命中响应缓存和合并到其他调用方的响应计入 reused_calls，不计入 token 用量和费用。
+    """
+
+    # 只做内存计数，直接在调用方的事件循环中执行
+    run_inline = True
+
+    def __init__(self, thread_id: str):
+        self.thread_id = thread_id
+        self.report = UsageReport()
+        self._runs: dict[UUID, tuple[float, str, str, str]] = {}
+
+    def on_chat_model_start(self, serialized: dict[str, Any], messages: list, *, run_id: UUID,
+                            metadata: Optional[dict[str, Any]] = None, **kwargs: Any) -> None:
+        metadata = metadata or {}
+        model = metadata.get("ls_model_name") or (kwargs.get("invocation_params") or {}).get("model") or "unknown"
+        self._runs[run_id] = (time.monotonic(), _get_agent_name(metadata),
+                              metadata.get("langgraph_node") or "unknown", model)
+
+    def _record(self, run_id: UUID, usage: dict[str, int], error: bool = False, reused: bool = False,
+                model: Optional[str] = None) -> None:
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        start, agent, node, run_model = run
+        model = model or run_model
+        seconds = time.monotonic() - start
+        cost = 0.0 if reused else _estimate_cost(model, usage)
+        with _lock:
+            self.report.add(agent, node, model, usage, seconds, cost, error, reused)
+            _get_thread_report(self.thread_id).add(agent, node, model, usage, seconds, cost, error, reused)
+            _process_usage.add(agent, node, model, usage, seconds, cost, error, reused)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        self._record(run_id, _extract_usage(response), reused=_is_reused(response), model=_response_model(response))
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._record(run_id, {}, error=True)
+
+    def summary(self) -> dict[str, Any]:
+        with _lock:
+            return self.report.to_dict()
@@ -1,19 +1,106 @@
-import dataclasses
+import logging
 import os
 from datetime import datetime
+from functools import lru_cache
 
-from jinja2 import Environment, FileSystemLoader, select_autoescape
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template, meta, select_autoescape
 from langgraph.prebuilt.chat_agent_executor import AgentState
 
-from src.config.configuration import Configuration
+from src.config.configuration import Configuration, get_bool_env, get_int_env, get_str_env
+
+logger = logging.getLogger(__name__)
+
+_PROMPTS_DIR = os.path.dirname(__file__)
+
+
+def _get_bytecode_cache_dir():
+    """PROMPT_BYTECODE_CACHE_DIR 未设置时使用 Jinja 默认的用户临时目录"""
+    cache_dir = get_str_env("PROMPT_BYTECODE_CACHE_DIR")
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir or None
+
 
 env = Environment(
-    loader=FileSystemLoader(os.path.dirname(__file__)),
+    loader=FileSystemLoader(_PROMPTS_DIR),
     autoescape=select_autoescape(),
     trim_blocks=True,
     lstrip_blocks=True,
+    # 模板在启动时编译一次，之后不再检查文件修改时间
+    auto_reload=False,
+    # 编译结果写入字节码缓存，进程重启和多个 worker 可以直接加载
+    bytecode_cache=FileSystemBytecodeCache(_get_bytecode_cache_dir()),
 )
 
+# 模板名称 -> (已编译的模板, 模板声明的变量)
+_templates: dict[str, tuple[Template, frozenset[str]]] = {}
+
+# 提示词中的时间默认精确到分钟，同一分钟内的多轮调用可以复用已渲染的系统提示
+_DEFAULT_TIME_GRANULARITY_SECONDS = 60
+
+# 前缀缓存布局下放入运行时上下文消息的变量；locale 只有少数取值，模板仍按它选择指令
+_RUNTIME_VARS = ("CURRENT_TIME", "locale")
+
+
+def is_prefix_cache_layout() -> bool:
+    """系统提示只包含静态指令（字节稳定的前缀），时间、语言等变化的值放在紧随其后的运行时上下文消息中"""
+    return get_bool_env("ENABLE_PROMPT_PREFIX_CACHE", False)
+
+
+def get_time_granularity() -> int:
+    return max(1, get_int_env("PROMPT_TIME_GRANULARITY_SECONDS", _DEFAULT_TIME_GRANULARITY_SECONDS))
+
+
+def get_current_time() -> str:
+    """当前时间，按 PROMPT_TIME_GRANULARITY_SECONDS（默认 60 秒）向下取整，粒度内的请求得到相同的提示"""
+    granularity = get_time_granularity()
+    timestamp = int(datetime.now().timestamp()) // granularity * granularity
+    return datetime.fromtimestamp(timestamp).strftime("%a %b %d %Y %H:%M:%S %z")
+
+
+def _runtime_context_message(state_vars: dict) -> dict:
+    lines = [f"- {name}: {state_vars[name]}" for name in _RUNTIME_VARS if state_vars.get(name)]
+    return {"role": "user", "content": "# Runtime Context\n\n" + "\n".join(lines)}
+
+
+def _compile_template(prompt_name: str) -> tuple[Template, frozenset[str]]:
+    compiled = _templates.get(prompt_name)
+    if compiled is None:
+        filename = f"{prompt_name}.md"
+        source = env.loader.get_source(env, filename)[0]
+        variables = frozenset(meta.find_undeclared_variables(env.parse(source)))
+        compiled = _templates[prompt_name] = (env.get_template(filename), variables)
+    return compiled
+
+
+def precompile_templates() -> None:
+    """编译 prompts 目录下的所有模板，并解析各模板声明的变量"""
+    for filename in sorted(os.listdir(_PROMPTS_DIR)):
+        if filename.endswith(".md"):
+            _compile_template(filename[:-3])
+    logger.debug(f"预编译提示词模板: {sorted(_templates)}")
+
+
+@lru_cache(maxsize=get_int_env("PROMPT_RENDER_CACHE_SIZE", 256))
+def _render_cached(prompt_name: str, render_items: tuple) -> str:
+    template = _compile_template(prompt_name)[0]
+    return template.render(**dict(render_items))
+
+
+def _render(prompt_name: str, render_vars: dict) -> str:
+    """渲染系统提示；模板变量不变时（例如同一会话内 ReAct 代理的多轮调用）直接复用上次的结果"""
+    render_items = tuple(sorted(render_vars.items()))
+    try:
+        hash(render_items)
+    except TypeError:
+        return _compile_template(prompt_name)[0].render(**render_vars)
+    return _render_cached(prompt_name, render_items)
+
+
+def get_prompt_render_stats() -> dict:
+    info = _render_cached.cache_info()
+    return {"templates": len(_templates), "hits": info.hits, "misses": info.misses, "size": info.currsize}
+
 
 def apply_prompt_template(prompt_name: str, state: AgentState, configurable: Configuration = None) -> list:
     """
@@ -26,23 +113,41 @@ def apply_prompt_template(prompt_name: str, state: AgentState, configurable: Con
 
     ### 返回
 
-    - 一组消息，其中系统提示作为第一条消息
+    - 一组消息，其中系统提示作为第一条消息；前缀缓存布局下第二条消息为运行时上下文，之后是会话消息
     :param prompt_name:
     :param state:
     :param configurable:
     :return:
     """
-    state_vars = {
-        "CURRENT_TIME": datetime.now().strftime("%a %b %d %Y %H:%M:%S %z"),
-        **state,
-    }
+    try:
+        variables = _compile_template(prompt_name)[1]
+        prefix_cache_layout = is_prefix_cache_layout()
 
-    if configurable:
-        state_vars.update(dataclasses.asdict(configurable))
+        # 只取模板声明的变量，配置参数优先于状态，不再展开整个状态（消息、观察结果等）
+        state_vars = {}
+        for name in variables.union(_RUNTIME_VARS):
+            if name == "CURRENT_TIME":
+                state_vars[name] = get_current_time()
+            elif configurable is not None and hasattr(configurable, name):
+                state_vars[name] = getattr(configurable, name)
+            elif name in state:
+                state_vars[name] = state[name]
 
-    try:
-        template = env.get_template(f"{prompt_name}.md")
-        system_prompt = template.render(**state_vars)
-        return [{"role": "system", "content": system_prompt}] + state["messages"]
+        # 前缀缓存布局下时间只放在运行时上下文消息中，系统提示的渲染结果与时间无关，可以一直复用；
+        # 模板中的时间头只在传入 CURRENT_TIME 时渲染
+        render_vars = {
+            name: value for name, value in state_vars.items()
+            if name in variables and not (prefix_cache_layout and name == "CURRENT_TIME")
+        }
+
+        system_prompt = _render(prompt_name, render_vars)
+        messages = [{"role": "system", "content": system_prompt}]
+        if prefix_cache_layout:
+            # 运行时上下文放在会话之前，最后一条消息仍是当前轮次的用户消息或工具结果
+            messages.append(_runtime_context_message(state_vars))
+        return messages + state["messages"]
     except Exception as e:
         raise ValueError(f"应用提示词模板{prompt_name}错误: {e}")
+
+
+precompile_templates()
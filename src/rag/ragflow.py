@@ -5,6 +5,8 @@ from urllib.parse import urlparse
 import requests
 
 from src.rag.retriever import Retriever, Resource, Document, Chunk
+from src.utils.deadline import http_timeout
+from src.utils.resilience import check_response, resilient_call
 
 
 class RAGFlowProvider(Retriever):
@@ -63,9 +65,9 @@ class RAGFlowProvider(Retriever):
         if self.cross_languages:
             payload["cross_languages"] = self.cross_languages
 
-        response = requests.post(
-            f"{self.api_url}/api/v1/retrieval", headers=headers, json=payload
-        )
+        response = resilient_call("ragflow", lambda: check_response("ragflow", requests.post(
+            f"{self.api_url}/api/v1/retrieval", headers=headers, json=payload, timeout=http_timeout(30)
+        )))
 
         if response.status_code != 200:
             raise Exception(f"Failed to query documents: {response.text}")
@@ -104,9 +106,9 @@ class RAGFlowProvider(Retriever):
         if query:
             params["name"] = query
 
-        response = requests.get(
-            f"{self.api_url}/api/v1/datasets", headers=headers, params=params
-        )
+        response = resilient_call("ragflow", lambda: check_response("ragflow", requests.get(
+            f"{self.api_url}/api/v1/datasets", headers=headers, params=params, timeout=http_timeout(30)
+        )))
 
         if response.status_code != 200:
             raise Exception(f"Failed to list resources: {response.text}")
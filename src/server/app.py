@@ -1,20 +1,33 @@
 import json
 import logging
+import time
 import uuid
-from typing import List
+from typing import List, Optional
 
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 from langgraph.store.memory import InMemoryStore
 from fastapi.responses import Response, StreamingResponse
+from langchain_core.messages import AIMessageChunk, ToolMessage
 from langgraph.types import Command
 
 from src.config.configuration import get_str_env, get_bool_env, get_recursion_limit
 from src.config.report_style import ReportStyle
 from src.graph.builder import build_graph_with_memory
 from src.graph.checkpoint import chat_stream_message
+from src.llms.http_clients import aclose_http_clients
+from src.llms.context_guard import get_context_guard_stats
+from src.llms.hedging import get_hedging_stats
+from src.llms.rate_limit import get_rate_limit_stats
+from src.llms.response_cache import get_llm_cache_stats
+from src.llms.usage import UsageCallbackHandler, get_thread_usage, get_usage_totals
+from src.prompts.template import get_prompt_render_stats
 from src.rag.retriever import Resource
 from src.server.chat_request import ChatRequest
+from src.tools.search_cache import get_search_cache_stats
+from src.utils.deadline import DEADLINE_KEY, make_deadline
+from src.utils.resilience import get_resilience_stats
+from src.utils.single_flight import get_single_flight_stats
 
 logger = logging.getLogger(__name__)
 app = FastAPI(
@@ -35,6 +48,8 @@ app.add_middleware(
     allow_methods=["GET", "POST", "OPTIONS"],  # Use the configured list of methods
     allow_headers=["*"],  # Now allow all headers, but can be restricted further
 )
+# 服务关闭时释放 LLM 共享的 HTTP 连接池
+app.router.add_event_handler("shutdown", aclose_http_clients)
 
 in_memory_store = InMemoryStore()
 graph = build_graph_with_memory()
@@ -65,7 +80,7 @@ def _create_interrupt_event(thread_id, event_data):
         "interrupt",
         {
             "thread_id": thread_id,
-            "id": event_data["__interrupt__"][0].ns[0],
+            "id": event_data["__interrupt__"][0].id,
             "role": "assistant",
             "content": event_data["__interrupt__"][0].value,
             "finish_reason": "interrupt",
@@ -77,17 +92,103 @@ def _create_interrupt_event(thread_id, event_data):
     )
 
 
+def _create_event_stream_message(message_chunk, message_metadata: dict, thread_id: str, agent_name: str):
+    """将 LLM 消息块转换为 SSE 事件数据"""
+    content = message_chunk.content
+    if not isinstance(content, str):
+        content = json.dumps(content, ensure_ascii=False)
+
+    event_stream_message = {
+        "thread_id": thread_id,
+        "agent": agent_name,
+        "id": message_chunk.id,
+        "role": "assistant",
+        "langgraph_node": message_metadata.get("langgraph_node", ""),
+        "langgraph_step": message_metadata.get("langgraph_step", ""),
+        "content": content,
+    }
+    if message_chunk.additional_kwargs.get("reasoning_content"):
+        event_stream_message["reasoning_content"] = message_chunk.additional_kwargs["reasoning_content"]
+    if message_chunk.response_metadata.get("finish_reason"):
+        event_stream_message["finish_reason"] = message_chunk.response_metadata.get("finish_reason")
+    return event_stream_message
+
+
+def _create_message_event(message_chunk, message_metadata: dict, thread_id: str, agent_name: str):
+    """根据消息类型生成 message_chunk / tool_calls / tool_call_result 事件"""
+    event_stream_message = _create_event_stream_message(message_chunk, message_metadata, thread_id, agent_name)
+    if isinstance(message_chunk, ToolMessage):
+        event_stream_message["tool_call_id"] = message_chunk.tool_call_id
+        return _make_event("tool_call_result", event_stream_message)
+    if isinstance(message_chunk, AIMessageChunk) and message_chunk.tool_call_chunks:
+        event_stream_message["tool_call_chunks"] = message_chunk.tool_call_chunks
+        return _make_event("tool_call_chunks", event_stream_message)
+    return _make_event("message_chunk", event_stream_message)
+
+
+def _create_report_chunk_event(thread_id: str, event_data: dict):
+    event_stream_message = {
+        "thread_id": thread_id,
+        "agent": "reporter",
+        "id": event_data.get("id"),
+        "role": "assistant",
+        "content": event_data.get("content", ""),
+    }
+    if event_data.get("finish_reason"):
+        event_stream_message["finish_reason"] = event_data["finish_reason"]
+    return _make_event("message_chunk", event_stream_message)
+
+
+def _get_agent_name(agent: tuple, message_metadata: dict) -> str:
+    """子图的命名空间形如 ("researcher:<task_id>",)，取最外层节点名作为智能体名称"""
+    if agent:
+        return agent[0].split(":")[0]
+    return message_metadata.get("langgraph_node", "unknown")
+
+
 async def _stream_graph_events(graph, workflow_input, workflow_config, thread_id):
-    async for agent, _, event_data in graph.astream(workflow_input,
-                                                    config=workflow_config,
-                                                    stream_mode=["messages", "updates"],
-                                                    subgraphs=True):
-        if isinstance(event_data, dict):
-            if '__interrupt__' in event_data:
-                yield _create_interrupt_event(event_data)
+    start_time = time.perf_counter()
+    report_first_token = False
+    async for agent, stream_mode, event_data in graph.astream(workflow_input,
+                                                              config=workflow_config,
+                                                              stream_mode=["messages", "updates", "custom"],
+                                                              subgraphs=True):
+        if stream_mode == "updates":
+            if isinstance(event_data, dict) and '__interrupt__' in event_data:
+                yield _create_interrupt_event(thread_id, event_data)
+            elif not agent and isinstance(event_data, dict) and (event_data.get("reporter") or {}).get("partial_result"):
+                # 请求截止时间已到，报告只基于部分观察
+                yield _make_event("partial_result", {
+                    "thread_id": thread_id,
+                    "agent": "reporter",
+                    "role": "assistant",
+                    "reason": "deadline_exceeded",
+                })
+            continue
+        if stream_mode == "custom":
+            if isinstance(event_data, dict) and event_data.get("event") == "report_chunk":
+                # 缓存的报告以与 LLM 报告相同的 message_chunk 事件推送
+                yield _create_report_chunk_event(thread_id, event_data)
+            elif isinstance(event_data, dict) and event_data.get("event") == "plan_step":
+                # 规划器生成过程中每个完整的计划步骤
+                yield _make_event("plan_step", {
+                    "thread_id": thread_id,
+                    "agent": "planner",
+                    "role": "assistant",
+                    "index": event_data["index"],
+                    "step": event_data["step"],
+                    "plan_iterations": event_data.get("plan_iterations", 0),
+                })
             continue
 
-        yield event_data
+        message_chunk, message_metadata = event_data
+        agent_name = _get_agent_name(agent, message_metadata)
+        if agent_name == "reporter" and not report_first_token and message_chunk.content:
+            # 报告首个 token 的耗时（从请求开始计算）
+            report_first_token = True
+            logger.info(f"Thread {thread_id} time to first report token: "
+                        f"{time.perf_counter() - start_time:.2f}s")
+        yield _create_message_event(message_chunk, message_metadata, thread_id, agent_name)
 
 
 async def _astream_workflow_generator(messages: List[dict],
@@ -100,6 +201,8 @@ async def _astream_workflow_generator(messages: List[dict],
                                       interrupt_feedback: str,
                                       mcp_settings: dict,
                                       enable_background_investigation: bool,
+                                      speculative_background_investigation: bool,
+                                      deadline_seconds: Optional[int],
                                       report_style: ReportStyle,
                                       enable_deep_thinking: bool, ):
     # for message in messages:
@@ -114,6 +217,9 @@ async def _astream_workflow_generator(messages: List[dict],
         'final_report': '',
         'auto_accepted_plan': auto_accepted_plan,
         'enable_background_investigation': enable_background_investigation,
+        # 丢弃上一轮（可能是投机执行的）背景调查结果
+        'background_investigation_results': None,
+        'partial_result': False,
         "research_topic": messages[-1]["content"] if messages else "",
     }
     if not auto_accepted_plan and interrupt_feedback:
@@ -123,16 +229,24 @@ async def _astream_workflow_generator(messages: List[dict],
             resume_msg += f' {messages[-1]["content"]}'
         workflow_input = Command(resume=resume_msg)
 
+    usage_handler = UsageCallbackHandler(thread_id)
     workflow_config = {
-        "thread_id": thread_id,
-        "resources": resources,
-        "max_plan_iterations": max_plan_iterations,
-        "max_step_num": max_step_num,
-        "max_search_results": max_search_results,
-        "mcp_settings": mcp_settings,
-        "report_style": report_style.value,
-        "enable_deep_thinking": enable_deep_thinking,
+        "configurable": {
+            "thread_id": thread_id,
+            "resources": resources,
+            "max_plan_iterations": max_plan_iterations,
+            "max_step_num": max_step_num,
+            "max_search_results": max_search_results,
+            "mcp_settings": mcp_settings,
+            "report_style": report_style.value,
+            "enable_deep_thinking": enable_deep_thinking,
+            "speculative_background_investigation": speculative_background_investigation,
+            # 请求截止时间，传递到所有节点、代理、工具和 HTTP 调用
+            DEADLINE_KEY: make_deadline(deadline_seconds),
+        },
         "recursion_limit": get_recursion_limit(),  # 递归限制
+        # 按节点、智能体和会话统计 LLM 用量
+        "callbacks": [usage_handler],
     }
 
     async for event in _stream_graph_events(
@@ -140,8 +254,14 @@ async def _astream_workflow_generator(messages: List[dict],
     ):
         yield event
 
+    yield _make_event("usage", {
+        "thread_id": thread_id,
+        "usage": usage_handler.summary(),
+        "thread_usage": get_thread_usage(thread_id),
+    })
+
 
-@app.post('api/chat/stream')
+@app.post('/api/chat/stream')
 async def chat_stream(request: ChatRequest):
     mcp_enabled = get_bool_env("ENABLE_MCP_SERVER_CONFIGURATION", False)
     if request.mcp_settings and not mcp_enabled:
@@ -151,4 +271,47 @@ async def chat_stream(request: ChatRequest):
     if request.thread_id == '__default__':
         request.thread_id = str(uuid.uuid4())
 
-    return StreamingResponse(_astream_workflow_generator(), media_type="text/event-stream")
+    return StreamingResponse(
+        _astream_workflow_generator(
+            request.model_dump()["messages"],
+            request.thread_id,
+            request.resources,
+            request.max_plan_iterations,
+            request.max_step_num,
+            request.max_search_results,
+            request.auto_accepted_plan,
+            request.interrupt_feedback,
+            request.mcp_settings if mcp_enabled else {},
+            request.enable_background_investigation,
+            request.speculative_background_investigation,
+            request.deadline_seconds,
+            request.report_style,
+            request.enable_deep_thinking,
+        ),
+        media_type="text/event-stream",
+    )
+
+
+@app.get('/api/llm/metrics')
+async def llm_metrics():
+    """LLM 调用层的运行指标"""
+    return {
+        "response_cache": get_llm_cache_stats(),
+        "single_flight": get_single_flight_stats(),
+        "rate_limit": get_rate_limit_stats(),
+        "hedging": get_hedging_stats(),
+        "context_guard": get_context_guard_stats(),
+        "usage": get_usage_totals(),
+        "resilience": get_resilience_stats(),
+        "search_cache": get_search_cache_stats(),
+        "prompt_render": get_prompt_render_stats(),
+    }
+
+
+@app.get('/api/usage/{thread_id}')
+async def thread_usage(thread_id: str):
+    """会话的 LLM 用量：按智能体、图节点和模型统计的 token 数、调用次数、耗时和估算费用"""
+    usage = get_thread_usage(thread_id)
+    if usage is None:
+        raise HTTPException(status_code=404, detail=f"No usage recorded for thread {thread_id}")
+    return usage
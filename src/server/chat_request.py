@@ -50,6 +50,12 @@ class ChatRequest(BaseModel):
     enable_background_investigation: Optional[bool] = Field(
         True, description="Whether to get background investigation before plan"
     )
+    deadline_seconds: Optional[int] = Field(
+        None, description="The latency budget of the request in seconds, defaults to REQUEST_DEADLINE_SECONDS"
+    )
+    speculative_background_investigation: Optional[bool] = Field(
+        False, description="Whether to run background investigation in parallel with the coordinator"
+    )
     report_style: Optional[ReportStyle] = Field(
         ReportStyle.ACADEMIC, description="The style of the report"
     )
@@ -0,0 +1,28 @@
+import hashlib
+import json
+from typing import Any
+
+from pydantic import BaseModel
+
+from src.llms.call_key import serialize_call_value
+
+# 不影响工具结果的字段；resources 是请求级状态，调用时通过运行配置注入
+_IGNORED_TOOL_FIELDS = {"callbacks", "callback_manager", "tags", "metadata", "args_schema", "description", "resources"}
+
+
+def get_tool_options(tool: Any) -> dict[str, Any]:
+    """工具实例的配置（例如 max_results、域名过滤、是否返回原始内容和图片），用于区分不同配置的同名工具"""
+    if not isinstance(tool, BaseModel):
+        return {}
+    return serialize_call_value(tool.model_dump(exclude=_IGNORED_TOOL_FIELDS))
+
+
+def make_tool_call_key(tool: Any, args: tuple, kwargs: dict) -> str:
+    """工具调用的键：工具类型、工具配置和调用参数"""
+    key = {
+        "tool": type(tool).__name__,
+        "options": get_tool_options(tool),
+        "args": serialize_call_value(args),
+        "kwargs": serialize_call_value({k: v for k, v in kwargs.items() if k not in ("run_manager", "config")}),
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
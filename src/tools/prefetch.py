@@ -0,0 +1,115 @@
+import asyncio
+import json
+import logging
+from collections import OrderedDict
+from contextvars import Context
+from typing import Any, Optional
+
+from langchain_core.runnables import RunnableConfig, ensure_config
+from langchain_core.tools import BaseTool
+
+from src.utils.token_utils import truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+# 最多保留预取结果的会话数，超出时丢弃最早的会话
+_MAX_PREFETCH_THREADS = 256
+
+
+class _ThreadPrefetch:
+    """单个会话的预取结果：步骤标题 -> [(工具名, 查询, 预取任务)]"""
+
+    def __init__(self, plan_key: str):
+        self.plan_key = plan_key
+        self.steps: dict[str, list[tuple[str, str, asyncio.Task]]] = {}
+
+    def cancel(self):
+        for tasks in self.steps.values():
+            for _, _, task in tasks:
+                task.cancel()
+
+
+_prefetch_store: "OrderedDict[str, _ThreadPrefetch]" = OrderedDict()
+
+
+def get_thread_id(config: Optional[RunnableConfig] = None) -> Optional[str]:
+    """从运行配置（默认为当前上下文中的配置）中获取会话 ID"""
+    config = config or ensure_config()
+    return config.get("configurable", {}).get("thread_id")
+
+
+def start_plan_prefetch(
+        thread_id: str,
+        plan_key: str,
+        step_queries: dict[str, str],
+        tools: list[BaseTool],
+        config: Optional[RunnableConfig] = None,
+) -> bool:
+    """为待审批计划的研究步骤在后台启动预取任务，step_queries 为步骤标题 -> 查询
+
+    同一会话的同一计划只预取一次（人类反馈节点恢复时会重新执行）；计划变化时丢弃旧的预取结果。
+    """
+    if not thread_id:
+        return False
+    entry = _prefetch_store.get(thread_id)
+    if entry is not None and entry.plan_key == plan_key:
+        return False
+    drop_prefetch(thread_id)
+
+    entry = _ThreadPrefetch(plan_key)
+    # 预取任务在独立的上下文中执行，不继承当前节点的回调
+    context = Context()
+    for step_title, query in step_queries.items():
+        entry.steps[step_title] = [
+            (tool.name, query, asyncio.create_task(tool.ainvoke(query, config), context=context))
+            for tool in tools
+        ]
+
+    _prefetch_store[thread_id] = entry
+    while len(_prefetch_store) > _MAX_PREFETCH_THREADS:
+        _, evicted = _prefetch_store.popitem(last=False)
+        evicted.cancel()
+    logger.info(f"会话 {thread_id} 开始预取 {len(entry.steps)} 个步骤的搜索结果")
+    return True
+
+
+def drop_prefetch(thread_id: Optional[str]) -> None:
+    """丢弃会话的预取结果，并取消未完成的预取任务"""
+    entry = _prefetch_store.pop(thread_id, None) if thread_id else None
+    if entry is not None:
+        entry.cancel()
+        logger.info(f"会话 {thread_id} 丢弃预取结果")
+
+
+async def aget_step_prefetch(thread_id: Optional[str], step_title: str) -> list[tuple[str, str, Any]]:
+    """取出步骤的预取结果 [(工具名, 查询, 结果)]，预取任务仍在执行时等待其完成；失败或为空的结果被跳过"""
+    entry = _prefetch_store.get(thread_id) if thread_id else None
+    tasks = entry.steps.pop(step_title, []) if entry is not None else []
+    results = []
+    for tool_name, query, task in tasks:
+        try:
+            result = await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                raise
+            continue
+        except Exception as e:
+            logger.warning(f"步骤 '{step_title}' 的预取任务失败 {tool_name}: {e}")
+            continue
+        if result:
+            results.append((tool_name, query, result))
+    if results:
+        logger.info(f"步骤 '{step_title}' 使用预取结果: {[tool_name for tool_name, _, _ in results]}")
+    return results
+
+
+def format_prefetched_results(results: list[tuple[str, str, Any]], max_tokens: int) -> str:
+    """预取结果的文本，按 token 预算在各工具之间平均截断"""
+    if not results:
+        return ""
+    per_result_tokens = max_tokens // len(results)
+    sections = []
+    for tool_name, query, result in results:
+        text = result if isinstance(result, str) else json.dumps(result, ensure_ascii=False, default=str)
+        sections.append(f"### {tool_name}: {query}\n\n{truncate_to_tokens(text, per_result_tokens)}")
+    return "\n\n".join(sections)
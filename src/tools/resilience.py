@@ -0,0 +1,39 @@
+from typing import Any, ClassVar, Type, TypeVar
+
+from src.utils.resilience import aresilient_call, resilient_call
+
+T = TypeVar("T")
+
+
+class ResilientToolMixin:
+    """A mixin class that runs tool calls behind the circuit breaker and retry policy of their dependency.
+
+    When the circuit is open the call fails fast with CircuitOpenError, which the agent sees as a tool error.
+    """
+
+    resilience_dependency: ClassVar[str] = "search"
+
+    def _run(self, *args: Any, **kwargs: Any) -> Any:
+        return resilient_call(self.resilience_dependency, lambda: super(ResilientToolMixin, self)._run(*args, **kwargs))
+
+    async def _arun(self, *args: Any, **kwargs: Any) -> Any:
+        return await aresilient_call(self.resilience_dependency,
+                                     lambda: super(ResilientToolMixin, self)._arun(*args, **kwargs))
+
+
+def create_resilient_tool(base_tool_class: Type[T]) -> Type[T]:
+    """
+    Factory function to create a version of any tool class protected by a circuit breaker and retry budget.
+
+    Args:
+        base_tool_class: The original tool class
+
+    Returns:
+        A new class that inherits from both ResilientToolMixin and the base tool class
+    """
+
+    class ResilientTool(ResilientToolMixin, base_tool_class):
+        pass
+
+    ResilientTool.__name__ = base_tool_class.__name__
+    return ResilientTool
@@ -2,6 +2,7 @@ import logging
 from typing import Type, Optional
 
 from langchain_core.callbacks import CallbackManagerForToolRun, AsyncCallbackManagerForToolRun
+from langchain_core.runnables import RunnableConfig
 from langchain_core.tools import BaseTool
 from pydantic import BaseModel, Field
 
@@ -23,15 +24,27 @@ class RetrieverTool(BaseTool):
     retriever: Retriever = Field(default_factory=Retriever)
     resources: list[Resource] = Field(default_factory=list)
 
+    def _get_resources(self, config: RunnableConfig = None) -> list[Resource]:
+        """请求级资源优先从运行配置中获取，以便复用已编译的代理"""
+        configurable = (config or {}).get("configurable", {})
+        if "resources" in configurable:
+            return configurable["resources"]
+        return self.resources
+
     def _run(
             self,
             keywords: str,
             run_manager: Optional[CallbackManagerForToolRun] = None,
+            config: RunnableConfig = None,
     ) -> list[Document]:
+        return self._query(keywords, config)
+
+    def _query(self, keywords: str, config: RunnableConfig = None) -> list[Document]:
+        resources = self._get_resources(config)
         logger.info(
-            f"Retriever tool query: {keywords}", extra={"resources": self.resources}
+            f"Retriever tool query: {keywords}", extra={"resources": resources}
         )
-        documents = self.retriever.query_relevant_documents(keywords, self.resources)
+        documents = self.retriever.query_relevant_documents(keywords, resources)
         if not documents:
             return "No results found from the local knowledge base."
         return [doc.to_dict() for doc in documents]
@@ -40,8 +53,9 @@ class RetrieverTool(BaseTool):
             self,
             keywords: str,
             run_manager: Optional[AsyncCallbackManagerForToolRun] = None,
+            config: RunnableConfig = None,
     ) -> list[Document]:
-        return self._run(keywords, run_manager.get_sync())
+        return self._query(keywords, config)
 
 
 def get_retriever_tool(resources: list[dict]):
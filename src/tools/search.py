@@ -9,13 +9,23 @@ from langchain_community.utilities import BraveSearchWrapper, ArxivAPIWrapper, W
 from src.config.loader import load_yaml_config
 from src.config.tools import SELECTED_SEARCH_ENGINE, SearchEngine
 from src.tools.decorators import create_logged_tool
+from src.tools.resilience import create_resilient_tool
+from src.tools.search_cache import create_search_cache_tool
+from src.tools.single_flight import create_single_flight_tool
 from src.tools.tavily_search import TavilySearchWithImage
 
-LoggedTavilySearch = create_logged_tool(TavilySearchWithImage)
-LoggedDuckDuckGoSearch = create_logged_tool(DuckDuckGoSearchResults)
-LoggedBraveSearch = create_logged_tool(BraveSearch)
-LoggedArxivSearch = create_logged_tool(ArxivQueryRun)
-LoggedWikipediaSearch = create_logged_tool(WikipediaQueryRun)
+
+def _create_search_tool(base_tool_class):
+    # 优先使用跨请求的搜索缓存，再合并进行中的相同搜索；实际请求经过熔断和重试预算
+    return create_search_cache_tool(
+        create_single_flight_tool(create_resilient_tool(create_logged_tool(base_tool_class))))
+
+
+LoggedTavilySearch = _create_search_tool(TavilySearchWithImage)
+LoggedDuckDuckGoSearch = _create_search_tool(DuckDuckGoSearchResults)
+LoggedBraveSearch = _create_search_tool(BraveSearch)
+LoggedArxivSearch = _create_search_tool(ArxivQueryRun)
+LoggedWikipediaSearch = _create_search_tool(WikipediaQueryRun)
 logger = logging.getLogger(__name__)
 
 
@@ -0,0 +1,174 @@
+import asyncio
+import hashlib
+import json
+import logging
+import re
+from datetime import date
+from typing import Any, Optional, Type, TypeVar
+
+from src.cache.sqlite_store import SQLiteTTLStore
+from src.config.configuration import get_bool_env, get_int_env, get_str_env
+from src.llms.call_key import serialize_call_value
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+_search_cache: Optional[SQLiteTTLStore] = None
+
+# 时效性强的查询（新闻、行情、天气等），结果很快过时
+_FRESH_QUERY_PATTERN = re.compile(
+    r"\b(latest|today|tonight|yesterday|breaking|news|live|current|now|price|prices|stock|stocks|weather|score|scores)\b"
+    r"|最新|今天|今日|昨天|当前|目前|实时|新闻|快讯|股价|行情|价格|汇率|天气|比分",
+    re.IGNORECASE,
+)
+
+# 论文、百科等内容基本不变的搜索引擎
+_EVERGREEN_ENGINES = ("ArxivQueryRun", "WikipediaQueryRun")
+
+# 影响结果内容的工具实例配置（Tavily 的搜索深度、主题、时间范围、是否返回答案、原始内容和图片等）
+_INSTANCE_OPTIONS = ("search_depth", "topic", "time_range", "days", "country", "include_answer",
+                     "include_raw_content", "include_images", "include_image_descriptions")
+
+# 不参与缓存键的调用参数
+_IGNORED_CALL_KWARGS = ("query", "run_manager", "config", "callbacks")
+
+
+def is_search_cache_enabled() -> bool:
+    return get_bool_env("ENABLE_SEARCH_CACHE", False)
+
+
+def get_search_cache() -> Optional[SQLiteTTLStore]:
+    """获取跨请求共享的搜索结果缓存，未通过 ENABLE_SEARCH_CACHE 开启时返回 None"""
+    global _search_cache
+    if not is_search_cache_enabled():
+        return None
+    if _search_cache is None:
+        _search_cache = SQLiteTTLStore(
+            get_str_env("SEARCH_CACHE_PATH", "data/search_cache.db"),
+            ttl=get_int_env("SEARCH_CACHE_TTL_SECONDS", 24 * 3600),
+            max_entries=get_int_env("SEARCH_CACHE_MAX_ENTRIES", 20000),
+            max_bytes=get_int_env("SEARCH_CACHE_MAX_MB", 512) * 1024 * 1024,
+        )
+    return _search_cache
+
+
+def get_search_cache_stats() -> dict[str, int]:
+    cache = get_search_cache()
+    return cache.stats() if cache is not None else {}
+
+
+def normalize_query(query: Any) -> str:
+    """规范化查询：忽略大小写、多余空白和结尾标点"""
+    return " ".join(str(query).split()).lower().rstrip("?？!！.。")
+
+
+def get_search_ttl(engine: str, query: str, options: dict) -> int:
+    """按主题时效性确定缓存时间：新闻、行情等时效性强的查询很快过期，论文、百科长期有效"""
+    fresh = (
+            options.get("topic") in ("news", "finance")
+            or options.get("time_range") in ("day", "week")
+            or _FRESH_QUERY_PATTERN.search(query) is not None
+            or str(date.today().year) in query
+    )
+    if fresh:
+        return get_int_env("SEARCH_CACHE_FRESH_TTL_SECONDS", 900)
+    if engine in _EVERGREEN_ENGINES:
+        return get_int_env("SEARCH_CACHE_EVERGREEN_TTL_SECONDS", 7 * 24 * 3600)
+    return get_int_env("SEARCH_CACHE_TTL_SECONDS", 24 * 3600)
+
+
+def _is_cacheable(result: Any) -> bool:
+    """空结果和错误结果（例如 Tavily 返回的 {"error": ...}）不缓存"""
+    if not result:
+        return False
+    if isinstance(result, dict) and "error" in result:
+        return False
+    return True
+
+
+class SearchCacheToolMixin:
+    """A mixin class that serves search tool calls from a TTL cache on local disk shared across requests.
+
+    Results are keyed by engine, normalized query, result count, domain filters and the other options that
+    change the results, so the background investigation and the researcher agents of all sessions share them.
+    """
+
+    def _search_options(self, kwargs: dict) -> dict[str, Any]:
+        wrapper = getattr(self, "api_wrapper", None) or getattr(self, "search_wrapper", None)
+        max_results = getattr(self, "max_results", None) or getattr(self, "num_results", None)
+        if max_results is None and wrapper is not None:
+            max_results = getattr(wrapper, "top_k_results", None) \
+                or (getattr(wrapper, "search_kwargs", None) or {}).get("count")
+        options = {
+            "max_results": max_results,
+            "include_domains": sorted(kwargs.get("include_domains") or getattr(self, "include_domains", None) or []),
+            "exclude_domains": sorted(kwargs.get("exclude_domains") or getattr(self, "exclude_domains", None) or []),
+            "lang": getattr(wrapper, "lang", None),
+        }
+        # 智能体在调用时传入的参数（例如 topic、time_range）覆盖工具实例的配置
+        call_options = {k: v for k, v in kwargs.items()
+                        if k not in _IGNORED_CALL_KWARGS and k not in options and v is not None}
+        options.update({name: getattr(self, name, None) for name in _INSTANCE_OPTIONS})
+        options.update(call_options)
+        return serialize_call_value(options)
+
+    def _search_cache_key(self, query: Any, kwargs: dict) -> tuple[str, str, dict]:
+        engine = self.__class__.__name__
+        options = self._search_options(kwargs)
+        key = {"engine": engine, "query": normalize_query(query), **options}
+        digest = hashlib.sha256(json.dumps(key, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+        return digest.hexdigest(), engine, options
+
+    @staticmethod
+    def _get_query(args: tuple, kwargs: dict) -> Any:
+        return args[0] if args else kwargs.get("query")
+
+    def _run(self, *args: Any, **kwargs: Any) -> Any:
+        cache = get_search_cache()
+        query = self._get_query(args, kwargs)
+        if cache is None or query is None:
+            return super()._run(*args, **kwargs)
+        key, engine, options = self._search_cache_key(query, kwargs)
+        cached = cache.get(key)
+        if cached is not None:
+            logger.info(f"搜索缓存命中 {engine}: {query}")
+            return cached["result"]
+        result = super()._run(*args, **kwargs)
+        if _is_cacheable(result):
+            cache.set(key, {"result": result}, ttl=get_search_ttl(engine, str(query), options))
+        return result
+
+    async def _arun(self, *args: Any, **kwargs: Any) -> Any:
+        cache = get_search_cache()
+        query = self._get_query(args, kwargs)
+        if cache is None or query is None:
+            return await super()._arun(*args, **kwargs)
+        key, engine, options = self._search_cache_key(query, kwargs)
+        # SQLite 读写不阻塞事件循环
+        cached = await asyncio.to_thread(cache.get, key)
+        if cached is not None:
+            logger.info(f"搜索缓存命中 {engine}: {query}")
+            return cached["result"]
+        result = await super()._arun(*args, **kwargs)
+        if _is_cacheable(result):
+            await asyncio.to_thread(cache.set, key, {"result": result}, ttl=get_search_ttl(engine, str(query), options))
+        return result
+
+
+def create_search_cache_tool(base_tool_class: Type[T]) -> Type[T]:
+    """
+    Factory function to create a version of any search tool class whose results are cached on local disk.
+
+    Args:
+        base_tool_class: The original tool class
+
+    Returns:
+        A new class that inherits from both SearchCacheToolMixin and the base tool class
+    """
+
+    class SearchCacheTool(SearchCacheToolMixin, base_tool_class):
+        pass
+
+    SearchCacheTool.__name__ = base_tool_class.__name__
+    return SearchCacheTool
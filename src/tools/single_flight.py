@@ -0,0 +1,54 @@
+import logging
+from typing import Any, Type, TypeVar
+
+from src.config.configuration import get_bool_env
+from src.tools.call_key import make_tool_call_key
+from src.utils.single_flight import SingleFlight
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+search_single_flight = SingleFlight("search")
+
+
+def is_search_single_flight_enabled() -> bool:
+    return get_bool_env("ENABLE_SINGLE_FLIGHT", False)
+
+
+class SingleFlightToolMixin:
+    """A mixin class that coalesces identical in-flight tool calls into one upstream request."""
+
+    def _single_flight_key(self, args: tuple, kwargs: dict) -> str:
+        # 相同类型、相同参数（例如 max_results、域名过滤）的工具实例才会合并
+        return make_tool_call_key(self, args, kwargs)
+
+    def _run(self, *args: Any, **kwargs: Any) -> Any:
+        if not is_search_single_flight_enabled():
+            return super()._run(*args, **kwargs)
+        return search_single_flight.do_sync(self._single_flight_key(args, kwargs),
+                                            lambda: super(SingleFlightToolMixin, self)._run(*args, **kwargs))
+
+    async def _arun(self, *args: Any, **kwargs: Any) -> Any:
+        if not is_search_single_flight_enabled():
+            return await super()._arun(*args, **kwargs)
+        return await search_single_flight.do(self._single_flight_key(args, kwargs),
+                                             lambda: super(SingleFlightToolMixin, self)._arun(*args, **kwargs))
+
+
+def create_single_flight_tool(base_tool_class: Type[T]) -> Type[T]:
+    """
+    Factory function to create a version of any tool class whose identical concurrent calls are coalesced.
+
+    Args:
+        base_tool_class: The original tool class
+
+    Returns:
+        A new class that inherits from both SingleFlightToolMixin and the base tool class
+    """
+
+    class SingleFlightTool(SingleFlightToolMixin, base_tool_class):
+        pass
+
+    SingleFlightTool.__name__ = base_tool_class.__name__
+    return SingleFlightTool
@@ -1,6 +1,6 @@
 from typing import Optional, List, Literal, Dict, Any
 
-from langchain_core.callbacks import CallbackManagerForToolRun
+from langchain_core.callbacks import CallbackManagerForToolRun, AsyncCallbackManagerForToolRun
 from langchain_tavily import TavilySearch
 
 
@@ -33,6 +33,40 @@ class TavilySearchWithImage(TavilySearch):
             end_date,
             run_manager,
         )
+        return self._clean_results(raw_results)
+
+    async def _arun(
+            self,
+            query: str,
+            include_domains: Optional[List[str]] = None,
+            exclude_domains: Optional[List[str]] = None,
+            search_depth: Optional[Literal["basic", "advanced"]] = None,
+            include_images: Optional[bool] = None,
+            time_range: Optional[Literal["day", "week", "month", "year"]] = None,
+            topic: Optional[Literal["general", "news", "finance"]] = None,
+            include_favicon: Optional[bool] = None,
+            start_date: Optional[str] = None,
+            end_date: Optional[str] = None,
+            run_manager: Optional[AsyncCallbackManagerForToolRun] = None,
+    ) -> List[Dict]:
+        raw_results = await super()._arun(
+            query,
+            include_domains,
+            exclude_domains,
+            search_depth,
+            include_images,
+            time_range,
+            topic,
+            include_favicon,
+            start_date,
+            end_date,
+            run_manager,
+        )
+        return self._clean_results(raw_results)
+
+    @staticmethod
+    def _clean_results(raw_results: Dict[str, Any]) -> List[Dict]:
+        """将 Tavily 原始结果整理为页面和图片结果列表"""
         results = raw_results["results"]
         clean_results = []
         for result in results:
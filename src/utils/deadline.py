@@ -0,0 +1,72 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Optional, TypeVar
+
+from langchain_core.runnables import RunnableConfig, ensure_config
+
+from src.config.configuration import get_int_env
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+# 请求截止时间（绝对时间戳）在运行配置 configurable 中的键
+DEADLINE_KEY = "deadline"
+
+
+class DeadlineExceeded(TimeoutError):
+    """请求的截止时间已到"""
+
+
+def make_deadline(deadline_seconds: Optional[int] = None) -> Optional[float]:
+    """根据请求的时间预算（未指定时使用 REQUEST_DEADLINE_SECONDS）计算截止时间，0 或负数表示不限制"""
+    if deadline_seconds is None:
+        deadline_seconds = get_int_env("REQUEST_DEADLINE_SECONDS", 0)
+    if not deadline_seconds or deadline_seconds <= 0:
+        return None
+    return time.time() + deadline_seconds
+
+
+def get_deadline(config: Optional[RunnableConfig] = None) -> Optional[float]:
+    """从运行配置（默认为当前上下文中的配置）中获取截止时间"""
+    config = config or ensure_config()
+    return config.get("configurable", {}).get(DEADLINE_KEY)
+
+
+def remaining_seconds(config: Optional[RunnableConfig] = None) -> Optional[float]:
+    """距离截止时间的剩余秒数，没有截止时间时返回 None"""
+    deadline = get_deadline(config)
+    if deadline is None:
+        return None
+    return deadline - time.time()
+
+
+def is_expired(config: Optional[RunnableConfig] = None) -> bool:
+    remaining = remaining_seconds(config)
+    return remaining is not None and remaining <= 0
+
+
+def http_timeout(default: float, config: Optional[RunnableConfig] = None) -> float:
+    """HTTP 请求的超时时间：不超过剩余时间"""
+    remaining = remaining_seconds(config)
+    if remaining is None:
+        return default
+    if remaining <= 0:
+        raise DeadlineExceeded("request deadline exceeded")
+    return min(default, remaining)
+
+
+async def run_with_deadline(awaitable: Awaitable[T], config: Optional[RunnableConfig] = None) -> T:
+    """在截止时间内等待 awaitable 完成，超时时取消并抛出 DeadlineExceeded"""
+    remaining = remaining_seconds(config)
+    if remaining is None:
+        return await awaitable
+    if remaining <= 0:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise DeadlineExceeded("request deadline exceeded")
+    try:
+        return await asyncio.wait_for(awaitable, remaining)
+    except asyncio.TimeoutError as e:
+        raise DeadlineExceeded("request deadline exceeded") from e
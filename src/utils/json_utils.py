@@ -1,5 +1,7 @@
 import json
 import logging
+import re
+from typing import Any, Optional
 
 import json_repair
 
@@ -25,3 +27,95 @@ def repair_json_output(content: str) -> str:
         logger.warning(f"JSON repair failed: {e}")
 
     return content
+
+
+def _strip_code_fence(content: str) -> str:
+    content = content.strip()
+    if content.startswith("```"):
+        content = content.split("\n", 1)[1] if "\n" in content else ""
+        if content.rstrip().endswith("```"):
+            content = content.rstrip()[:-3]
+    return content.strip()
+
+
+def parse_json_output(content: str) -> Any:
+    """解析模型输出的 JSON：严格解析成功时直接返回，失败时才使用 json_repair 修复
+
+    :raises json.JSONDecodeError: 修复后仍不是 JSON 对象或数组
+    """
+    content = _strip_code_fence(content)
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError:
+        logger.debug("JSON strict parse failed, repairing")
+    return json.loads(repair_json_output(content))
+
+
+# 数组键之前的内容，只需向前查看这么多字符
+_KEY_LOOKBEHIND = 64
+
+
+class IncrementalJsonArrayParser:
+    """增量解析流式输出的 JSON 对象，顶层对象中指定键的数组元素一旦完整就返回
+
+    每个字符只扫描一次；用于在模型仍在生成时提前取得计划的步骤。
+    """
+
+    def __init__(self, key: str):
+        self._key_pattern = re.compile(r'"' + re.escape(key) + r'"\s*:\s*$')
+        self._buffer = ""
+        self._position = 0
+        self._stack: list[str] = []
+        self._in_string = False
+        self._escape = False
+        # 目标数组在栈中的深度，以及当前元素的起始位置
+        self._array_depth: Optional[int] = None
+        self._item_start: Optional[int] = None
+
+    def feed(self, text: str) -> list[Any]:
+        """追加文本，返回本次新完成的数组元素"""
+        self._buffer += text
+        items = []
+        buffer = self._buffer
+        for index in range(self._position, len(buffer)):
+            char = buffer[index]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                if self._array_depth is None and char == "[" and self._stack == ["{"] \
+                        and self._key_pattern.search(buffer[max(0, index - _KEY_LOOKBEHIND):index]):
+                    self._array_depth = len(self._stack) + 1
+                elif char == "{" and self._array_depth is not None and len(self._stack) == self._array_depth:
+                    self._item_start = index
+                self._stack.append(char)
+            elif char in "}]" and self._stack:
+                self._stack.pop()
+                if self._item_start is not None and len(self._stack) == self._array_depth:
+                    item = self._parse_item(buffer[self._item_start:index + 1])
+                    if item is not None:
+                        items.append(item)
+                    self._item_start = None
+                elif self._array_depth is not None and len(self._stack) < self._array_depth:
+                    # 目标数组结束
+                    self._array_depth = -1
+        self._position = len(buffer)
+        return items
+
+    @staticmethod
+    def _parse_item(content: str) -> Any:
+        try:
+            return json.loads(content)
+        except json.JSONDecodeError:
+            try:
+                return json_repair.loads(content)
+            except Exception as e:
+                logger.debug(f"Incremental JSON item parse failed: {e}")
+                return None
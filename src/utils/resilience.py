@@ -0,0 +1,306 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+from src.config.configuration import get_bool_env, get_int_env
+from src.utils.deadline import DeadlineExceeded, remaining_seconds
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+# 依赖名称 -> 弹性策略，例如 "llm:basic"、"search"、"jina"、"ragflow"
+_dependencies: dict[str, "ResiliencePolicy"] = {}
+_dependencies_lock = threading.Lock()
+
+
+def is_resilience_enabled() -> bool:
+    return get_bool_env("ENABLE_RESILIENCE", False)
+
+
+class CircuitOpenError(RuntimeError):
+    """依赖的熔断器处于打开状态，调用被快速拒绝"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} is temporarily unavailable (circuit open), retry after {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class UpstreamError(RuntimeError):
+    """上游返回了可重试的错误状态（5xx、429）"""
+
+    def __init__(self, name: str, status_code: int, detail: str = ""):
+        super().__init__(f"{name} returned HTTP {status_code}: {detail[:200]}")
+        self.status_code = status_code
+
+
+class CircuitBreaker:
+    """熔断器：连续失败达到阈值后打开，冷却时间过后半开，放行一个试探调用决定恢复还是继续打开"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_seconds: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self) -> None:
+        """调用前检查，熔断器打开时抛出 CircuitOpenError"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            elapsed = time.monotonic() - self.opened_at
+            if self.state == self.OPEN and elapsed >= self.recovery_seconds:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+            self.rejected += 1
+            raise CircuitOpenError(self.name, max(self.recovery_seconds - elapsed, 0))
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"熔断器 {self.name} 恢复")
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"熔断器 {self.name} 打开: 连续失败 {self.consecutive_failures} 次")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def stats(self) -> dict[str, Any]:
+        return {"state": self.state, "consecutive_failures": self.consecutive_failures, "rejected": self.rejected}
+
+
+class RetryBudget:
+    """全局重试预算：滑动窗口内的重试次数不超过 min_retries + ratio * 请求数
+
+    上游整体退化时重试很快耗尽预算，失败直接返回，而不是成倍放大负载。
+    """
+
+    def __init__(self, ratio: float = 0.2, min_retries: int = 10, window_seconds: float = 10.0):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.window_seconds = window_seconds
+        self._requests: deque[float] = deque()
+        self._retries: deque[float] = deque()
+        self.exhausted = 0
+        self._lock = threading.Lock()
+
+    def _prune(self, now: float) -> None:
+        for events in (self._requests, self._retries):
+            while events and events[0] < now - self.window_seconds:
+                events.popleft()
+
+    def record_request(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._prune(now)
+            self._requests.append(now)
+
+    def try_retry(self) -> bool:
+        """取得一次重试的额度"""
+        with self._lock:
+            now = time.monotonic()
+            self._prune(now)
+            if len(self._retries) >= self.min_retries + self.ratio * len(self._requests):
+                self.exhausted += 1
+                return False
+            self._retries.append(now)
+            return True
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            self._prune(time.monotonic())
+            return {"requests": len(self._requests), "retries": len(self._retries), "exhausted": self.exhausted}
+
+
+_retry_budget = RetryBudget(
+    ratio=get_int_env("RETRY_BUDGET_PERCENT", 20) / 100,
+    min_retries=get_int_env("RETRY_BUDGET_MIN_RETRIES", 10),
+)
+
+
+class ResiliencePolicy:
+    """单个依赖的弹性策略：熔断器 + 带抖动的指数退避重试，重试受全局预算和请求截止时间约束"""
+
+    def __init__(self, name: str, max_attempts: int = 3, base_delay: float = 0.2, max_delay: float = 5.0,
+                 retryable: Callable[[BaseException], bool] = None, breaker: Optional[CircuitBreaker] = None):
+        self.name = name
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retryable = retryable or is_retryable_error
+        self.breaker = breaker or CircuitBreaker(
+            name,
+            failure_threshold=get_int_env("CIRCUIT_FAILURE_THRESHOLD", 5),
+            recovery_seconds=get_int_env("CIRCUIT_RECOVERY_SECONDS", 30),
+        )
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+
+    def backoff(self, attempt: int) -> float:
+        """第 attempt 次重试前的等待时间（full jitter）"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _should_retry(self, error: BaseException, attempt: int) -> Optional[float]:
+        """可以重试时返回等待时间，否则返回 None"""
+        if isinstance(error, CircuitOpenError) or not self.retryable(error):
+            return None
+        if attempt + 1 >= self.max_attempts or self.breaker.state != CircuitBreaker.CLOSED:
+            return None
+        delay = self.backoff(attempt)
+        remaining = remaining_seconds()
+        if remaining is not None and remaining <= delay:
+            return None
+        if not _retry_budget.try_retry():
+            logger.warning(f"{self.name} 重试预算已耗尽，不再重试: {error}")
+            return None
+        return delay
+
+    def record(self, error: Optional[BaseException]) -> None:
+        """记录一次调用的结果（error 为 None 表示成功）"""
+        if error is None:
+            self.breaker.record_success()
+        elif self.retryable(error):
+            # 参数错误等非上游故障不计入熔断
+            self.failures += 1
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    def call(self, fn: Callable[[], T]) -> T:
+        self.calls += 1
+        _retry_budget.record_request()
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            try:
+                result = fn()
+            except Exception as e:
+                self.record(e)
+                delay = self._should_retry(e, attempt)
+                if delay is None:
+                    raise
+                logger.info(f"{self.name} 调用失败，{delay:.2f}s 后重试 ({attempt + 1}/{self.max_attempts - 1}): {e}")
+                self.retries += 1
+                attempt += 1
+                time.sleep(delay)
+                continue
+            self.record(None)
+            return result
+
+    async def acall(self, fn: Callable[[], Awaitable[T]]) -> T:
+        self.calls += 1
+        _retry_budget.record_request()
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            try:
+                result = await fn()
+            except asyncio.CancelledError:
+                # 取消不代表上游故障，只释放半开状态的试探名额
+                self.breaker.release_trial()
+                raise
+            except Exception as e:
+                self.record(e)
+                delay = self._should_retry(e, attempt)
+                if delay is None:
+                    raise
+                logger.info(f"{self.name} 调用失败，{delay:.2f}s 后重试 ({attempt + 1}/{self.max_attempts - 1}): {e}")
+                self.retries += 1
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            self.record(None)
+            return result
+
+    def stats(self) -> dict[str, Any]:
+        return {"calls": self.calls, "retries": self.retries, "failures": self.failures, **self.breaker.stats()}
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    """网络错误、超时和上游 5xx / 429 可以重试"""
+    if isinstance(error, DeadlineExceeded):
+        return False
+    if isinstance(error, UpstreamError):
+        return True
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    # requests / httpx / openai 的连接和超时异常
+    module = type(error).__module__.split(".")[0]
+    name = type(error).__name__
+    if module in ("requests", "urllib3", "httpx", "httpcore"):
+        return any(marker in name for marker in ("Connection", "Timeout", "Protocol", "ReadError"))
+    if module == "openai":
+        return name in ("APIConnectionError", "APITimeoutError", "RateLimitError", "InternalServerError")
+    return False
+
+
+def get_dependency(name: str, max_attempts: Optional[int] = None) -> ResiliencePolicy:
+    """获取（不存在时创建）依赖的弹性策略"""
+    with _dependencies_lock:
+        policy = _dependencies.get(name)
+        if policy is None:
+            policy = _dependencies[name] = ResiliencePolicy(
+                name,
+                max_attempts=max_attempts if max_attempts is not None else get_int_env("RETRY_MAX_ATTEMPTS", 3),
+                base_delay=get_int_env("RETRY_BASE_DELAY_MS", 200) / 1000,
+                max_delay=get_int_env("RETRY_MAX_DELAY_MS", 5000) / 1000,
+            )
+        elif max_attempts is not None:
+            policy.max_attempts = max(1, max_attempts)
+        return policy
+
+
+def check_response(name: str, response: T) -> T:
+    """HTTP 响应为 5xx 或 429 时抛出可重试的 UpstreamError，否则原样返回响应"""
+    if response.status_code >= 500 or response.status_code == 429:
+        raise UpstreamError(name, response.status_code, response.text)
+    return response
+
+
+def resilient_call(name: str, fn: Callable[[], T]) -> T:
+    """未开启 ENABLE_RESILIENCE 时直接调用"""
+    if not is_resilience_enabled():
+        return fn()
+    return get_dependency(name).call(fn)
+
+
+async def aresilient_call(name: str, fn: Callable[[], Awaitable[T]]) -> T:
+    if not is_resilience_enabled():
+        return await fn()
+    return await get_dependency(name).acall(fn)
+
+
+def get_resilience_stats() -> dict[str, Any]:
+    return {
+        "retry_budget": _retry_budget.stats(),
+        "dependencies": {name: policy.stats() for name, policy in _dependencies.items()},
+    }
@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import threading
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+# 名称 -> SingleFlight，用于汇总合并调用的指标
+_single_flights: dict[str, "SingleFlight"] = {}
+
+
+class _Flight:
+    """一次进行中的上游调用及其等待者数量"""
+
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+
+class _SharedStream:
+    """一次进行中的上游流：由后台任务拉取，所有等待者从头重放已收到的分片并继续接收新分片"""
+
+    def __init__(self, source: AsyncIterator[Any]):
+        self.items: list[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+        self._condition = asyncio.Condition()
+        self.task = asyncio.ensure_future(self._pump(source))
+
+    async def _pump(self, source: AsyncIterator[Any]) -> None:
+        try:
+            async for item in source:
+                self.items.append(item)
+                async with self._condition:
+                    self._condition.notify_all()
+        except BaseException as e:
+            self.error = e
+            if isinstance(e, asyncio.CancelledError):
+                raise
+        finally:
+            self.done = True
+            async with self._condition:
+                self._condition.notify_all()
+
+    async def iterate(self) -> AsyncIterator[Any]:
+        index = 0
+        while True:
+            if index < len(self.items):
+                yield self.items[index]
+                index += 1
+                continue
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            async with self._condition:
+                await self._condition.wait_for(lambda: index < len(self.items) or self.done)
+
+
+class _SyncCall:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """合并相同键的并发调用：同一时刻只有一个上游请求，结果（或流）分发给所有等待者
+
+    所有等待者都离开后才取消上游请求，因此单个调用方被取消不会影响其他调用方。
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.coalesced = 0
+        self._flights: dict[str, _Flight] = {}
+        self._streams: dict[str, _SharedStream] = {}
+        self._sync_calls: dict[str, _SyncCall] = {}
+        self._lock = threading.Lock()
+        _single_flights[name] = self
+
+    def _count(self, coalesced: bool) -> None:
+        with self._lock:
+            self.calls += 1
+            if coalesced:
+                self.coalesced += 1
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        loop = asyncio.get_running_loop()
+        flight = self._flights.get(key)
+        coalesced = flight is not None and not flight.task.done() and flight.task.get_loop() is loop
+        if not coalesced:
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._flights.pop(key, None) if self._flights.get(key) is flight else None)
+        else:
+            logger.debug(f"{self.name} 合并进行中的调用: {key}")
+        self._count(coalesced)
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.task.cancel()
+
+    async def stream(self, key: str, fn: Callable[[], AsyncIterator[T]]) -> AsyncIterator[T]:
+        loop = asyncio.get_running_loop()
+        shared = self._streams.get(key)
+        coalesced = shared is not None and not shared.done and shared.task.get_loop() is loop
+        if not coalesced:
+            shared = _SharedStream(fn())
+            self._streams[key] = shared
+            shared.task.add_done_callback(lambda _: self._streams.pop(key, None) if self._streams.get(key) is shared else None)
+        else:
+            logger.debug(f"{self.name} 合并进行中的流: {key}")
+        self._count(coalesced)
+
+        shared.waiters += 1
+        try:
+            async for item in shared.iterate():
+                yield item
+        finally:
+            shared.waiters -= 1
+            if shared.waiters == 0 and not shared.done:
+                shared.task.cancel()
+
+    def do_sync(self, key: str, fn: Callable[[], T]) -> T:
+        with self._lock:
+            call = self._sync_calls.get(key)
+            leader = call is None
+            if leader:
+                call = _SyncCall()
+                self._sync_calls[key] = call
+            self.calls += 1
+            if not leader:
+                self.coalesced += 1
+
+        if leader:
+            try:
+                call.result = fn()
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    self._sync_calls.pop(key, None)
+                call.event.set()
+        else:
+            call.event.wait()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def stats(self) -> dict[str, int]:
+        return {"calls": self.calls, "coalesced": self.coalesced}
+
+
+def get_single_flight_stats() -> dict[str, dict[str, int]]:
+    return {name: single_flight.stats() for name, single_flight in _single_flights.items()}
@@ -0,0 +1,30 @@
+import re
+
+# 中日韩字符通常每个字符约 1 个 token，其他文本约 4 个字符 1 个 token
+_CJK_PATTERN = re.compile(r"[぀-ヿ㐀-䶿一-鿿가-힯豈-﫿]")
+
+
+def count_tokens(text: str) -> int:
+    """估算文本的 token 数量"""
+    if not text:
+        return 0
+    cjk_chars = len(_CJK_PATTERN.findall(text))
+    other_chars = len(text) - cjk_chars
+    return cjk_chars + (other_chars + 3) // 4
+
+
+def truncate_to_tokens(text: str, max_tokens: int, suffix: str = "\n...(truncated)") -> str:
+    """将文本截断到大约 max_tokens 个 token"""
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    # 二分查找能放下的最长前缀
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if count_tokens(text[:mid]) <= max_tokens:
+            low = mid
+        else:
+            high = mid - 1
+    return text[:low] + suffix